@@ -1,17 +1,23 @@
 import os
 import sys
 import json
-from typing import List, Optional
+from typing import List, Literal, Optional
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from pymongo import MongoClient
 from dotenv import load_dotenv
 
 # Add parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-# Import the RecipeProcessor
-from data.processor import RecipeProcessor
+# Import the recipe index
+from data.processor import resolve_fields
+from data.mongo import LazyCollection
+from backend.services.catalog import RecipeCatalog
+from backend.services.encoding import FastJSONResponse
+from backend.services.export import ensure_indexes, iter_recipes, iter_ndjson, iter_gzip
+from backend.services.metrics import instrument_fastapi
+from backend.services.diagnostics import RequestDiagnostics
 
 # Load environment variables
 load_dotenv()
@@ -19,35 +25,26 @@ load_dotenv()
 # MongoDB setup
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 DB_NAME = os.getenv("DB_NAME", "ingreedy")
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
-recipes_collection = db["recipes"]
-processed_collection = db["processed_recipes"]
+recipes_collection = LazyCollection("recipes", DB_NAME, MONGO_URI)
+processed_collection = LazyCollection("processed_recipes", DB_NAME, MONGO_URI)
 
 # Create FastAPI app
 app = FastAPI(
     title="Ingreedy API",
     description="API for Ingreedy recipe recommendation system",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
-# Create a global RecipeProcessor instance
-recipe_processor = RecipeProcessor()
-
-# Initialize the RecipeProcessor
-if not recipe_processor.load_data_from_mongodb():
-    if not recipe_processor.load_data_from_json():
-        print("Warning: No recipe data available")
-    else:
-        recipe_processor.preprocess_ingredients()
-        recipe_processor.vectorize_ingredients()
-        recipe_processor.apply_kmeans_clustering()
-        recipe_processor.apply_hierarchical_clustering()
-else:
-    recipe_processor.preprocess_ingredients()
-    recipe_processor.vectorize_ingredients()
-    recipe_processor.apply_kmeans_clustering()
-    recipe_processor.apply_hierarchical_clustering()
+# Request timings and per-stage histograms at /metrics, slow-query log and profiling
+instrument_fastapi(app, RequestDiagnostics())
+
+# Recipe index, recipe store and random sampler shared by the routes
+catalog = RecipeCatalog(recipes_collection)
+recipe_store = catalog.store
+index_manager = catalog.index_manager
+get_index = catalog.get_index
+get_recipes_by_ids = catalog.get_recipes_by_ids
 
 # Define models
 class Ingredient(BaseModel):
@@ -56,6 +53,8 @@ class Ingredient(BaseModel):
 class RecipeRequest(BaseModel):
     ingredients: List[str]
     max_results: Optional[int] = 5
+    fields: Optional[List[str]] = None  # Summary fields by default, ["all"] for full recipes
+    engine: Literal["exact", "ann"] = "exact"  # "ann" for approximate search on large corpora
 
 class RecipeResponse(BaseModel):
     title: str
@@ -74,6 +73,25 @@ class RecipeSearchResponse(BaseModel):
     count: int
     search_method: str
 
+@app.on_event("startup")
+async def create_indexes():
+    """Make sure recipe keys and export filters can be resolved through indexes"""
+    try:
+        recipe_store.ensure_indexes()
+        ensure_indexes(recipes_collection)
+    except Exception as e:
+        print(f"Warning: Could not create recipe indexes: {e}")
+
+@app.on_event("startup")
+async def load_index():
+    """Load the recipe index when the server starts rather than on the first request, then watch for new versions"""
+    get_index()
+    index_manager.start()
+
+@app.on_event("shutdown")
+async def stop_index_watcher():
+    index_manager.stop()
+
 # Routes
 @app.get("/")
 async def root():
@@ -84,6 +102,12 @@ async def root():
         "redoc": "/redoc"
     }
 
+@app.get("/health")
+async def health():
+    """Service status and the active recipe index version"""
+    status = index_manager.status()
+    return {"status": "ok" if status["recipes"] else "no data", **status}
+
 @app.get("/ingredients", response_model=List[str])
 async def get_ingredients():
     """Get all unique ingredients"""
@@ -111,22 +135,24 @@ async def get_ingredients():
 async def search_recipes(request: RecipeRequest):
     """Search for recipes based on ingredients"""
     try:
-        # Check if the recipe processor is initialized
-        if recipe_processor.recipes_df is None:
-            # Try to load and initialize
-            if not recipe_processor.load_data_from_mongodb():
-                if not recipe_processor.load_data_from_json():
-                    raise HTTPException(
-                        status_code=500, 
-                        detail="No recipe data available"
-                    )
-            recipe_processor.preprocess_ingredients()
-            recipe_processor.vectorize_ingredients()
-            recipe_processor.apply_kmeans_clustering()
-            recipe_processor.apply_hierarchical_clustering()
+        # Check if the recipe index is loaded
+        index = get_index()
+        if index is None:
+            raise HTTPException(
+                status_code=500, 
+                detail="No recipe data available"
+            )
         
-        # Find recipes
-        matching_recipes = recipe_processor.find_recipes_by_ingredients(request.ingredients)
+        # Find recipes; fields the index does not hold come from the recipe store
+        fields = resolve_fields(request.fields)
+        matching_recipes = index.find_recipes_by_ingredients(
+            request.ingredients,
+            max_results=request.max_results or 5,
+            fields=fields if index.has_fields(fields) else None,
+            engine=request.engine
+        )
+        if not index.has_fields(fields):
+            matching_recipes = recipe_store.complete(matching_recipes, fields)
         
         # Determine which search method was used
         search_method = "Exact Match"
@@ -141,58 +167,125 @@ async def search_recipes(request: RecipeRequest):
         if request.max_results and request.max_results < len(matching_recipes):
             matching_recipes = matching_recipes[:request.max_results]
         
-        return {
+        # Returned as a response directly so results skip jsonable_encoder
+        return FastJSONResponse({
             "ingredients": request.ingredients,
             "recipes": matching_recipes,
             "count": len(matching_recipes),
             "search_method": search_method
-        }
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/recipes/random")
+async def get_random_recipe(
+    n: Optional[int] = Query(None, ge=1, le=100, description="Number of random recipes to return"),
+    cluster: Optional[int] = Query(None, description="Only return recipes from this KMeans cluster"),
+    cuisine: Optional[str] = Query(None, description="Only return recipes of this cuisine")
+):
+    """Get a random recipe, or a feed of n random recipes"""
+    try:
+        recipe_ids = catalog.sample(n or 1, cluster=cluster, cuisine=cuisine)
+        recipes = get_recipes_by_ids(recipe_ids)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    if n is not None:
+        return FastJSONResponse({"recipes": recipes, "count": len(recipes)})
+    if not recipes:
+        raise HTTPException(status_code=404, detail="No recipes available")
+    return FastJSONResponse(recipes[0])
+
+@app.get("/recipes/export")
+async def export_recipes(
+    cluster: Optional[int] = Query(None, description="Only export recipes from this KMeans cluster"),
+    cuisine: Optional[str] = Query(None, description="Only export recipes of this cuisine"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to export"),
+    gzip: bool = Query(False, description="Gzip-compress the stream")
+):
+    """Stream the recipe catalog with cluster labels as NDJSON"""
+    documents = iter_recipes(
+        recipes_collection,
+        index=get_index(),
+        cluster=cluster,
+        cuisine=cuisine,
+        fields=fields.split(',') if fields else None
+    )
+    stream = iter_ndjson(documents)
+    headers = {"Content-Disposition": "attachment; filename=recipes.ndjson"}
+    if gzip:
+        stream = iter_gzip(stream)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(stream, media_type="application/x-ndjson", headers=headers)
 
 @app.get("/recipes/{recipe_id}")
 async def get_recipe(recipe_id: str):
-    """Get a recipe by ID"""
+    """Get a recipe by ID, slug or URL"""
     try:
-        recipe = recipes_collection.find_one({"_id": recipe_id}, {'_id': 0})
-        
-        if recipe:
-            return recipe
-        else:
-            raise HTTPException(status_code=404, detail="Recipe not found")
+        recipe = recipe_store.get(recipe_id)
+        index = get_index()
+        if recipe is None and index is not None:
+            # Indexed fields of recipes that are not stored in MongoDB
+            recipe = index.get_recipe(recipe_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    if recipe is None:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    return FastJSONResponse(recipe)
 
-@app.get("/recipes/random", response_model=dict)
-async def get_random_recipe():
-    """Get a random recipe"""
+@app.get("/recipes/{recipe_id}/similar")
+async def get_similar_recipes(
+    recipe_id: str,
+    max_results: int = Query(5, description="Maximum number of similar recipes to return")
+):
+    """Get recipes similar to a recipe"""
+    index = get_index()
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"Recipe with ID {recipe_id} not found")
     try:
-        # Get a random recipe
-        pipeline = [{"$sample": {"size": 1}}]
-        random_recipe = list(recipes_collection.aggregate(pipeline))
-        
-        if random_recipe:
-            recipe = random_recipe[0]
-            # Convert ObjectId to string
-            recipe['_id'] = str(recipe['_id'])
-            return recipe
-        else:
-            raise HTTPException(status_code=404, detail="No recipes available")
+        recipes = recipe_store.complete(index.get_recipe_recommendations(recipe_id, max_results=max_results))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    return FastJSONResponse({
+        "recipe_id": recipe_id,
+        "recipes": recipes,
+        "count": len(recipes)
+    })
 
 # Add route for ingredient-based search with query parameters
-@app.get("/recipes", response_model=RecipeSearchResponse)
+@app.get("/recipes")
 async def search_recipes_by_query(
-    ingredients: str = Query(..., description="Comma-separated list of ingredients"),
-    max_results: int = Query(5, description="Maximum number of results to return")
+    ingredients: Optional[str] = Query(None, description="Comma-separated list of ingredients"),
+    ids: Optional[str] = Query(None, description="Comma-separated list of recipe IDs to fetch"),
+    max_results: int = Query(5, description="Maximum number of results to return"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return per recipe, or 'all'"),
+    engine: Literal["exact", "ann"] = Query("exact", description="Exact search or approximate nearest neighbors")
 ):
-    """Search recipes by ingredients using query parameters"""
+    """Search recipes by ingredients, or fetch a batch of recipes by ID"""
+    if ids:
+        try:
+            recipes = get_recipes_by_ids([recipe_id.strip() for recipe_id in ids.split(',') if recipe_id.strip()])
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        return FastJSONResponse({"recipes": recipes, "count": len(recipes)})
+    
+    if not ingredients:
+        raise HTTPException(status_code=400, detail="Either ingredients or ids must be provided")
+    
     # Split ingredients string into a list
     ingredients_list = [ing.strip() for ing in ingredients.split(',')]
     
     # Create a request object
-    request = RecipeRequest(ingredients=ingredients_list, max_results=max_results)
+    request = RecipeRequest(
+        ingredients=ingredients_list,
+        max_results=max_results,
+        fields=fields.split(',') if fields else None,
+        engine=engine
+    )
     
     # Use the post endpoint logic
-    return await search_recipes(request) 
\ No newline at end of file
+    return await search_recipes(request)
@@ -1,16 +1,25 @@
 import os
 import sys
 import json
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-from pymongo import MongoClient
 from dotenv import load_dotenv
 
 # Add parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Import the RecipeProcessor
-from data.processor import RecipeProcessor
+# Import the recipe index
+from data.processor import resolve_fields
+from data.ann import SEARCH_ENGINES
+from data.mongo import LazyCollection
+from backend.services.catalog import RecipeCatalog
+from backend.services.pagination import CountCache, fetch_page
+from backend.services.encoding import dumps, loads
+from backend.services.export import ensure_indexes, iter_recipes, iter_ndjson, iter_gzip
+from backend.services.metrics import instrument_flask
+from backend.services.diagnostics import RequestDiagnostics
+from data.tracing import span
 
 # Load environment variables
 load_dotenv()
@@ -18,17 +27,45 @@ load_dotenv()
 # MongoDB setup
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 DB_NAME = os.getenv("DB_NAME", "ingreedy")
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
-recipes_collection = db["recipes"]
-processed_collection = db["processed_recipes"]
+recipes_collection = LazyCollection("recipes", DB_NAME, MONGO_URI)
+processed_collection = LazyCollection("processed_recipes", DB_NAME, MONGO_URI)
+
+# Estimated recipe count shown with listing pages
+recipe_count = CountCache(recipes_collection, ttl=float(os.getenv("COUNT_CACHE_TTL", 60)))
+MAX_PAGE_SIZE = 100
+
+class FastJSONProvider(JSONProvider):
+    """jsonify provider that encodes NumPy types, NaN and ObjectIds natively"""
+    def dumps(self, obj, **kwargs):
+        with span("response.encode"):
+            return dumps(obj).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Same arguments as jsonify, without the bytes -> str -> bytes round trip of the default implementation
+        if args and kwargs:
+            raise TypeError("app.json.response() takes either args or kwargs, not both")
+        obj = args[0] if len(args) == 1 else (list(args) if args else kwargs or None)
+        with span("response.encode"):
+            body = dumps(obj)
+        return self._app.response_class(body, mimetype="application/json")
 
 # Create and configure app
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)  # Enable CORS for all routes
 
-# Create a global RecipeProcessor instance
-recipe_processor = RecipeProcessor()
+# Request timings and per-stage histograms at /metrics, slow-query log and profiling
+instrument_flask(app, RequestDiagnostics())
+
+# Recipe index, recipe store and random sampler shared by the routes
+catalog = RecipeCatalog(recipes_collection)
+recipe_store = catalog.store
+index_manager = catalog.index_manager
+get_index = catalog.get_index
+get_recipes_by_ids = catalog.get_recipes_by_ids
 
 @app.route('/')
 def index():
@@ -37,55 +74,123 @@ def index():
         "message": "Welcome to the Ingreedy API",
         "endpoints": {
             "GET /": "This help message",
-            "GET /recipes": "Get all recipes",
-            "GET /recipes/<id>": "Get recipe by ID",
-            "GET /recipes/search?ingredients=ing1,ing2,...": "Search recipes by ingredients",
-            "GET /recipes/random": "Get a random recipe",
+            "GET /recipes?limit=10&cursor=<next_cursor>": "List recipes page by page",
+            "GET /recipes?ids=id1,id2,...": "Get a batch of recipes by ID",
+            "GET /recipes/<id>": "Get recipe by ID, slug or URL",
+            "GET /recipes/<id>/similar": "Get recipes similar to a recipe",
+            "GET /recipes/export?cluster=2&cuisine=italian&gzip=1": "Stream all recipes as NDJSON",
+            "GET /metrics": "Request and stage timing histograms (Prometheus format)",
+            "GET /health": "Service status and the active recipe index version",
+            "GET /recipes/search?ingredients=ing1,ing2,...&fields=title,ingredients&engine=ann": "Search recipes by ingredients",
+            "GET /recipes/random?n=5&cluster=2&cuisine=italian": "Get random recipes",
             "GET /ingredients": "Get list of all unique ingredients"
         }
     })
 
+@app.route('/health')
+def health():
+    """Service status and the active recipe index version"""
+    status = index_manager.status()
+    return jsonify({"status": "ok" if status["recipes"] else "no data", **status})
+
 @app.route('/recipes')
 def get_all_recipes():
-    """Get all recipes with pagination"""
+    """Get all recipes with pagination, or a batch of recipes by ID"""
+    ids_param = request.args.get('ids', '')
+    if ids_param:
+        recipe_ids = [recipe_id.strip() for recipe_id in ids_param.split(',') if recipe_id.strip()]
+        recipes = get_recipes_by_ids(recipe_ids)
+        return jsonify({
+            "recipes": recipes,
+            "count": len(recipes)
+        })
+    
     # Get pagination parameters
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 10))
-    skip = (page - 1) * limit
+    limit = max(1, min(request.args.get('limit', 10, type=int), MAX_PAGE_SIZE))
+    cursor = request.args.get('cursor')
     
-    # Get recipes
-    recipes = list(recipes_collection.find({}, {'_id': 0}).skip(skip).limit(limit))
-    total = recipes_collection.count_documents({})
+    # Get recipes after the cursor
+    try:
+        recipes, next_cursor = fetch_page(recipes_collection, cursor=cursor, limit=limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     return jsonify({
-        "page": page,
         "limit": limit,
-        "total": total,
-        "recipes": recipes
+        "total": recipe_count.get(),
+        "recipes": recipes,
+        "next_cursor": next_cursor
     })
 
+@app.route('/recipes/export')
+def export_recipes():
+    """Stream the recipe catalog with cluster labels as NDJSON"""
+    fields = request.args.get('fields')
+    documents = iter_recipes(
+        recipes_collection,
+        index=get_index(),
+        cluster=request.args.get('cluster', type=int),
+        cuisine=request.args.get('cuisine'),
+        fields=fields.split(',') if fields else None
+    )
+    stream = iter_ndjson(documents)
+    headers = {"Content-Disposition": "attachment; filename=recipes.ndjson"}
+    if request.args.get('gzip', '').lower() in ('1', 'true', 'yes'):
+        stream = iter_gzip(stream)
+        headers["Content-Encoding"] = "gzip"
+    return Response(stream, mimetype="application/x-ndjson", headers=headers)
+
 @app.route('/recipes/<recipe_id>')
 def get_recipe_by_id(recipe_id):
-    """Get recipe by ID"""
-    recipe = recipes_collection.find_one({"_id": recipe_id}, {'_id': 0})
+    """Get recipe by ID, slug or URL"""
+    recipe = recipe_store.get(recipe_id)
+    index = get_index()
+    if recipe is None and index is not None:
+        # Indexed fields of recipes that are not stored in MongoDB
+        recipe = index.get_recipe(recipe_id)
     
     if recipe:
         return jsonify(recipe)
     else:
         return jsonify({"error": "Recipe not found"}), 404
 
+@app.route('/recipes/<recipe_id>/similar')
+def get_similar_recipes(recipe_id):
+    """Get recipes similar to a recipe"""
+    max_results = int(request.args.get('max_results', 5))
+    
+    index = get_index()
+    if index is None:
+        return jsonify({"error": f"Recipe with ID {recipe_id} not found"}), 404
+    try:
+        recipes = recipe_store.complete(index.get_recipe_recommendations(recipe_id, max_results=max_results))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    
+    return jsonify({
+        "recipe_id": recipe_id,
+        "recipes": recipes,
+        "count": len(recipes)
+    })
+
 @app.route('/recipes/random')
 def get_random_recipe():
-    """Get a random recipe"""
-    # Get a random recipe
-    recipe = recipes_collection.aggregate([
-        {"$sample": {"size": 1}}
-    ]).next()
+    """Get a random recipe, or a feed of n random recipes"""
+    n = request.args.get('n', type=int)
+    cluster = request.args.get('cluster', type=int)
+    cuisine = request.args.get('cuisine')
     
-    # Convert ObjectId to string
-    recipe['_id'] = str(recipe['_id'])
+    recipe_ids = catalog.sample(min(n or 1, 100), cluster=cluster, cuisine=cuisine)
+    recipes = get_recipes_by_ids(recipe_ids)
     
-    return jsonify(recipe)
+    if n is not None:
+        return jsonify({
+            "recipes": recipes,
+            "count": len(recipes)
+        })
+    if not recipes:
+        return jsonify({"error": "No recipes available"}), 404
+    return jsonify(recipes[0])
 
 @app.route('/recipes/search')
 def search_recipes_by_ingredients():
@@ -98,24 +203,26 @@ def search_recipes_by_ingredients():
     # Split ingredients into a list
     ingredients = [ing.strip() for ing in ingredients_param.split(',')]
     
-    # Initialize the recipe processor if needed
-    global recipe_processor
-    
-    # Check if the processor is initialized with data
-    if recipe_processor.recipes_df is None:
-        # Try to load data
-        if not recipe_processor.load_data_from_mongodb():
-            if not recipe_processor.load_data_from_json():
-                return jsonify({"error": "No recipe data available"}), 500
-        
-        # Process data
-        recipe_processor.preprocess_ingredients()
-        recipe_processor.vectorize_ingredients()
-        recipe_processor.apply_kmeans_clustering()
-        recipe_processor.apply_hierarchical_clustering()
-    
-    # Find recipes with the given ingredients
-    matching_recipes = recipe_processor.find_recipes_by_ingredients(ingredients)
+    # Exact search by default, approximate nearest neighbors for large corpora
+    engine = request.args.get('engine', 'exact')
+    if engine not in SEARCH_ENGINES:
+        return jsonify({"error": f"engine must be one of: {', '.join(SEARCH_ENGINES)}"}), 400
+    
+    # Load the recipe index if needed
+    index = get_index()
+    if index is None:
+        return jsonify({"error": "No recipe data available"}), 500
+    
+    # Find recipes with the given ingredients; fields the index does not hold come from the recipe store
+    fields = resolve_fields(request.args.get('fields'))
+    matching_recipes = index.find_recipes_by_ingredients(
+        ingredients,
+        max_results=request.args.get('max_results', 5, type=int),
+        fields=fields if index.has_fields(fields) else None,
+        engine=engine
+    )
+    if not index.has_fields(fields):
+        matching_recipes = recipe_store.complete(matching_recipes, fields)
     
     # Return results
     return jsonify({
@@ -156,16 +263,15 @@ def init_app():
     else:
         print(f"Found {recipe_count} recipes in MongoDB")
     
-    # Try to initialize the recipe processor
-    global recipe_processor
-    recipe_processor.load_data_from_mongodb()
-    if recipe_processor.recipes_df is not None:
-        print("Initializing ML models...")
-        recipe_processor.preprocess_ingredients()
-        recipe_processor.vectorize_ingredients()
-        recipe_processor.apply_kmeans_clustering()
-        recipe_processor.apply_hierarchical_clustering()
-        print("ML models initialized")
+    # Make sure recipe keys and export filters can be resolved through indexes
+    recipe_store.ensure_indexes()
+    ensure_indexes(recipes_collection)
+    
+    # Load the recipe index now rather than on the first request, then watch for new versions
+    print("Loading recipe index...")
+    if get_index() is not None:
+        print("Recipe index loaded")
+    index_manager.start()
     
     return app
 
@@ -1,19 +1,25 @@
-from pymongo import MongoClient
 from datetime import datetime
 import os
+import sys
 from dotenv import load_dotenv
 
+# Add parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.tracing import span, annotate
+from data.mongo import LazyCollection
+from backend.services.recipe_store import recipe_key_query
+from backend.services import export
+
 # Load environment variables
 load_dotenv()
 
 # MongoDB connection
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-client = MongoClient(MONGO_URI)
-db = client.ingreedy
 
-# Collections
-recipes = db.recipes
-ingredients = db.ingredients
+# Collections (the client connects on first use)
+recipes = LazyCollection("recipes", "ingreedy", MONGO_URI)
+ingredients = LazyCollection("ingredients", "ingreedy", MONGO_URI)
 
 def init_db():
     """Initialize database with indexes"""
@@ -23,6 +29,13 @@ def init_db():
         recipes.create_index([("ingredients", "text")])
         recipes.create_index([("tags", "text")])
         
+        # Indexes used to resolve recipe slugs and URLs
+        recipes.create_index("url")
+        recipes.create_index("slug", sparse=True)
+        
+        # Case-insensitive cuisine index used by filtered exports
+        export.ensure_indexes(recipes)
+        
         # Create unique index for ingredients
         ingredients.create_index("name", unique=True)
         
@@ -35,20 +48,34 @@ def save_recipe(recipe_data):
     """Save a recipe to the database"""
     recipe_data["created_at"] = datetime.utcnow()
     recipe_data["updated_at"] = datetime.utcnow()
-    return recipes.insert_one(recipe_data)
+    with span("mongo.save_recipe"):
+        return recipes.insert_one(recipe_data)
 
-def save_ingredients(ingredient_list):
-    """Save ingredients to the database"""
-    for ingredient in ingredient_list:
-        ingredients.update_one(
-            {"name": ingredient.lower()},
-            {"$set": {"name": ingredient.lower(), "updated_at": datetime.utcnow()}},
+def refresh_recipe(recipe_data):
+    """Update a re-scraped recipe by its URL, inserting it if it is not stored yet"""
+    now = datetime.utcnow()
+    recipe_data["updated_at"] = now
+    with span("mongo.refresh_recipe"):
+        return recipes.update_one(
+            {"url": recipe_data["url"]},
+            {"$set": recipe_data, "$setOnInsert": {"created_at": now}},
             upsert=True
         )
 
+def save_ingredients(ingredient_list):
+    """Save ingredients to the database"""
+    with span("mongo.save_ingredients"):
+        for ingredient in ingredient_list:
+            ingredients.update_one(
+                {"name": ingredient.lower()},
+                {"$set": {"name": ingredient.lower(), "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+
 def get_all_ingredients():
     """Get all unique ingredients"""
-    return [doc["name"] for doc in ingredients.find({}, {"name": 1})]
+    with span("mongo.get_all_ingredients"):
+        return [doc["name"] for doc in ingredients.find({}, {"name": 1})]
 
 def search_recipes_by_ingredients(ingredient_list, max_results=5):
     """Search recipes by ingredients"""
@@ -66,13 +93,19 @@ def search_recipes_by_ingredients(ingredient_list, max_results=5):
         },
         {
             "$addFields": {
-                "match_count": {
-                    "$size": {
-                        "$setIntersection": ["$ingredients_simple", ingredient_list]
-                    }
+                "matched": {
+                    "$setIntersection": [ingredient_list, "$ingredients_simple"]
+                },
+                "missing": {
+                    "$setDifference": [ingredient_list, "$ingredients_simple"]
                 }
             }
         },
+        {
+            "$addFields": {
+                "match_count": {"$size": "$matched"}
+            }
+        },
         {
             "$sort": {"match_count": -1}
         },
@@ -81,20 +114,28 @@ def search_recipes_by_ingredients(ingredient_list, max_results=5):
         }
     ]
     
-    return list(recipes.aggregate(pipeline))
+    with span("mongo.search_recipes"):
+        results = list(recipes.aggregate(pipeline))
+    
+    # Details for the slow-query log of traced requests
+    annotate(ingredients=ingredient_list, result_count=len(results))
+    return results
 
 def get_recipe_by_id(recipe_id):
-    """Get a recipe by its ID"""
-    return recipes.find_one({"_id": recipe_id})
+    """Get a recipe by its ID, slug or URL"""
+    with span("mongo.get_recipe"):
+        return recipes.find_one(recipe_key_query(recipe_id))
 
 def update_recipe(recipe_id, recipe_data):
     """Update a recipe"""
     recipe_data["updated_at"] = datetime.utcnow()
-    return recipes.update_one(
-        {"_id": recipe_id},
-        {"$set": recipe_data}
-    )
+    with span("mongo.update_recipe"):
+        return recipes.update_one(
+            {"_id": recipe_id},
+            {"$set": recipe_data}
+        )
 
 def delete_recipe(recipe_id):
     """Delete a recipe"""
-    return recipes.delete_one({"_id": recipe_id}) 
\ No newline at end of file
+    with span("mongo.delete_recipe"):
+        return recipes.delete_one({"_id": recipe_id}) 
\ No newline at end of file
@@ -1,15 +1,27 @@
+import os
+import sys
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
+
+# Add parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from database import (
     search_recipes_by_ingredients,
     get_all_ingredients,
     get_recipe_by_id,
     init_db
 )
+from backend.services.encoding import FastJSONResponse
+from backend.services.metrics import instrument_fastapi
+from backend.services.diagnostics import RequestDiagnostics
+
+app = FastAPI(title="Ingreedy API", default_response_class=FastJSONResponse)
 
-app = FastAPI(title="Ingreedy API")
+# Request timings and per-stage histograms at /metrics, slow-query log and profiling
+instrument_fastapi(app, RequestDiagnostics())
 
 # Configure CORS
 app.add_middleware(
@@ -20,8 +32,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize database
-init_db()
+# Initialize database when the server starts rather than on import
+@app.on_event("startup")
+async def create_indexes():
+    """Create the search indexes"""
+    init_db()
 
 class RecipeResponse(BaseModel):
     title: str
@@ -59,26 +74,27 @@ async def search_recipes(ingredients: str, max_results: int = 5):
         # Search recipes
         recipes = search_recipes_by_ingredients(ingredient_list, max_results)
         
-        # Format response
-        return {
+        # Format response; returned directly so MongoDB documents skip jsonable_encoder
+        return FastJSONResponse({
             "recipes": recipes,
             "count": len(recipes),
             "search_method": "MongoDB",
             "ingredients": ingredient_list
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/recipes/{recipe_id}")
 async def get_recipe(recipe_id: str):
-    """Get a specific recipe by ID"""
+    """Get a specific recipe by ID, slug or URL"""
     try:
         recipe = get_recipe_by_id(recipe_id)
-        if not recipe:
-            raise HTTPException(status_code=404, detail="Recipe not found")
-        return recipe
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    if not recipe:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    return FastJSONResponse(recipe)
 
 if __name__ == "__main__":
     import uvicorn
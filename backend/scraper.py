@@ -1,11 +1,29 @@
+import os
+import sys
 import requests
 from bs4 import BeautifulSoup
 import time
 import random
-from database import save_recipe, save_ingredients, init_db
+from database import save_recipe, refresh_recipe, save_ingredients, init_db
 import re
 from urllib.parse import urljoin
 
+# Add parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.frontier import CrawlFrontier, LISTING, RECIPE
+from data.recipe_parser import parse_recipe_page
+from backend.services.recipe_store import recipe_slug
+
+# CSS selectors of the recipe page fields, for pages without structured data
+RECIPE_LAYOUT = {
+    "title": "h1.headline",
+    "ingredients": "div.ingredients-section li.ingredients-item",
+    "instructions": "div.instructions-section li.instructions-section-item",
+    "image": "div.primary-image img",
+    "tags": "div.recipe-tags a",
+}
+
 class AllRecipesScraper:
     def __init__(self):
         self.base_url = "https://www.allrecipes.com"
@@ -13,26 +31,33 @@ class AllRecipesScraper:
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
 
+    def get_listing_links(self, url):
+        """Get recipe links from one category page, None if it could not be fetched"""
+        try:
+            response = requests.get(url, headers=self.headers)
+            if response.status_code != 200:
+                print(f"Failed to fetch {url}, status code: {response.status_code}")
+                return None
+            soup = BeautifulSoup(response.text, 'html.parser')
+            
+            # Find recipe links
+            links = soup.find_all('a', href=re.compile(r'/recipe/\d+'))
+            return [urljoin(self.base_url, link['href']) for link in links]
+        except Exception as e:
+            print(f"Error fetching page {url}: {e}")
+            return None
+
     def get_recipe_links(self, category_url, max_pages=5):
         """Get recipe links from category pages"""
         recipe_links = set()
         
         for page in range(1, max_pages + 1):
-            url = f"{category_url}?page={page}"
-            try:
-                response = requests.get(url, headers=self.headers)
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Find recipe links
-                links = soup.find_all('a', href=re.compile(r'/recipe/\d+'))
-                for link in links:
-                    recipe_links.add(urljoin(self.base_url, link['href']))
-                
-                time.sleep(random.uniform(1, 2))  # Be nice to the server
-                
-            except Exception as e:
-                print(f"Error fetching page {page}: {e}")
+            links = self.get_listing_links(f"{category_url}?page={page}")
+            if links is None:
                 continue
+            recipe_links.update(links)
+            
+            time.sleep(random.uniform(1, 2))  # Be nice to the server
         
         return list(recipe_links)
 
@@ -40,23 +65,22 @@ class AllRecipesScraper:
         """Parse a single recipe page"""
         try:
             response = requests.get(url, headers=self.headers)
-            soup = BeautifulSoup(response.text, 'html.parser')
+            if response.status_code != 200:
+                print(f"Failed to fetch {url}, status code: {response.status_code}")
+                return None
+            # Structured data first, the page layout's selectors otherwise
+            fields = parse_recipe_page(response.text, RECIPE_LAYOUT)
             
-            # Extract recipe data
-            title_elem = soup.find('h1', class_='headline')
-            if not title_elem:
+            title = fields['title']
+            if not title:
                 print(f"⚠️ Could not find title for {url}")
                 return None
-            title = title_elem.text.strip()
             
             # Get ingredients
-            ingredients = []
+            ingredients = fields['ingredients']
             ingredients_simple = []
-            ingredient_section = soup.find('div', class_='ingredients-section')
-            if ingredient_section:
-                for item in ingredient_section.find_all('li', class_='ingredients-item'):
-                    ingredient = item.text.strip()
-                    ingredients.append(ingredient)
+            if ingredients:
+                for ingredient in ingredients:
                     # Create simplified version for searching
                     simple_ingredient = re.sub(r'\d+\s*(?:cup|tablespoon|teaspoon|ounce|pound|g|ml|tsp|tbsp|oz|lb)s?\s*', '', ingredient.lower())
                     simple_ingredient = re.sub(r'\([^)]*\)', '', simple_ingredient)
@@ -68,47 +92,25 @@ class AllRecipesScraper:
                 return None
             
             # Get instructions
-            instructions = []
-            instructions_section = soup.find('div', class_='instructions-section')
-            if instructions_section:
-                for item in instructions_section.find_all('li', class_='instructions-section-item'):
-                    instructions.append(item.text.strip())
-            else:
+            instructions = fields['instructions']
+            if not instructions:
                 print(f"⚠️ Could not find instructions for {url}")
                 return None
             
             # Get recipe details with fallbacks
-            try:
-                prep_time = soup.find('div', class_='recipe-meta-item', text=re.compile('Prep')).find_next('div').text.strip()
-            except:
-                prep_time = "N/A"
-            
-            try:
-                cook_time = soup.find('div', class_='recipe-meta-item', text=re.compile('Cook')).find_next('div').text.strip()
-            except:
-                cook_time = "N/A"
-            
-            try:
-                servings = soup.find('div', class_='recipe-meta-item', text=re.compile('Servings')).find_next('div').text.strip()
-            except:
-                servings = "N/A"
+            prep_time = fields['prep_time'] or "N/A"
+            cook_time = fields['cook_time'] or "N/A"
+            servings = fields['servings'] or "N/A"
             
             # Get tags
-            tags = []
-            tags_section = soup.find('div', class_='recipe-tags')
-            if tags_section:
-                for tag in tags_section.find_all('a'):
-                    tags.append(tag.text.strip().lower())
+            tags = [tag.lower() for tag in fields['tags']]
             
-            # Get image URL
-            image_url = None
-            image_section = soup.find('div', class_='primary-image')
-            if image_section and image_section.find('img'):
-                image_url = image_section.find('img').get('src', None)
+            image_url = fields['image_url']
             
             recipe_data = {
                 "title": title,
                 "url": url,
+                "slug": recipe_slug(url),
                 "ingredients": ingredients,
                 "ingredients_simple": ingredients_simple,
                 "instructions": instructions,
@@ -135,11 +137,7 @@ class AllRecipesScraper:
             try:
                 recipe_data = self.parse_recipe(link)
                 if recipe_data:
-                    # Save recipe
-                    save_recipe(recipe_data)
-                    # Save ingredients
-                    save_ingredients(recipe_data['ingredients_simple'])
-                    print(f"Saved recipe: {recipe_data['title']}")
+                    self.save_recipe(recipe_data)
                 
                 time.sleep(random.uniform(2, 3))  # Be nice to the server
                 
@@ -147,6 +145,53 @@ class AllRecipesScraper:
                 print(f"Error processing recipe {link}: {e}")
                 continue
 
+    def save_recipe(self, recipe_data, refresh=False):
+        """Save a parsed recipe and its ingredients; a refresh updates the stored recipe"""
+        if refresh:
+            refresh_recipe(recipe_data)
+        else:
+            save_recipe(recipe_data)
+        save_ingredients(recipe_data['ingredients_simple'])
+        print(f"Saved recipe: {recipe_data['title']}")
+
+    def crawl(self, frontier, category_urls, max_pages=5):
+        """
+        Scrape the categories through a crawl frontier (see data/frontier.py)
+        
+        Recipes are fetched once across categories and runs; a rerun only
+        visits new, failed-and-due or stale pages, earlier categories first.
+        """
+        for priority, category_url in enumerate(category_urls):
+            frontier.add_many(
+                [f"{category_url}?page={page}" for page in range(1, max_pages + 1)],
+                kind=LISTING, category=category_url, priority=priority
+            )
+        
+        for entry in frontier.iter_due(LISTING):
+            links = self.get_listing_links(entry.url)
+            if links is None:
+                frontier.mark_failed(entry.url, "listing fetch failed")
+            else:
+                frontier.add_many(links, category=entry.category, priority=entry.priority)
+                frontier.mark_fetched(entry.url)
+            time.sleep(random.uniform(1, 2))  # Be nice to the server
+        
+        for entry in frontier.iter_due(RECIPE):
+            try:
+                recipe_data = self.parse_recipe(entry.url)
+                if recipe_data:
+                    self.save_recipe(recipe_data, refresh=entry.fetched_at is not None)
+                    frontier.mark_fetched(entry.url)
+                else:
+                    frontier.mark_failed(entry.url, "parse failed")
+            except Exception as e:
+                print(f"Error processing recipe {entry.url}: {e}")
+                frontier.mark_failed(entry.url, e)
+            
+            time.sleep(random.uniform(2, 3))  # Be nice to the server
+        
+        print(f"Crawl frontier: {frontier.stats()}")
+
 def main():
     # Initialize database
     init_db()
@@ -165,10 +210,9 @@ def main():
         "/recipes/17561/breakfast-and-brunch/"
     ]
     
-    # Scrape each category
-    for category in categories:
-        category_url = urljoin(scraper.base_url, category)
-        scraper.scrape_category(category_url, max_pages=3)
+    # Scrape the categories, resuming from the crawl frontier of earlier runs
+    with CrawlFrontier() as frontier:
+        scraper.crawl(frontier, [urljoin(scraper.base_url, category) for category in categories], max_pages=3)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1 @@
+# Shared services used by the Flask and FastAPI backends
@@ -0,0 +1,94 @@
+import os
+import threading
+from typing import Dict, List, Optional
+from data.index_versions import IndexManager
+from backend.services.recipe_store import RecipeStore
+from backend.services.sampler import RecipeSampler
+
+# Seconds between rescans of the MongoDB recipe ids sampled while no index is loaded
+SAMPLER_TTL = int(os.getenv("SAMPLER_TTL", 300))
+
+
+class RecipeCatalog:
+    """
+    Recipe index, recipe store and random sampler shared by the routes of an API
+
+    The sampler follows the index: a loaded index never changes, so the
+    sampler is only refreshed when a version is swapped in. Without an
+    index it samples the ids of the collection, rescanned in a background
+    thread every sampler_ttl seconds so requests never wait on the scan.
+    """
+
+    def __init__(self, collection, sampler_ttl: float = SAMPLER_TTL):
+        self.collection = collection
+        self.sampler_ttl = sampler_ttl
+        # Recipe detail lookups with a cache of hot recipes
+        self.store = RecipeStore(collection)
+        # Random recipe sampling over an in-memory array of recipe ids
+        self.sampler = RecipeSampler()
+        # Read-only RecipeIndex shared by all requests, swapped when a new version is published
+        self.index_manager = IndexManager(on_swap=self.on_index_swap)
+        self._rescan_lock = threading.Lock()
+        self._rescanning = False
+
+    def on_index_swap(self, index):
+        """Sample from, and stop serving cached recipes of, the version that was replaced"""
+        self.refresh_sampler()
+        self.store.invalidate()
+
+    def get_index(self):
+        """
+        Get the current recipe index, loading it on first use and retrying while no data is available
+
+        Call it once per request and keep the result, so the request finishes
+        on one version even if a new one is swapped in meanwhile.
+        """
+        index = self.index_manager.current
+        if index is None:
+            index = self.index_manager.load()
+        return index
+
+    def refresh_sampler(self):
+        """Refresh the random recipe sampler from the index, or MongoDB if no data is loaded"""
+        if not self.sampler.refresh_from_index(self.index_manager.current):
+            self.sampler.refresh_from_collection(self.collection)
+
+    def _rescan(self):
+        try:
+            # An index loaded meanwhile has already refreshed the sampler
+            if self.index_manager.current is None:
+                self.sampler.refresh_from_collection(self.collection)
+        except Exception as e:
+            print(f"Warning: Could not refresh the recipe sampler: {e}")
+        finally:
+            with self._rescan_lock:
+                self._rescanning = False
+
+    def sample(self, n: int = 1, cluster=None, cuisine: Optional[str] = None) -> List[str]:
+        """Draw up to n random recipe ids (see RecipeSampler.sample)"""
+        index = self.get_index()
+        if index is None:
+            if not self.sampler.refreshed_at:
+                # Nothing to sample from yet: the first scan happens in the request
+                self.refresh_sampler()
+            elif self.sampler.age > self.sampler_ttl:
+                with self._rescan_lock:
+                    start, self._rescanning = not self._rescanning, True
+                if start:
+                    threading.Thread(target=self._rescan, name="sampler-rescan", daemon=True).start()
+        return self.sampler.sample(n, cluster=cluster, cuisine=cuisine)
+
+    def get_recipes_by_ids(self, recipe_ids: List[str]) -> List[Dict]:
+        """Get recipes by ObjectId, slug or URL from the recipe store, then the index, in the order of recipe_ids"""
+        found = self.store.get_by_keys(recipe_ids)
+
+        # Indexed fields of recipes that are not stored in MongoDB
+        missing = [recipe_id for recipe_id in recipe_ids if recipe_id not in found]
+        index = self.get_index() if missing else None
+        if index is not None:
+            for recipe_id in missing:
+                recipe = index.get_recipe(recipe_id)
+                if recipe is not None:
+                    found[recipe_id] = recipe
+
+        return [found[recipe_id] for recipe_id in recipe_ids if recipe_id in found]
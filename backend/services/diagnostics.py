@@ -0,0 +1,161 @@
+import os
+import re
+import sys
+import json
+import time
+import threading
+import itertools
+from collections import Counter
+from typing import Dict, Mapping, Optional
+
+from data.tracing import start_trace, end_trace
+
+# Opt-in slow-query log: requests slower than this many ms (0 disables it, and with
+# the profiler off as well requests are not traced at all)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 0))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", os.path.join("logs", "slow_queries.jsonl"))
+
+# Opt-in sampling profiler: every Nth request (0 disables) and/or requests carrying a header
+PROFILE_EVERY_N = int(os.getenv("PROFILE_EVERY_N", 0))
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "")  # e.g. X-Ingreedy-Profile; empty disables
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+
+
+class SlowQueryLog:
+    """Appends one JSON line per slow request"""
+    def __init__(self, file_path: str = SLOW_QUERY_LOG, threshold_ms: float = SLOW_QUERY_MS):
+        self.file_path = file_path
+        self.threshold_ms = threshold_ms
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def record(self, entry: Dict):
+        """Write an entry (a request's route, timings and search details)"""
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            directory = os.path.dirname(self.file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.file_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def _collapse(frame) -> str:
+    """One stack in the collapsed format (root first, frames separated by ';')"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread at a fixed interval from a background thread
+
+    Uses sys._current_frames, so it needs no tracing hooks in the profiled
+    code. For async apps the sampled thread is the event loop's, so
+    samples may include other requests handled concurrently.
+    """
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ingreedy-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[_collapse(frame)] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        """Stop sampling and return the counts per collapsed stack"""
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+
+def write_collapsed(samples: Counter, file_path: str):
+    """Save samples in the collapsed-stack format read by flamegraph.pl and speedscope"""
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    with open(file_path, "w", encoding="utf-8") as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+class RequestDiagnostics:
+    """
+    Slow-query logging and opt-in profiling around request handling
+
+    Call begin() when a request starts and end() when it is done; both
+    frameworks' request hooks go through this class.
+    """
+    def __init__(self,
+                 slow_log: Optional[SlowQueryLog] = None,
+                 profile_every_n: int = PROFILE_EVERY_N,
+                 profile_header: str = PROFILE_HEADER,
+                 profile_dir: str = PROFILE_DIR):
+        self.slow_log = slow_log or SlowQueryLog()
+        self.profile_every_n = profile_every_n
+        self.profile_header = profile_header.lower()
+        self.profile_dir = profile_dir
+        self._counter = itertools.count(1)
+        self._profile_ids = itertools.count(1)
+
+    def _should_profile(self, headers: Mapping[str, str]) -> bool:
+        if self.profile_header and headers.get(self.profile_header):
+            return True
+        return self.profile_every_n > 0 and next(self._counter) % self.profile_every_n == 0
+
+    def begin(self, headers: Mapping[str, str]) -> Optional[Dict]:
+        """Start tracing (and maybe profiling) a request; headers must have lower-case names"""
+        profile = self._should_profile(headers)
+        if not self.slow_log.enabled and not profile:
+            return None
+
+        trace, token = start_trace()
+        return {
+            "trace": trace,
+            "token": token,
+            "start": time.perf_counter(),
+            "profiler": SamplingProfiler(threading.get_ident()).start() if profile else None,
+        }
+
+    def end(self, state: Optional[Dict], method: str, path: str, route: str, status: int):
+        """Stop tracing a request, logging it if slow and saving its profile if it was profiled"""
+        if state is None:
+            return
+        duration_ms = (time.perf_counter() - state["start"]) * 1000
+        end_trace(state["token"])
+
+        if state["profiler"] is not None:
+            samples = state["profiler"].stop()
+            name = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+            file_name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._profile_ids)}-{method}-{name}.collapsed"
+            write_collapsed(samples, os.path.join(self.profile_dir, file_name))
+
+        if self.slow_log.enabled and duration_ms >= self.slow_log.threshold_ms:
+            stages = {}
+            for stage, seconds in state["trace"]["stages"]:
+                stages[stage] = round(stages.get(stage, 0) + seconds * 1000, 3)
+            self.slow_log.record({
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "method": method,
+                "path": path,
+                "route": route,
+                "status": status,
+                "duration_ms": round(duration_ms, 3),
+                "stages_ms": stages,
+                **state["trace"]["attributes"],
+            })
@@ -0,0 +1,90 @@
+import datetime
+import json
+import math
+import numpy as np
+from bson import ObjectId
+from data.tracing import span
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library encoder
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def _default(obj):
+    """Encode the types recipe results carry that JSON has no native form for"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return None if np.isnan(obj) or np.isinf(obj) else float(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.ndarray):
+        return _sanitize(obj.tolist())
+    # pandas missing values (NaT, NA) without importing pandas; NaT is also a datetime
+    if obj.__class__.__name__ in ('NaTType', 'NAType'):
+        return None
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return _sanitize(list(obj))
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _sanitize(obj):
+    """Replace NaN/inf floats by None, for the standard library encoder"""
+    if isinstance(obj, float):
+        return None if math.isnan(obj) or math.isinf(obj) else obj
+    if isinstance(obj, dict):
+        return {key: _sanitize(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_sanitize(value) for value in obj]
+    return obj
+
+
+def dumps(obj) -> bytes:
+    """
+    Serialize an API response to JSON bytes
+
+    NumPy scalars and arrays, NaN (as null), ObjectIds and datetimes are
+    handled natively, so results built from pandas rows or MongoDB documents
+    can be encoded without a conversion pass.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            obj,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(_sanitize(obj), default=_default, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    """Parse JSON bytes or text"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _fast_json_response():
+    from starlette.responses import JSONResponse
+
+    class FastJSONResponse(JSONResponse):
+        """JSON response encoded by dumps: NumPy types, NaN, ObjectIds and datetimes natively"""
+        def render(self, content) -> bytes:
+            with span("response.encode"):
+                return dumps(content)
+
+    return FastJSONResponse
+
+
+def __getattr__(name):
+    # The FastAPI response class is built on first use, so the Flask app never imports Starlette
+    if name == "FastJSONResponse":
+        globals()[name] = _fast_json_response()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
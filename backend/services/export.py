@@ -0,0 +1,110 @@
+import zlib
+from typing import Dict, Iterator, List, Optional
+from bson import ObjectId
+from backend.services.encoding import dumps
+
+# Fields streamed for each recipe unless the caller asks for others
+EXPORT_PROJECTION = {
+    'title': 1,
+    'url': 1,
+    'ingredients': 1,
+    'ingredients_simple': 1,
+    'instructions': 1,
+    'image_url': 1,
+    'prep_time': 1,
+    'cook_time': 1,
+    'servings': 1,
+    'tags': 1,
+    'cuisine': 1,
+}
+
+# Cluster labels added from the processed corpus
+LABEL_COLUMNS = ['kmeans_cluster', 'hierarchical_cluster']
+
+# Case-insensitive comparison, so cuisine equality matches can use the cuisine index built with it
+CUISINE_COLLATION = {'locale': 'en', 'strength': 2}
+
+
+def ensure_indexes(collection):
+    """Create the case-insensitive cuisine index used to filter exports"""
+    collection.create_index('cuisine', collation=CUISINE_COLLATION)
+
+
+def _id_batches(recipe_ids: List[str], batch_size: int) -> Iterator[List]:
+    """Split recipe ids into $in batches of ObjectIds and plain string ids"""
+    for start in range(0, len(recipe_ids), batch_size):
+        batch = recipe_ids[start:start + batch_size]
+        yield [ObjectId(recipe_id) for recipe_id in batch if ObjectId.is_valid(recipe_id)] + batch
+
+
+def iter_recipes(collection,
+                 index=None,
+                 cluster: Optional[int] = None,
+                 cuisine: Optional[str] = None,
+                 fields: Optional[List[str]] = None,
+                 batch_size: int = 500) -> Iterator[Dict]:
+    """
+    Stream recipes from a server-side cursor, annotated with their cluster labels
+
+    Args:
+        collection: MongoDB recipes collection
+        index: RecipeIndex providing cluster labels by recipe id
+        cluster: Only export recipes of this KMeans cluster (requires index)
+        cuisine: Only export recipes of this cuisine
+        fields: Fields to export, EXPORT_PROJECTION if None
+        batch_size: Documents fetched per cursor round-trip
+    """
+    projection = {field: 1 for field in fields} if fields else EXPORT_PROJECTION
+    query, options = {}, {}
+    if cuisine:
+        query['cuisine'] = cuisine
+        options['collation'] = CUISINE_COLLATION
+
+    labels = {}
+    if index is not None:
+        labels = {column: index.labels(column) for column in LABEL_COLUMNS}
+        labels = {column: values for column, values in labels.items() if values is not None}
+
+    if cluster is not None:
+        if 'kmeans_cluster' not in labels:
+            return
+        # Cluster membership comes from the processed labels, fetched by _id in batches
+        rows = (labels['kmeans_cluster'] == cluster).nonzero()[0]
+        recipe_ids = index.row_ids[rows].tolist()
+        cursors = (
+            collection.find({**query, '_id': {'$in': batch}}, projection, **options).batch_size(batch_size)
+            for batch in _id_batches(recipe_ids, batch_size)
+        )
+    else:
+        cursors = [collection.find(query, projection, **options).sort('_id', 1).batch_size(batch_size)]
+
+    for cursor in cursors:
+        for document in cursor:
+            document['id'] = str(document.pop('_id'))
+            if labels:
+                row = index.get_row(document['id'])
+                if row is not None:
+                    for column, values in labels.items():
+                        document[column] = values[row]
+            yield document
+
+
+def iter_ndjson(documents: Iterator[Dict]) -> Iterator[bytes]:
+    """Encode documents as newline-delimited JSON, one line per chunk"""
+    for document in documents:
+        yield dumps(document) + b'\n'
+
+
+def iter_gzip(chunks: Iterator[bytes], level: int = 6, flush_bytes: int = 64 * 1024) -> Iterator[bytes]:
+    """Gzip-compress a stream of chunks on the fly, emitting about every flush_bytes of input"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    pending = 0
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_bytes:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,94 @@
+import time
+from typing import Optional
+from data.tracing import PROMETHEUS_CONTENT_TYPE, enabled, observe_request, render_metrics
+from backend.services.diagnostics import RequestDiagnostics
+
+# Route label of requests that matched no route, so unknown paths don't create series
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestTimingMiddleware:
+    """
+    ASGI middleware recording the handling time of every HTTP request by route template
+
+    Also runs the request diagnostics (slow-query log, opt-in profiling).
+    """
+    def __init__(self, app, diagnostics: Optional[RequestDiagnostics] = None):
+        self.app = app
+        self.diagnostics = diagnostics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (not enabled() and self.diagnostics is None):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {}
+        if self.diagnostics is not None and self.diagnostics.profile_header:
+            headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        state = self.diagnostics.begin(headers) if self.diagnostics is not None else None
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            if enabled():
+                observe_request(scope["method"], route, status[0], time.perf_counter() - start)
+            if state is not None:
+                self.diagnostics.end(state, scope["method"], scope["path"], route, status[0])
+
+
+def instrument_fastapi(app, diagnostics: Optional[RequestDiagnostics] = None):
+    """Time requests, run the request diagnostics and serve the metrics at /metrics on a FastAPI app"""
+    from fastapi import Response
+
+    app.add_middleware(RequestTimingMiddleware, diagnostics=diagnostics)
+
+    async def metrics():
+        return Response(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+    app.add_api_route("/metrics", metrics, methods=["GET"], include_in_schema=False)
+
+
+def instrument_flask(app, diagnostics: Optional[RequestDiagnostics] = None):
+    """Time requests, run the request diagnostics and serve the metrics at /metrics on a Flask app"""
+    from flask import Response, g, request
+
+    @app.before_request
+    def start_request_timer():
+        if enabled():
+            g.request_start = time.perf_counter()
+        if diagnostics is not None:
+            g.diagnostics_state = diagnostics.begin(request.headers)
+
+    @app.after_request
+    def record_request_time(response):
+        route = request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+        start = g.pop("request_start", None)
+        if start is not None:
+            observe_request(request.method, route, response.status_code, time.perf_counter() - start)
+        state = g.pop("diagnostics_state", None)
+        if state is not None:
+            diagnostics.end(state, request.method, request.path, route, response.status_code)
+        return response
+
+    @app.teardown_request
+    def end_failed_request(exc):
+        # after_request is skipped when a view raises
+        state = g.pop("diagnostics_state", None)
+        if state is not None:
+            route = request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+            diagnostics.end(state, request.method, request.path, route, 500)
+
+    def metrics():
+        return Response(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    app.add_url_rule("/metrics", "metrics", metrics)
@@ -0,0 +1,104 @@
+import base64
+import binascii
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+
+# Fields shipped with each recipe of a listing page; full recipes come from /recipes/<id>
+LISTING_PROJECTION = {
+    'title': 1,
+    'url': 1,
+    'image_url': 1,
+    'prep_time': 1,
+    'cook_time': 1,
+    'servings': 1,
+    'tags': 1,
+}
+
+
+# Cursor prefixes recording the type of the _id, since recipes may have ObjectId or string _ids
+OBJECT_ID_PREFIX = 'o:'
+STRING_ID_PREFIX = 's:'
+
+
+def encode_cursor(last_id) -> str:
+    """Encode the _id of the last recipe of a page as an opaque cursor"""
+    prefix = OBJECT_ID_PREFIX if isinstance(last_id, ObjectId) else STRING_ID_PREFIX
+    return base64.urlsafe_b64encode(f"{prefix}{last_id}".encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """Decode a cursor created by encode_cursor to the _id it holds, raising ValueError if it is invalid"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        if value.startswith(STRING_ID_PREFIX):
+            return value[len(STRING_ID_PREFIX):]
+        if value.startswith(OBJECT_ID_PREFIX):
+            return ObjectId(value[len(OBJECT_ID_PREFIX):])
+    except (binascii.Error, UnicodeError, InvalidId, ValueError):
+        pass
+    raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def fetch_page(collection,
+               cursor: Optional[str] = None,
+               limit: int = 10,
+               projection: Optional[Dict] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Fetch one page of recipes ordered by _id using keyset pagination
+
+    Each page is a range scan on the _id index starting after the cursor, so
+    its cost doesn't grow with the page number the way skip() does.
+
+    Returns:
+        (recipes, next_cursor): next_cursor is None on the last page
+    """
+    query = {}
+    if cursor:
+        last_id = decode_cursor(cursor)
+        if isinstance(last_id, ObjectId):
+            query['_id'] = {'$gt': last_id}
+        else:
+            # $gt only compares values of the same type, and strings sort before
+            # ObjectIds, so the walk continues with every ObjectId _id
+            query['$or'] = [{'_id': {'$gt': last_id}}, {'_id': {'$type': 'objectId'}}]
+
+    documents = list(
+        collection.find(query, LISTING_PROJECTION if projection is None else projection)
+        .sort('_id', 1)
+        .limit(limit + 1)
+    )
+
+    # One extra document tells us whether there is a next page without counting
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    next_cursor = encode_cursor(documents[-1]['_id']) if has_more else None
+
+    recipes = []
+    for document in documents:
+        document['id'] = str(document.pop('_id'))
+        recipes.append(document)
+    return recipes, next_cursor
+
+
+class CountCache:
+    """Estimated document count of a collection, cached for ttl seconds"""
+
+    def __init__(self, collection, ttl: float = 60.0):
+        self.collection = collection
+        self.ttl = ttl
+        self._count: Optional[int] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> int:
+        """Get the cached count, refreshing it from collection metadata when expired"""
+        with self._lock:
+            now = time.monotonic()
+            if self._count is None or now >= self._expires_at:
+                self._count = self.collection.estimated_document_count()
+                self._expires_at = now + self.ttl
+            return self._count
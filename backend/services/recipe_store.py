@@ -0,0 +1,145 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+from bson import ObjectId
+from data.tracing import span
+
+# Fields that are never sent to clients with a recipe
+DEFAULT_PROJECTION = {'scraped_at': 0, 'created_at': 0, 'updated_at': 0}
+
+
+def recipe_slug(url: str) -> str:
+    """Get the slug of a recipe URL (e.g. .../recipe/7063/amish-bread/ -> amish-bread)"""
+    parts = [part for part in urlparse(url).path.split('/') if part]
+    return parts[-1].lower() if parts else ''
+
+
+def recipe_key_query(key: str) -> Dict:
+    """Build an indexed MongoDB query for an ObjectId, URL or slug recipe key"""
+    if ObjectId.is_valid(key):
+        # Scraped documents use ObjectIds, imported ones may use plain strings
+        return {'_id': {'$in': [ObjectId(key), key]}}
+    if key.startswith(('http://', 'https://')):
+        return {'url': key}
+    return {'$or': [{'slug': key.lower()}, {'_id': key}]}
+
+
+class RecipeStore:
+    """Recipe lookups by ObjectId, slug or URL with a bounded LRU of hot recipes"""
+
+    def __init__(self, collection, cache_size: int = 1024, projection: Optional[Dict] = None):
+        self.collection = collection
+        self.cache_size = cache_size
+        self.projection = DEFAULT_PROJECTION if projection is None else projection
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ensure_indexes(self):
+        """Create the indexes used to resolve recipe keys"""
+        self.collection.create_index('url')
+        self.collection.create_index('slug', sparse=True)
+
+    @staticmethod
+    def _normalize(recipe: Dict) -> Dict:
+        """Replace the ObjectId of a document by its string id"""
+        recipe = dict(recipe)
+        if '_id' in recipe:
+            recipe['id'] = str(recipe.pop('_id'))
+        return recipe
+
+    def _cache_get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            recipe = self._cache.get(key)
+            if recipe is not None:
+                self._cache.move_to_end(key)
+            return recipe
+
+    def _cache_put(self, keys: Iterable[str], recipe: Dict):
+        with self._lock:
+            for key in keys:
+                self._cache[key] = recipe
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _remember(self, key: str, recipe: Dict):
+        """Cache a recipe under the requested key and its canonical id"""
+        self._cache_put({key, recipe['id']}, recipe)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Get a recipe by ObjectId, slug or URL"""
+        recipe = self._cache_get(key)
+        if recipe is not None:
+            return recipe
+
+        with span("mongo.recipe_store.get"):
+            document = self.collection.find_one(recipe_key_query(key), self.projection)
+        if document is None:
+            return None
+
+        recipe = self._normalize(document)
+        self._remember(key, recipe)
+        return recipe
+
+    def get_many(self, keys: List[str]) -> List[Dict]:
+        """Get several recipes by id with one query for the cache misses, keeping the order of keys"""
+        found = self.get_by_keys(keys)
+        return [found[key] for key in keys if key in found]
+
+    def get_by_keys(self, keys: List[str]) -> Dict[str, Dict]:
+        """Get several recipes by ObjectId, slug or URL, keyed by the requested key (missing keys are left out)"""
+        found = {}
+        missing = []
+        for key in keys:
+            recipe = self._cache_get(key)
+            if recipe is not None:
+                found[key] = recipe
+            elif key not in missing:
+                missing.append(key)
+
+        object_ids = [ObjectId(key) for key in missing if ObjectId.is_valid(key)]
+        if missing:
+            query = {'_id': {'$in': object_ids + missing}}
+            with span("mongo.recipe_store.get_many"):
+                documents = list(self.collection.find(query, self.projection))
+            for document in documents:
+                recipe = self._normalize(document)
+                self._remember(recipe['id'], recipe)
+                found[recipe['id']] = recipe
+
+        # Keys that are not ids (slugs, URLs) need their own lookup
+        for key in missing:
+            if key not in found:
+                recipe = self.get(key)
+                if recipe is not None:
+                    found[key] = recipe
+
+        return found
+
+    def complete(self, recipes: List[Dict], fields: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Add the fields an index result lacks (e.g. ingredients, instructions) from the stored recipes
+
+        Args:
+            recipes: Recipes carrying at least their id
+            fields: Fields to return per recipe, all fields if None
+        """
+        documents = {recipe['id']: recipe for recipe in self.get_many([recipe['id'] for recipe in recipes])}
+        completed = []
+        for recipe in recipes:
+            recipe = {**documents.get(recipe['id'], {}), **recipe}
+            if fields is not None:
+                recipe = {field: recipe[field] for field in fields if field in recipe}
+            completed.append(recipe)
+        return completed
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one recipe, or every recipe, from the cache"""
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                recipe = self._cache.pop(key, None)
+                if recipe is not None:
+                    self._cache.pop(recipe['id'], None)
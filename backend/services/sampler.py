@@ -0,0 +1,127 @@
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+# Label columns of the processed recipes that can be used to filter samples
+LABEL_COLUMNS = ['kmeans_cluster', 'hierarchical_cluster', 'cuisine']
+
+
+class RecipeSampler:
+    """Uniform random recipe ids drawn from an in-memory id array"""
+
+    def __init__(self, seed: Optional[int] = None):
+        self._ids = np.empty(0, dtype=object)
+        self._groups: Dict[str, Dict[object, np.ndarray]] = {}
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self.refreshed_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def age(self) -> float:
+        """Seconds since the sampler was last refreshed"""
+        return time.time() - self.refreshed_at
+
+    def refresh(self, ids: Sequence[str], labels: Optional[Dict[str, Sequence]] = None):
+        """Replace the sampled ids and the labels they can be filtered by"""
+        new_ids = np.asarray([str(recipe_id) for recipe_id in ids], dtype=object)
+
+        # Group row positions by label value once, so filtered draws don't scan
+        new_groups = {name: self._group_rows(values) for name, values in (labels or {}).items()}
+
+        # Swap both references together so readers never mix versions
+        with self._lock:
+            self._ids, self._groups = new_ids, new_groups
+            self.refreshed_at = time.time()
+
+    def refresh_from_index(self, index) -> bool:
+        """Refresh from a RecipeIndex, including its cluster labels"""
+        if index is None or not len(index):
+            return False
+
+        labels = {column: index.labels(column) for column in LABEL_COLUMNS}
+        self.refresh(index.row_ids, {column: values for column, values in labels.items() if values is not None})
+        return True
+
+    def refresh_from_collection(self, collection) -> bool:
+        """Refresh from the ids (and cuisines) of a MongoDB collection"""
+        ids, cuisines = [], []
+        for document in collection.find({}, {'_id': 1, 'cuisine': 1}):
+            ids.append(str(document['_id']))
+            cuisines.append(document.get('cuisine'))
+
+        self.refresh(ids, {'cuisine': cuisines})
+        return bool(ids)
+
+    @classmethod
+    def _group_rows(cls, values) -> Dict[object, np.ndarray]:
+        """Row positions of each label, by normalized label (see _label_key)"""
+        values = np.asarray(values)
+        if values.dtype == object:
+            # np.unique cannot order None against strings, so number the distinct values with a dict
+            code_of: Dict[object, int] = {}
+            codes = np.fromiter((code_of.setdefault(value, len(code_of)) for value in values.tolist()),
+                                dtype=np.int64, count=len(values))
+            distinct = list(code_of)
+        else:
+            distinct, codes = np.unique(values, return_inverse=True)
+            distinct = distinct.tolist()
+
+        # Rows sorted by label code, cut where the code changes
+        order = np.argsort(codes.ravel(), kind='stable')
+        bounds = np.searchsorted(codes.ravel()[order], np.arange(len(distinct) + 1))
+        groups: Dict[object, np.ndarray] = {}
+        for code, value in enumerate(distinct):
+            rows = order[bounds[code]:bounds[code + 1]].astype(np.int64)
+            key = cls._label_key(value)
+            # Labels that normalize alike ('Italian' and 'italian') share a group
+            groups[key] = np.sort(np.concatenate([groups[key], rows])) if key in groups else rows
+        return groups
+
+    @staticmethod
+    def _label_key(value):
+        """Normalize a label so '2', 2 and 2.0 clusters or 'Italian'/'italian' match"""
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return None
+        if isinstance(value, str):
+            stripped = value.strip().lower()
+            return int(stripped) if stripped.lstrip('-').isdigit() else stripped
+        if isinstance(value, (int, np.integer)) or float(value).is_integer():
+            return int(value)
+        return value
+
+    def sample(self,
+               n: int = 1,
+               cluster=None,
+               cuisine: Optional[str] = None,
+               cluster_method: str = 'kmeans') -> List[str]:
+        """
+        Draw up to n distinct recipe ids uniformly at random
+
+        Args:
+            n: Number of recipe ids to draw
+            cluster: Only draw recipes from this cluster
+            cuisine: Only draw recipes of this cuisine
+            cluster_method: Clustering the cluster label comes from ('kmeans' or 'hierarchical')
+        """
+        with self._lock:
+            ids, groups = self._ids, self._groups
+
+            pool = None
+            filters = [(f'{cluster_method}_cluster', cluster), ('cuisine', cuisine)]
+            for name, value in filters:
+                if value is None:
+                    continue
+                rows = groups.get(name, {}).get(self._label_key(value), np.empty(0, dtype=np.int64))
+                pool = rows if pool is None else np.intersect1d(pool, rows, assume_unique=True)
+
+            size = len(ids) if pool is None else len(pool)
+            if n <= 0 or size == 0:
+                return []
+
+            picks = self._rng.choice(size, size=min(n, size), replace=False)
+            rows = picks if pool is None else pool[picks]
+            return ids[rows].tolist()
@@ -0,0 +1 @@
+# Benchmarks for the Ingreedy search, processing and serving hot paths
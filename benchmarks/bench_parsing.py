@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+"""
+Recipe page parsing throughput, in pages per second on one core
+
+Parses fixture pages with every mode of data.recipe_parser: the full
+html.parser tree the scrapers used to build, the CSS fallback on each
+installed backend with SoupStrainer-limited trees, and the JSON-LD fast
+path. Fixture pages are generated (AllRecipes-like markup with a JSON-LD
+block and the usual navigation, ads and scripts), or read from a
+directory of saved .html pages with --pages.
+
+Usage:
+    python -m benchmarks.bench_parsing [--pages DIR] [--count N]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from typing import Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.recipe_parser import ALLRECIPES_LAYOUT, available_backends, recipe_from_html, recipe_from_json_ld
+
+WORDS = ("flour sugar butter garlic onion chicken salt pepper olive oil tomato basil cheese cream "
+         "rice beans lemon ginger honey vinegar mustard paprika cumin thyme parsley").split()
+
+
+def _words(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def make_page(i: int, seed: int = 42, filler_blocks: int = 60) -> str:
+    """An AllRecipes-like recipe page with a JSON-LD block, about 70 KB with the default filler"""
+    rng = random.Random(seed + i)
+    title = f"Recipe {i} with {_words(rng, 2)}"
+    ingredients = [f"{rng.randint(1, 4)} cup {_words(rng, 2)}, chopped" for _ in range(rng.randint(6, 14))]
+    steps = [_words(rng, rng.randint(12, 30)).capitalize() + "." for _ in range(rng.randint(4, 9))]
+    breadcrumbs = ["Recipes", "Main Dishes", rng.choice(["Chicken", "Pasta", "Soup", "Salad"])]
+    json_ld = [{
+        "@context": "http://schema.org",
+        "@type": ["Recipe", "NewsArticle"],
+        "name": title,
+        "image": {"@type": "ImageObject", "url": f"https://images.example.com/{i}.jpg"},
+        "recipeIngredient": ingredients,
+        "recipeInstructions": [{"@type": "HowToStep", "text": step} for step in steps],
+        "prepTime": "PT15M",
+        "cookTime": f"PT1H{rng.randint(0, 50)}M",
+        "recipeYield": [str(rng.randint(2, 8))],
+        "recipeCategory": [breadcrumbs[-1]],
+    }, {
+        "@type": "BreadcrumbList",
+        "itemListElement": [
+            {"@type": "ListItem", "position": n + 1, "item": {"@id": f"https://example.com/{n}", "name": name}}
+            for n, name in enumerate(breadcrumbs)
+        ],
+    }]
+
+    filler = "".join(
+        f'<div class="comp card-list__item mntl-block"><a class="comp mntl-card-list-items mntl-document-card" '
+        f'href="https://www.allrecipes.com/recipe/{rng.randint(1, 99999)}/x/"><div class="card__content">'
+        f'<span class="card__title"><span class="card__title-text">{_words(rng, 5)}</span></span>'
+        f'<div class="mntl-recipe-star-rating"><svg class="icon"><use href="#icon-star"></use></svg></div>'
+        f'<p class="card__description">{_words(rng, 40)}</p></div></a></div>'
+        f'<script>window.dataLayer=window.dataLayer||[];dataLayer.push({{"slot":{n}, "v":"{_words(rng, 8)}"}});</script>'
+        for n in range(filler_blocks)
+    )
+    nav = "".join(f'<li class="mntl-header-nav__item"><a href="/recipes/{n}/">{_words(rng, 2)}</a></li>' for n in range(80))
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{title}</title>
+<style>{'.c{color:red}' * 500}</style>
+<script type="application/ld+json">{json.dumps(json_ld)}</script>
+</head><body class="mntl-body">
+<header><ul class="mntl-header-nav">{nav}</ul></header>
+<nav class="mntl-breadcrumbs">{''.join(f'<a class="mntl-breadcrumbs__link" href="/b/{n}">{name}</a>' for n, name in enumerate(breadcrumbs))}</nav>
+<article><h1 class="article-heading">{title}</h1>
+<img class="primary-image" src="https://images.example.com/{i}.jpg">
+<div class="mntl-recipe-details">
+<div class="mntl-recipe-details__item mntl-recipe-details__item--prep-time">Prep Time: 15 mins</div>
+<div class="mntl-recipe-details__item mntl-recipe-details__item--cook-time">Cook Time: 1 hr</div>
+<div class="mntl-recipe-details__item mntl-recipe-details__item--servings">Servings: 4</div></div>
+<ul class="mntl-structured-ingredients__list">{''.join(f'<li class="mntl-structured-ingredients__list-item"><p><span>{text}</span></p></li>' for text in ingredients)}</ul>
+<ol>{''.join(f'<li class="comp mntl-sc-block-group--LI"><p class="comp mntl-sc-block">{step}</p></li>' for step in steps)}</ol>
+</article><aside>{filler}</aside><footer>{nav}</footer></body></html>"""
+
+
+def load_pages(directory: str) -> List[str]:
+    """Saved .html pages of a directory"""
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith((".html", ".htm")):
+            with open(os.path.join(directory, name), encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+    return pages
+
+
+def modes() -> Dict[str, Callable[[str], Dict]]:
+    """Parsing modes to time, the scrapers' old full html.parser tree first"""
+    timed = {"soup_full.html.parser": lambda page: recipe_from_html(page, ALLRECIPES_LAYOUT, "html.parser", strain=False)}
+    for backend in reversed(available_backends()):
+        timed[f"css.{backend}"] = lambda page, backend=backend: recipe_from_html(page, ALLRECIPES_LAYOUT, backend)
+    timed["json_ld"] = recipe_from_json_ld
+    return timed
+
+
+def time_mode(parse: Callable[[str], Dict], pages: List[str], min_seconds: float = 1.0) -> Dict:
+    """Pages parsed per second on one core (repeats the pages for at least min_seconds)"""
+    parsed, start = 0, time.perf_counter()
+    while True:
+        for page in pages:
+            parse(page)
+        parsed += len(pages)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+    return {"pages_per_second": round(parsed / elapsed, 1), "ms_per_page": round(elapsed / parsed * 1000, 3)}
+
+
+def run(pages: List[str] = None, count: int = 20) -> Dict:
+    """Time every parsing mode and check the CSS modes read the same fields as the full tree"""
+    pages = pages or [make_page(i) for i in range(count)]
+    timed = modes()
+    reference = [timed["soup_full.html.parser"](page) for page in pages]
+    results = {
+        "pages": len(pages),
+        "kb_per_page": round(sum(len(page.encode("utf-8")) for page in pages) / len(pages) / 1024, 1),
+    }
+    for name, parse in timed.items():
+        result = time_mode(parse, pages)
+        parsed = [parse(page) for page in pages]
+        result["found_recipes"] = round(sum(bool(fields and fields["ingredients"]) for fields in parsed) / len(pages), 3)
+        if name.startswith("css."):
+            result["same_as_full_tree"] = parsed == reference
+        results[name] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recipe page parsing benchmark")
+    parser.add_argument("--pages", help="Directory of saved recipe pages (.html) instead of generated ones")
+    parser.add_argument("--count", type=int, default=20, help="Generated pages")
+    args = parser.parse_args()
+
+    results = run(load_pages(args.pages) if args.pages else None, args.count)
+    print(f"Parsing {results['pages']} pages of {results['kb_per_page']} KB on one core:")
+    baseline = results["soup_full.html.parser"]["pages_per_second"]
+    for name, result in results.items():
+        if isinstance(result, dict):
+            print(f"  {name:24s} {result['pages_per_second']:9.1f} pages/s  {result['ms_per_page']:8.3f} ms/page  "
+                  f"{result['pages_per_second'] / baseline:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
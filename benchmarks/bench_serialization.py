@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Microbenchmark of API response serialization per 100 search results
+
+Compares the encoders the APIs used before (FastAPI's jsonable_encoder +
+json.dumps, Flask's default jsonify provider) against
+backend.services.encoding.dumps.
+"""
+import os
+import sys
+import json
+import timeit
+import numpy as np
+from bson import ObjectId
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.encoding import dumps
+
+
+def make_results(n_results: int = 100, seed: int = 42):
+    """Search results shaped like RecipeProcessor rows: NumPy scalars, NaN and ObjectIds"""
+    rng = np.random.default_rng(seed)
+    results = []
+    for i in range(n_results):
+        results.append({
+            "_id": ObjectId(),
+            "id": str(i),
+            "title": f"Recipe {i}",
+            "url": f"https://www.allrecipes.com/recipe/{i}/recipe-{i}/",
+            "image_url": None if i % 3 else f"https://images.example.com/{i}.jpg",
+            "ingredients": [f"{j + 1} cup ingredient {j}" for j in range(12)],
+            "ingredients_simple": [f"ingredient {j}" for j in range(12)],
+            "instructions": ["Mix everything together and cook until done."] * 6,
+            "prep_time": "10 mins",
+            "cook_time": "25 mins",
+            "calories_per_serving": np.float64(np.nan) if i % 5 == 0 else np.float64(rng.integers(100, 900)),
+            "kmeans_cluster": np.int32(rng.integers(0, 5)),
+            "hierarchical_cluster": np.int64(rng.integers(0, 5)),
+            "similarity": np.float64(rng.random()),
+            "matched": ["ingredient 1"],
+            "missing": ["ingredient 2"],
+        })
+    return {"ingredients": ["ingredient 1", "ingredient 2"], "recipes": results, "count": n_results}
+
+
+def encode_fastapi_default(content):
+    """What FastAPI did before: jsonable_encoder, then Starlette's json.dumps"""
+    from fastapi.encoders import jsonable_encoder
+    encoded = jsonable_encoder(content, custom_encoder={ObjectId: str})
+    return json.dumps(encoded, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_fastapi_patched(content):
+    """jsonable_encoder taught about ObjectIds and NumPy scalars; NaN is emitted as invalid JSON"""
+    from fastapi.encoders import jsonable_encoder
+    encoded = jsonable_encoder(content, custom_encoder={ObjectId: str, np.generic: lambda value: value.item()})
+    return json.dumps(encoded, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_flask_default(content):
+    """What Flask did before: the default jsonify provider"""
+    from flask import Flask
+    from flask.json.provider import DefaultJSONProvider
+    return DefaultJSONProvider(Flask(__name__)).dumps(content).encode("utf-8")
+
+
+def time_encoder(encoder, content, repeat: int = 5, number: int = 50):
+    """Best time per call in milliseconds, or the error the encoder raised"""
+    try:
+        encoder(content)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    best = min(timeit.repeat(lambda: encoder(content), repeat=repeat, number=number)) / number
+    return {"ms": round(best * 1000, 4), "bytes": len(encoder(content))}
+
+
+def run(n_results: int = 100):
+    """Time every encoder on n_results results"""
+    content = make_results(n_results)
+    return {
+        "n_results": n_results,
+        "fastapi_jsonable_encoder": time_encoder(encode_fastapi_default, content),
+        "fastapi_jsonable_encoder_patched": time_encoder(encode_fastapi_patched, content),
+        "flask_default_provider": time_encoder(encode_flask_default, content),
+        "encoding.dumps": time_encoder(dumps, content),
+    }
+
+
+def main():
+    results = run()
+    print(f"Serialization of {results['n_results']} results:")
+    for name, result in results.items():
+        if name == "n_results":
+            continue
+        if "error" in result:
+            print(f"  {name:34s} failed: {result['error'][:60]}")
+        else:
+            print(f"  {name:34s} {result['ms']:8.3f} ms  {result['bytes']} bytes")
+
+
+if __name__ == "__main__":
+    main()
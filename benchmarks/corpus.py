@@ -0,0 +1,128 @@
+"""
+Synthetic recipe corpus with a realistic (Zipf) ingredient distribution
+
+A handful of staples (salt, butter, garlic...) appear in most recipes and a
+long tail of ingredients appears in very few, like on AllRecipes.com.
+"""
+import numpy as np
+import pandas as pd
+from typing import List
+
+# Common ingredients first, so they get the most popular Zipf ranks
+STAPLES = [
+    "salt", "butter", "garlic", "onion", "eggs", "all-purpose flour", "white sugar", "olive oil",
+    "black pepper", "milk", "water", "vegetable oil", "brown sugar", "vanilla extract", "baking soda",
+    "chicken breast", "lemon juice", "baking powder", "parmesan cheese", "heavy cream", "tomatoes",
+    "ground beef", "cheddar cheese", "soy sauce", "green onions", "carrots", "celery", "honey",
+    "cinnamon", "potatoes", "rice", "pasta", "bell pepper", "mushrooms", "sour cream", "basil",
+    "ginger", "chicken broth", "cream cheese", "bacon", "shrimp", "salmon", "spinach", "lime",
+]
+ADJECTIVES = ["fresh", "dried", "smoked", "roasted", "ground", "frozen", "sweet", "spicy", "wild", "pickled"]
+NOUNS = ["fennel", "leek", "quinoa", "tahini", "chorizo", "saffron", "miso", "kale", "okra", "plantain",
+         "tamarind", "cardamom", "farro", "halibut", "pancetta", "sumac", "yuzu", "gruyere", "lentils", "barley"]
+UNITS = ["1 cup", "2 tablespoons", "1 teaspoon", "1/2 cup", "3 cloves", "1 pound", "4 ounces", "1 pinch"]
+PREP = ["", "", ", chopped", ", minced", ", diced", ", sliced", ", divided", ", softened"]
+CUISINES = ["Italian", "Mexican", "Asian", "American", "French", "Indian", "Mediterranean"]
+DIET_TYPES = ["None", "Vegetarian", "Vegan", "Gluten-Free"]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+def parse_size(size: str) -> int:
+    """Turn '10k' / '1M' / '2500' into a number of recipes"""
+    return SIZES.get(size.lower(), None) or int(size)
+
+
+def ingredient_vocabulary(vocab_size: int) -> List[str]:
+    """Staples followed by generated long-tail ingredient names"""
+    names = list(STAPLES)
+    i = 0
+    while len(names) < vocab_size:
+        adjective = ADJECTIVES[i % len(ADJECTIVES)]
+        noun = NOUNS[(i // len(ADJECTIVES)) % len(NOUNS)]
+        variant = i // (len(ADJECTIVES) * len(NOUNS))
+        names.append(f"{adjective} {noun}" + (f" {variant}" if variant else ""))
+        i += 1
+    return names[:vocab_size]
+
+
+def zipf_probabilities(n: int, exponent: float = 1.1) -> np.ndarray:
+    """Probability of each rank 1..n under a Zipf law"""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def generate_corpus(n_recipes: int,
+                    vocab_size: int = 2000,
+                    min_ingredients: int = 4,
+                    max_ingredients: int = 14,
+                    exponent: float = 1.1,
+                    seed: int = 42) -> pd.DataFrame:
+    """
+    Generate a DataFrame of recipes shaped like the scraped ones
+
+    Args:
+        n_recipes: Number of recipes
+        vocab_size: Number of distinct ingredients
+        min_ingredients: Minimum ingredients per recipe
+        max_ingredients: Maximum ingredients per recipe
+        exponent: Zipf exponent of ingredient popularity
+        seed: Random seed, so runs are comparable
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(ingredient_vocabulary(vocab_size), dtype=object)
+    probabilities = zipf_probabilities(vocab_size, exponent)
+
+    counts = rng.integers(min_ingredients, max_ingredients + 1, size=n_recipes)
+    # Oversample then de-duplicate each recipe's draws
+    draws = rng.choice(vocab_size, size=(n_recipes, max_ingredients * 2), p=probabilities)
+    units = rng.integers(0, len(UNITS), size=draws.shape)
+    preps = rng.integers(0, len(PREP), size=draws.shape)
+
+    ingredients, ingredients_simple = [], []
+    for row in range(n_recipes):
+        _, first = np.unique(draws[row], return_index=True)
+        picks = np.sort(first)[:counts[row]]
+        simple = vocabulary[draws[row, picks]].tolist()
+        ingredients_simple.append(simple)
+        ingredients.append([
+            f"{UNITS[units[row, j]]} {name}{PREP[preps[row, j]]}"
+            for j, name in zip(picks, simple)
+        ])
+
+    return pd.DataFrame({
+        "id": [str(i) for i in range(n_recipes)],
+        "title": [f"Recipe {i}" for i in range(n_recipes)],
+        "url": [f"https://www.allrecipes.com/recipe/{i}/recipe-{i}/" for i in range(n_recipes)],
+        "ingredients": ingredients,
+        "ingredients_simple": ingredients_simple,
+        "instructions": [["Prepare the ingredients.", "Cook until done.", "Serve."]] * n_recipes,
+        "image_url": None,
+        "prep_time": [f"{m} mins" for m in rng.integers(5, 40, size=n_recipes)],
+        "cook_time": [f"{m} mins" for m in rng.integers(5, 180, size=n_recipes)],
+        "servings": "4",
+        "cuisine": rng.choice(CUISINES, size=n_recipes),
+        "diet_type": rng.choice(DIET_TYPES, size=n_recipes),
+        "difficulty": rng.choice(DIFFICULTIES, size=n_recipes),
+        "calories_per_serving": rng.integers(100, 1200, size=n_recipes),
+    })
+
+
+def generate_queries(n_queries: int,
+                     vocab_size: int = 2000,
+                     min_ingredients: int = 1,
+                     max_ingredients: int = 6,
+                     exponent: float = 1.1,
+                     seed: int = 7) -> List[List[str]]:
+    """Generate ingredient queries; popular ingredients are asked for more often"""
+    rng = np.random.default_rng(seed)
+    vocabulary = ingredient_vocabulary(vocab_size)
+    probabilities = zipf_probabilities(vocab_size, exponent)
+
+    queries = []
+    for _ in range(n_queries):
+        size = rng.integers(min_ingredients, max_ingredients + 1)
+        picks = rng.choice(vocab_size, size=size, replace=False, p=probabilities)
+        queries.append([vocabulary[i] for i in picks])
+    return queries
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+"""
+Run the benchmark scenarios over synthetic corpora and save the results as JSON
+
+Usage:
+    python -m benchmarks.run --sizes 1k,10k --output results.json
+    python -m benchmarks.run --sizes 10k --compare benchmarks/results/baseline.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import scenarios
+from benchmarks.corpus import generate_corpus, generate_queries, parse_size
+from benchmarks.bench_serialization import run as run_serialization
+from benchmarks.bench_parsing import run as run_parsing
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+SCENARIOS = ["vectorize", "kmeans", "hierarchical", "find_recipes", "recommendations", "index", "vectorizers", "ann", "parallel",
+             "api_search", "serialization", "parsing"]
+
+
+def environment() -> Dict:
+    """Versions and commit the results were measured with"""
+    import numpy
+    import pandas
+    import sklearn
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=scenarios.ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+
+def run_size(n_recipes: int, args, selected: List[str]) -> Dict:
+    """Run the selected scenarios over a corpus of n_recipes"""
+    print(f"\n== {n_recipes} recipes ==")
+    start = time.perf_counter()
+    corpus = generate_corpus(n_recipes, vocab_size=args.vocab_size, seed=args.seed)
+    queries = generate_queries(args.queries, vocab_size=args.vocab_size, seed=args.seed + 1)
+    results = {"corpus_seconds": round(time.perf_counter() - start, 4)}
+
+    processor = scenarios.build_processor(corpus)
+    # Later scenarios need the vectors and KMeans labels, so those always run
+    stages = [
+        ("vectorize", lambda: scenarios.bench_vectorize(processor)),
+        ("kmeans", lambda: scenarios.bench_kmeans(processor, args.clusters)),
+        ("hierarchical", lambda: scenarios.bench_hierarchical(processor, args.clusters, args.max_hierarchical)),
+        ("find_recipes", lambda: scenarios.bench_find_recipes(processor, queries, args.max_results)),
+        ("recommendations", lambda: scenarios.bench_recommendations(processor, args.queries)),
+        ("index", lambda: scenarios.bench_index(processor, queries, args.max_results)),
+        ("vectorizers", lambda: scenarios.bench_vectorizers(corpus, queries, args.max_results)),
+        ("ann", lambda: scenarios.bench_ann(processor, queries, args.max_results)),
+        ("parallel", lambda: scenarios.bench_parallel(corpus)),
+        ("api_search", lambda: scenarios.bench_api_search(processor, corpus, queries, args.max_results)),
+    ]
+    for name, stage in stages:
+        if name not in selected and name not in ("vectorize", "kmeans"):
+            continue
+        results[name] = stage()
+        print(f"  {name:16s} {summary(results[name])}")
+    return results
+
+
+def summary(result: Dict) -> str:
+    """One-line summary of a scenario result"""
+    if "skipped" in result:
+        return f"skipped: {result['skipped']}"
+    if "seconds" in result:
+        return f"{result['seconds']:.3f} s"
+    parts = []
+    for name, value in result.items():
+        if isinstance(value, dict) and "p50_ms" in value:
+            parts.append(f"{name} p50={value['p50_ms']:.2f} p95={value['p95_ms']:.2f} p99={value['p99_ms']:.2f} ms")
+        elif isinstance(value, dict) and "matrix_mb" in value:
+            parts.append(f"{name} {value['matrix_mb']:.2f} MB p50={value['search']['p50_ms']:.2f} ms")
+        elif isinstance(value, dict) and "vectorize_seconds" in value:
+            parts.append(f"{name} vectorize={value['vectorize_seconds']:.2f} s ({value['speedup']}x)")
+        elif isinstance(value, dict) and "pages_per_second" in value:
+            parts.append(f"{name} {value['pages_per_second']:.0f} pages/s")
+        elif isinstance(value, dict) and "embedding_mb" in value:
+            probes = [
+                f"{key} recall={probe['recall_at_k']} p50={probe['search']['p50_ms']:.2f} ms"
+                for key, probe in value.items() if key.startswith("probes_")
+            ]
+            parts.append(f"{name} {value['embedding_mb']:.2f} MB: " + ", ".join(probes))
+    if "p50_ms" in result:
+        parts.append(f"p50={result['p50_ms']:.2f} p95={result['p95_ms']:.2f} p99={result['p99_ms']:.2f} ms")
+    return "; ".join(parts)
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    """Flatten nested results into 'size.scenario.metric' -> value for timing metrics"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and (key.endswith("_ms") or key.endswith("seconds")):
+            flat[name] = value
+    return flat
+
+
+def compare(previous: Dict, current: Dict, threshold: float = 0.1) -> List[str]:
+    """Timing metrics at least threshold slower than in a previous run"""
+    before = flatten(previous.get("sizes", {}))
+    after = flatten(current.get("sizes", {}))
+    regressions = []
+    for name, value in after.items():
+        baseline = before.get(name)
+        if baseline and value > baseline * (1 + threshold):
+            regressions.append(f"{name}: {baseline} -> {value} ({value / baseline - 1:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingreedy benchmark suite")
+    parser.add_argument("--sizes", default="1k,10k", help="Corpus sizes, e.g. 1k,10k,100k,1M")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Scenarios to run")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per latency scenario")
+    parser.add_argument("--max-results", type=int, default=5)
+    parser.add_argument("--clusters", type=int, default=5)
+    parser.add_argument("--vocab-size", type=int, default=2000, help="Distinct ingredients in the corpus")
+    parser.add_argument("--max-hierarchical", type=int, default=5000,
+                        help="Largest corpus to run hierarchical clustering on")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Previous results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Slowdown reported as a regression")
+    args = parser.parse_args()
+
+    selected = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = {"environment": environment(), "sizes": {}}
+    for size in args.sizes.split(","):
+        n_recipes = parse_size(size.strip())
+        results["sizes"][str(n_recipes)] = run_size(n_recipes, args, selected)
+    if "serialization" in selected:
+        results["serialization"] = run_serialization()
+    if "parsing" in selected:
+        results["parsing"] = run_parsing()
+        print(f"\n  {'parsing':16s} {summary(results['parsing'])}")
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions against {args.compare}:")
+            for regression in regressions:
+                print(f"  {regression}")
+        else:
+            print(f"\nNo regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Timed scenarios over a synthetic corpus
+
+Each scenario returns a dict of measurements (seconds for one-off stages,
+milliseconds and percentiles for per-query latencies), or {"skipped": reason}.
+"""
+import io
+import os
+import time
+import contextlib
+import importlib.util
+import numpy as np
+from typing import Callable, Dict, List, Sequence
+
+from benchmarks.corpus import CUISINES, DIET_TYPES
+from data.processor import RecipeProcessor
+from data.index import RecipeIndex
+from data.vectorizers import PROFILES
+from data.parallel import resolve_workers
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FASTAPI_APP_PATH = os.path.join(ROOT_DIR, "backend", "api", "main.py")
+
+
+def quiet(func: Callable, *args, **kwargs):
+    """Call func with its progress prints silenced"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def timed(func: Callable, *args, **kwargs) -> float:
+    """Seconds taken by one quiet call of func"""
+    start = time.perf_counter()
+    quiet(func, *args, **kwargs)
+    return time.perf_counter() - start
+
+
+def latency_stats(seconds: List[float]) -> Dict:
+    """Summarize per-call latencies in milliseconds"""
+    ms = np.asarray(seconds) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "n": len(ms),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "max_ms": round(float(ms.max()), 4),
+    }
+
+
+def measure(calls: List[Callable], warmup: int = 5) -> Dict:
+    """Latency stats of a list of calls, after a few warmup calls"""
+    for call in calls[:warmup]:
+        quiet(call)
+    seconds = []
+    for call in calls:
+        start = time.perf_counter()
+        quiet(call)
+        seconds.append(time.perf_counter() - start)
+    return latency_stats(seconds)
+
+
+def build_processor(corpus, vectorizer_profile: str = "default") -> RecipeProcessor:
+    """A processor holding the corpus, preprocessed but not vectorized"""
+    processor = RecipeProcessor(vectorizer_profile)
+    processor.recipes_df = corpus.copy()
+    quiet(processor.preprocess_ingredients)
+    return processor
+
+
+def bench_vectorize(processor: RecipeProcessor) -> Dict:
+    """Fit the TF-IDF vectorizer on the corpus"""
+    seconds = timed(processor.vectorize_ingredients)
+    vectors = processor.ingredients_vectors
+    return {
+        "seconds": round(seconds, 4),
+        "n_features": int(vectors.shape[1]),
+        "nnz": int(vectors.nnz),
+    }
+
+
+def bench_kmeans(processor: RecipeProcessor, n_clusters: int = 5) -> Dict:
+    """Fit KMeans on the ingredient vectors"""
+    return {"seconds": round(timed(processor.apply_kmeans_clustering, n_clusters), 4)}
+
+
+def bench_hierarchical(processor: RecipeProcessor, n_clusters: int = 5, max_recipes: int = 5000) -> Dict:
+    """Fit agglomerative clustering, which needs the dense matrix and quadratic memory"""
+    n_recipes = len(processor.recipes_df)
+    if n_recipes > max_recipes:
+        return {"skipped": f"{n_recipes} recipes is above the hierarchical limit of {max_recipes}"}
+    return {"seconds": round(timed(processor.apply_hierarchical_clustering, n_clusters), 4)}
+
+
+def bench_find_recipes(processor: RecipeProcessor,
+                       queries: List[List[str]],
+                       max_results: int = 5,
+                       seed: int = 0) -> Dict:
+    """find_recipes_by_ingredients latencies, without and with filters"""
+    rng = np.random.default_rng(seed)
+    unfiltered = [
+        lambda query=query: processor.find_recipes_by_ingredients(query, max_results=max_results)
+        for query in queries
+    ]
+    filtered = [
+        lambda query=query, cuisine=rng.choice(CUISINES), diet=rng.choice(DIET_TYPES):
+            processor.find_recipes_by_ingredients(
+                query,
+                cuisine_type=cuisine,
+                diet_type=diet,
+                max_cook_time=60,
+                max_results=max_results
+            )
+        for query in queries
+    ]
+    return {"no_filters": measure(unfiltered), "filters": measure(filtered)}
+
+
+def bench_recommendations(processor: RecipeProcessor,
+                          n_queries: int = 200,
+                          max_results: int = 3,
+                          k: int = 10,
+                          seed: int = 0) -> Dict:
+    """get_recipe_recommendations latencies by cosine scan and from the neighbor table"""
+    rng = np.random.default_rng(seed)
+    recipe_ids = rng.choice(processor.row_ids, size=n_queries).tolist()
+    calls = [
+        lambda recipe_id=recipe_id: processor.get_recipe_recommendations(recipe_id, max_results)
+        for recipe_id in recipe_ids
+    ]
+
+    processor.neighbor_table = None
+    results = {"scan": measure(calls)}
+    results["neighbor_table_build_seconds"] = round(timed(processor.build_recipe_neighbors, k), 4)
+    results["neighbor_table"] = measure(calls)
+    return results
+
+
+def bench_index(processor: RecipeProcessor,
+                queries: List[List[str]],
+                max_results: int = 5) -> Dict:
+    """Build the read-only RecipeIndex, compare its size with the processor's and time its searches"""
+    start = time.perf_counter()
+    index = RecipeIndex.from_processor(processor)
+    build_seconds = time.perf_counter() - start
+
+    vectors = processor.ingredients_vectors
+    processor_bytes = int(processor.recipes_df.memory_usage(deep=True).sum()
+                          + vectors.data.nbytes + vectors.indices.nbytes + vectors.indptr.nbytes)
+    calls = [
+        lambda query=query: index.find_recipes_by_ingredients(query, max_results=max_results)
+        for query in queries
+    ]
+    return {
+        "build_seconds": round(build_seconds, 4),
+        "index_mb": round(index.nbytes / 1e6, 2),
+        "processor_mb": round(processor_bytes / 1e6, 2),
+        "search": measure(calls),
+    }
+
+
+def bench_vectorizers(corpus,
+                      queries: List[List[str]],
+                      max_results: int = 5) -> Dict:
+    """
+    Fit time, matrix size and search latency of every vectorizer profile
+
+    Searches run through a RecipeIndex of each profile; top_k_overlap is the
+    mean share of each query's results also returned by the default profile.
+    """
+    results = {}
+    baseline = None
+    for profile in PROFILES:
+        processor = build_processor(corpus, profile)
+        fit_seconds = timed(processor.vectorize_ingredients)
+        vectors = processor.ingredients_vectors
+        index = RecipeIndex.from_processor(processor, embedding_dims=0)
+        calls = [
+            lambda query=query: index.find_recipes_by_ingredients(query, max_results=max_results, fields=['id'])
+            for query in queries
+        ]
+        top_ids = [
+            {recipe['id'] for recipe in index.find_recipes_by_ingredients(query, max_results=max_results, fields=['id'])}
+            for query in queries
+        ]
+        if baseline is None:
+            baseline = top_ids
+        overlap = [len(ids & base) / max(len(base), 1) for ids, base in zip(top_ids, baseline)]
+        results[profile] = {
+            "fit_seconds": round(fit_seconds, 4),
+            "n_features": int(vectors.shape[1]),
+            "nnz": int(vectors.nnz),
+            "dtype": str(vectors.dtype),
+            "matrix_mb": round((vectors.data.nbytes + vectors.indices.nbytes + vectors.indptr.nbytes) / 1e6, 3),
+            "top_k_overlap": round(float(np.mean(overlap)), 3),
+            "search": measure(calls),
+        }
+    return results
+
+
+def bench_ann(processor: RecipeProcessor,
+              queries: List[List[str]],
+              max_results: int = 5,
+              dims: Sequence[int] = (64, 128, 256),
+              probes: Sequence[int] = (4, 16, 64)) -> Dict:
+    """
+    Build time, size, latency and recall@k of the approximate engine for each embedding size
+
+    recall_at_k is the mean share of each query's exact top max_results that
+    the approximate search also returns.
+    """
+    exact_index = RecipeIndex.from_processor(processor, embedding_dims=0)
+    exact_ids = [
+        {recipe['id'] for recipe in exact_index.find_recipes_by_ingredients(query, max_results=max_results, fields=['id'])}
+        for query in queries
+    ]
+    results = {"exact": measure([
+        lambda query=query: exact_index.find_recipes_by_ingredients(query, max_results=max_results, fields=['id'])
+        for query in queries
+    ])}
+
+    for n_dims in dims:
+        start = time.perf_counter()
+        index = RecipeIndex.from_processor(processor, embedding_dims=n_dims)
+        build_seconds = time.perf_counter() - start
+        if index.embedding is None:
+            continue
+        result = {
+            "build_seconds": round(build_seconds, 4),
+            "dims": index.embedding.dims,
+            "n_lists": index.embedding.n_lists,
+            "embedding_mb": round(index.embedding.nbytes / 1e6, 2),
+        }
+        for n_probes in probes:
+            index.embedding.probes = n_probes
+            found = [
+                {recipe['id'] for recipe in index.find_recipes_by_ingredients(
+                    query, max_results=max_results, fields=['id'], engine='ann')}
+                for query in queries
+            ]
+            recall = [len(ids & exact) / len(exact) for ids, exact in zip(found, exact_ids) if exact]
+            result[f"probes_{n_probes}"] = {
+                "recall_at_k": round(float(np.mean(recall)), 3) if recall else None,
+                "search": measure([
+                    lambda query=query: index.find_recipes_by_ingredients(
+                        query, max_results=max_results, fields=['id'], engine='ann')
+                    for query in queries
+                ]),
+            }
+        results[f"dims_{n_dims}"] = result
+    return results
+
+
+def bench_parallel(corpus, chunk_size: int = 10000, max_neighbor_recipes: int = 20000) -> Dict:
+    """
+    Rebuild stages with 1, 2, 4, ... workers up to the available cores
+
+    Times the chunked vectorization (worker processes) and the neighbor
+    table (threads); speedup is relative to one worker.
+    """
+    results = {}
+    counts = sorted({1, resolve_workers()} | {2 ** i for i in range(1, 8) if 2 ** i < resolve_workers()})
+    for workers in counts:
+        processor = build_processor(corpus)
+        vectorize_seconds = timed(processor.vectorize_ingredients, workers=workers, chunk_size=chunk_size)
+        result = {"vectorize_seconds": round(vectorize_seconds, 4)}
+        if len(corpus) <= max_neighbor_recipes:
+            result["neighbors_seconds"] = round(timed(processor.build_recipe_neighbors, workers=workers), 4)
+        results[f"workers_{workers}"] = result
+
+    baseline = results["workers_1"]
+    for result in results.values():
+        result["speedup"] = round(baseline["vectorize_seconds"] / result["vectorize_seconds"], 2)
+    return results
+
+
+def _load_fastapi_app():
+    """Import backend/api/main.py under its own module name"""
+    spec = importlib.util.spec_from_file_location("ingreedy_benchmark_api", FASTAPI_APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    quiet(spec.loader.exec_module, module)
+    return module
+
+
+def bench_api_search(processor: RecipeProcessor,
+                     corpus,
+                     queries: List[List[str]],
+                     max_results: int = 5,
+                     seed_recipes: int = 200) -> Dict:
+    """
+    POST /recipes/search latencies through the FastAPI app and its ASGI test client
+
+    MongoDB is replaced by mongomock, seeded with a slice of the corpus so the
+    app can start; searches then run against the benchmark's processor.
+    """
+    try:
+        import mongomock
+        from fastapi.testclient import TestClient
+    except ImportError as e:
+        return {"skipped": f"needs mongomock and httpx ({e})"}
+
+    from data.mongo import close_clients, get_collection
+
+    os.environ["MONGO_URI"] = "mongodb://localhost:27017"
+    patcher = mongomock.patch(servers=(("localhost", 27017),))
+    patcher.start()
+    # Shared clients are created on first use, so new ones connect to mongomock
+    close_clients()
+    try:
+        collection = get_collection("recipes")
+        collection.delete_many({})
+        collection.insert_many(corpus.head(seed_recipes).drop(columns=['id']).to_dict('records'))
+
+        api = _load_fastapi_app()
+        # Serve an index of the benchmark's processor instead of loading one at startup
+        api.index_manager.swap(RecipeIndex.from_processor(processor, embedding_dims=0))
+
+        with TestClient(api.app) as client:
+            calls = [
+                lambda query=query: client.post(
+                    "/recipes/search",
+                    json={"ingredients": query, "max_results": max_results}
+                ).raise_for_status()
+                for query in queries
+            ]
+            return measure(calls)
+    finally:
+        close_clients()
+        patcher.stop()
@@ -0,0 +1,18 @@
+import pytest
+from benchmarks.corpus import generate_corpus, generate_queries
+from data.processor import RecipeProcessor
+
+@pytest.fixture
+def make_processor():
+    """Build a vectorized RecipeProcessor over a small synthetic corpus"""
+    def make(n_recipes=300, profile="default", seed=42):
+        processor = RecipeProcessor(profile)
+        processor.recipes_df = generate_corpus(n_recipes, vocab_size=150, seed=seed)
+        processor.preprocess_ingredients()
+        processor.vectorize_ingredients(workers=1)
+        return processor
+    return make
+
+@pytest.fixture
+def queries():
+    return generate_queries(30, vocab_size=150)
@@ -0,0 +1,178 @@
+import os
+import numpy as np
+from typing import Dict, Optional
+
+# Dimensions of the dense recipe embeddings built with each index (0 disables them)
+EMBEDDING_DIMS = int(os.getenv("EMBEDDING_DIMS", 128))
+
+# Inverted lists of the approximate index (0 picks about the square root of the recipe count)
+ANN_LISTS = int(os.getenv("ANN_LISTS", 0))
+
+# Lists scanned per query: more finds more of the exact top results but is slower
+ANN_PROBES = int(os.getenv("ANN_PROBES", 16))
+
+# Approximate candidates re-scored with the exact TF-IDF similarity, per requested result
+ANN_RERANK = int(os.getenv("ANN_RERANK", 4))
+
+# Retrieval engines a search can use: exact TF-IDF scan or approximate nearest neighbors
+SEARCH_ENGINES = ['exact', 'ann']
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class RecipeEmbedding:
+    """
+    Dense LSA embeddings of the recipe vectors with an inverted-file (IVF) index
+
+    The TF-IDF matrix is reduced with TruncatedSVD to float32, L2-normalized
+    embeddings, which are grouped into lists around KMeans centroids. A
+    query is projected the same way and only the rows of the probes lists
+    with the closest centroids are scored, so the work per query grows with
+    the square root of the corpus instead of its size. Building needs
+    scikit-learn; searching needs only NumPy.
+    """
+    def __init__(self,
+                 columns: np.ndarray,
+                 components: np.ndarray,
+                 centroids: np.ndarray,
+                 list_offsets: np.ndarray,
+                 list_rows: np.ndarray,
+                 list_embeddings: np.ndarray):
+        # Projection of the TF-IDF columns that occur in the corpus (other columns project to zero)
+        self.columns = np.asarray(columns, dtype=np.int64)
+        self.components = np.asarray(components, dtype=np.float32)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        # Rows and embeddings stored list by list, so each probed list is one contiguous slice
+        self.list_offsets = np.asarray(list_offsets, dtype=np.int64)
+        self.list_rows = np.asarray(list_rows, dtype=np.int64)
+        self.list_embeddings = np.asarray(list_embeddings, dtype=np.float32)
+        for array in (self.columns, self.components, self.centroids,
+                      self.list_offsets, self.list_rows, self.list_embeddings):
+            array.flags.writeable = False
+        # Search settings, adjustable per index
+        self.probes = ANN_PROBES
+        self.rerank = ANN_RERANK
+
+    @property
+    def dims(self) -> int:
+        return self.components.shape[1]
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, vectors, dims: int = EMBEDDING_DIMS, n_lists: int = ANN_LISTS) -> Optional["RecipeEmbedding"]:
+        """
+        Embed L2-normalized recipe vectors and group them into lists
+
+        Args:
+            vectors: Sparse (CSR) TF-IDF matrix, one row per recipe
+            dims: Embedding dimensions (capped by the corpus size and vocabulary)
+            n_lists: Number of inverted lists, 0 for about sqrt(recipes)
+
+        Returns:
+            The embedding, or None if the corpus is too small to reduce
+        """
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.cluster import MiniBatchKMeans
+
+        n_rows = vectors.shape[0]
+        columns = np.unique(vectors.indices)
+        dims = min(dims, len(columns) - 1, n_rows - 1)
+        if dims < 1:
+            return None
+
+        svd = TruncatedSVD(n_components=dims, algorithm='randomized', random_state=42)
+        embeddings = _normalize_rows(svd.fit_transform(vectors[:, columns]).astype(np.float32))
+        components = svd.components_.T.astype(np.float32)
+
+        n_lists = n_lists or int(round(np.sqrt(n_rows)))
+        n_lists = max(1, min(n_lists, n_rows))
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=42, n_init=3, batch_size=4096)
+        kmeans.fit(embeddings)
+        centroids = _normalize_rows(kmeans.cluster_centers_.astype(np.float32))
+
+        # Assign by cosine similarity, the score queries use to pick lists
+        labels = np.empty(n_rows, dtype=np.int64)
+        for start in range(0, n_rows, 65536):
+            labels[start:start + 65536] = np.argmax(embeddings[start:start + 65536] @ centroids.T, axis=1)
+        order = np.argsort(labels, kind='stable')
+        list_offsets = np.searchsorted(labels[order], np.arange(n_lists + 1))
+        return cls(columns, components, centroids, list_offsets, order, embeddings[order])
+
+    def embed(self, query) -> np.ndarray:
+        """L2-normalized embedding of a one-row TF-IDF query (zeros if it has no known column)"""
+        positions = np.searchsorted(self.columns, query.indices)
+        positions = np.minimum(positions, len(self.columns) - 1)
+        known = self.columns[positions] == query.indices
+        embedding = query.data[known].astype(np.float32) @ self.components[positions[known]]
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+
+    def search(self, query, k: int, mask: Optional[np.ndarray] = None, probes: Optional[int] = None) -> np.ndarray:
+        """
+        Approximate top-k rows for a one-row TF-IDF query, best first
+
+        Args:
+            query: Sparse (CSR) query vector
+            k: Number of rows to return
+            mask: Optional boolean filter over all rows; rows where it is False are skipped
+            probes: Number of lists to scan (the index's probes setting by default)
+        """
+        embedding = self.embed(query)
+        if k <= 0 or not embedding.any():
+            return np.empty(0, dtype=np.int64)
+
+        list_scores = self.centroids @ embedding
+        probes = min(max(probes or self.probes, 1), self.n_lists)
+        probed = np.argpartition(-list_scores, probes - 1)[:probes] if probes < self.n_lists else np.arange(self.n_lists)
+
+        positions = np.concatenate([
+            np.arange(self.list_offsets[list_id], self.list_offsets[list_id + 1]) for list_id in probed
+        ])
+        rows = self.list_rows[positions]
+        if mask is not None:
+            keep = mask[rows]
+            positions, rows = positions[keep], rows[keep]
+        if len(rows) == 0:
+            return rows
+
+        scores = self.list_embeddings[positions] @ embedding
+        if len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        return rows[np.argsort(-scores, kind='stable')]
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Arrays to store with the index (see from_arrays)"""
+        return {
+            'embedding_columns': self.columns,
+            'embedding_components': self.components,
+            'embedding_centroids': self.centroids,
+            'embedding_list_offsets': self.list_offsets,
+            'embedding_list_rows': self.list_rows,
+            'embedding_list_embeddings': self.list_embeddings,
+        }
+
+    @classmethod
+    def from_arrays(cls, data) -> Optional["RecipeEmbedding"]:
+        """Rebuild an embedding from stored arrays, None if they were not stored"""
+        if 'embedding_components' not in data:
+            return None
+        return cls(
+            data['embedding_columns'],
+            data['embedding_components'],
+            data['embedding_centroids'],
+            data['embedding_list_offsets'],
+            data['embedding_list_rows'],
+            data['embedding_list_embeddings']
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.arrays().values())
@@ -0,0 +1,119 @@
+import os
+import numpy as np
+from typing import List, Optional
+from data.lazy import lazy_import
+
+pd = lazy_import("pandas")
+sparse = lazy_import("scipy.sparse")
+
+# Default location of the processed artifacts
+PROCESSED_DIR = os.path.join("data", "processed_data")
+
+# Heavy text columns, stored apart so serving processes can skip them
+TEXT_COLUMNS = ['ingredients', 'instructions', 'ingredients_text']
+
+# Integer label columns that JSON used to turn into floats
+LABEL_COLUMNS = ['kmeans_cluster', 'hierarchical_cluster']
+
+RECIPES_FILE = "recipes.parquet"
+RECIPES_TEXT_FILE = "recipes_text.parquet"
+VECTORS_FILE = "ingredients_vectors.npz"
+LEGACY_JSON_FILE = "processed_recipes.json"
+
+
+def _arrow_safe(recipes_df: 'pd.DataFrame') -> 'pd.DataFrame':
+    """Make object columns storable in Parquet, keeping lists as list columns"""
+    import pyarrow as pa
+
+    recipes_df = recipes_df.drop(columns=['_id'], errors='ignore').copy()
+    for column in LABEL_COLUMNS:
+        if column in recipes_df.columns:
+            recipes_df[column] = recipes_df[column].fillna(-1).astype(np.int32)
+
+    for column in recipes_df.columns[recipes_df.dtypes == object]:
+        try:
+            pa.array(recipes_df[column], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed types (e.g. numbers and strings) are stored as strings
+            recipes_df[column] = recipes_df[column].map(lambda value: None if value is None else str(value))
+    return recipes_df
+
+
+def _to_lists(recipes_df: 'pd.DataFrame') -> 'pd.DataFrame':
+    """Turn the NumPy arrays Parquet list columns load as back into lists"""
+    for column in recipes_df.columns[recipes_df.dtypes == object]:
+        first = recipes_df[column].dropna().head(1)
+        if len(first) and isinstance(first.iloc[0], np.ndarray):
+            recipes_df[column] = recipes_df[column].map(
+                lambda value: value.tolist() if isinstance(value, np.ndarray) else value
+            )
+    return recipes_df
+
+
+def save_recipes_table(recipes_df: 'pd.DataFrame', directory: str = PROCESSED_DIR):
+    """
+    Save the processed recipes as columnar Parquet files
+
+    Light columns (id, titles, times, filters, cluster labels) go to
+    recipes.parquet and the heavy text columns to recipes_text.parquet,
+    both keyed by id.
+    """
+    os.makedirs(directory, exist_ok=True)
+    recipes_df = _arrow_safe(recipes_df)
+
+    text_columns = [column for column in TEXT_COLUMNS if column in recipes_df.columns]
+    light_df = recipes_df.drop(columns=text_columns)
+    text_df = recipes_df[['id'] + text_columns]
+
+    light_df.to_parquet(os.path.join(directory, RECIPES_FILE), index=False)
+    text_df.to_parquet(os.path.join(directory, RECIPES_TEXT_FILE), index=False)
+
+
+def has_recipes_table(directory: str = PROCESSED_DIR) -> bool:
+    """Whether processed recipes were saved (as Parquet or legacy JSON) in directory"""
+    return (os.path.exists(os.path.join(directory, RECIPES_FILE))
+            or os.path.exists(os.path.join(directory, LEGACY_JSON_FILE)))
+
+
+def load_recipes_table(directory: str = PROCESSED_DIR,
+                       columns: Optional[List[str]] = None,
+                       include_text: bool = True) -> 'pd.DataFrame':
+    """
+    Load processed recipes saved by save_recipes_table
+
+    Args:
+        directory: Directory holding the artifacts
+        columns: Light columns to load (id is always included), all if None
+        include_text: Also load the heavy text columns
+
+    Falls back to the legacy processed_recipes.json when there is no Parquet table.
+    """
+    recipes_path = os.path.join(directory, RECIPES_FILE)
+    if not os.path.exists(recipes_path):
+        return pd.read_json(os.path.join(directory, LEGACY_JSON_FILE))
+
+    if columns is not None:
+        columns = ['id'] + [column for column in columns if column != 'id']
+    recipes_df = _to_lists(pd.read_parquet(recipes_path, columns=columns))
+
+    text_path = os.path.join(directory, RECIPES_TEXT_FILE)
+    if include_text and os.path.exists(text_path):
+        text_df = _to_lists(pd.read_parquet(text_path))
+        # Both files are written in the same row order
+        recipes_df = pd.concat([recipes_df, text_df.drop(columns=['id'])], axis=1)
+
+    return recipes_df
+
+
+def save_vectors(vectors, directory: str = PROCESSED_DIR):
+    """Save the ingredient vectors as a compressed sparse matrix"""
+    os.makedirs(directory, exist_ok=True)
+    sparse.save_npz(os.path.join(directory, VECTORS_FILE), sparse.csr_matrix(vectors))
+
+
+def load_vectors(directory: str = PROCESSED_DIR):
+    """Load the ingredient vectors, or None if they were not saved"""
+    vectors_path = os.path.join(directory, VECTORS_FILE)
+    if not os.path.exists(vectors_path):
+        return None
+    return sparse.load_npz(vectors_path).tocsr()
@@ -0,0 +1,269 @@
+"""
+Persistent crawl frontier for the recipe scrapers
+
+Every URL a scraper discovers is stored once, under its canonical form,
+in a SQLite database together with its state (pending, fetched, failed),
+attempt count and the time it is next due: at once for new URLs, after
+an exponential backoff for failures, and once its refresh interval has
+passed for fetched pages. Progress is committed after every page, so a
+restarted scraper continues exactly where it stopped and later runs only
+revisit pages that are due.
+"""
+import os
+import re
+import time
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+# Frontier database, next to the scraper's raw data
+FRONTIER_PATH = os.getenv("FRONTIER_PATH", os.path.join("raw_data", "frontier.sqlite3"))
+
+# Days before a fetched recipe page is due again (refresh runs revisit stale pages only)
+RECIPE_REFRESH_DAYS = float(os.getenv("FRONTIER_RECIPE_REFRESH_DAYS", 30))
+
+# Hours before a category listing page is due again (listings change more often)
+LISTING_REFRESH_HOURS = float(os.getenv("FRONTIER_LISTING_REFRESH_HOURS", 24))
+
+# Failed fetches are retried after RETRY_BASE_SECONDS * 2^(attempt - 1), up to MAX_ATTEMPTS
+# attempts; URLs that keep failing are only tried again at their next refresh
+RETRY_BASE_SECONDS = float(os.getenv("FRONTIER_RETRY_BASE_SECONDS", 300))
+MAX_ATTEMPTS = int(os.getenv("FRONTIER_MAX_ATTEMPTS", 5))
+
+PENDING = "pending"
+FETCHED = "fetched"
+FAILED = "failed"
+
+RECIPE = "recipe"
+LISTING = "listing"
+
+# Query parameters that never change the page
+TRACKING_PARAMS = re.compile(r"^(utm_.*|fbclid|gclid|mc_cid|mc_eid|ref|src)$", re.IGNORECASE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    canonical_url TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    category TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    discovered_at REAL NOT NULL,
+    fetched_at REAL,
+    due_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS urls_due ON urls (kind, due_at);
+"""
+
+
+def canonical_url(url: str, base: Optional[str] = None) -> str:
+    """
+    Canonical form of a URL, used to recognize the same page behind different links
+
+    Resolves relative links against base, treats http and https and the
+    www. prefix alike, drops fragments, tracking parameters, default ports
+    and trailing slashes, and sorts the remaining query parameters.
+    """
+    parts = urlsplit(urljoin(base, url) if base else url.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not TRACKING_PARAMS.match(name)
+    ))
+    return urlunsplit(("https", host, path, query, ""))
+
+
+@dataclass
+class FrontierEntry:
+    """A URL of the frontier and its crawl state"""
+    url: str
+    canonical_url: str
+    kind: str
+    category: Optional[str]
+    priority: int
+    state: str
+    attempts: int
+    fetched_at: Optional[float]
+    due_at: float
+
+
+class CrawlFrontier:
+    """
+    SQLite-backed set of discovered URLs with their crawl state
+
+    Args:
+        path: Database file (":memory:" for a throwaway frontier)
+        refresh_after: Seconds before a fetched page is due again, by kind
+        max_attempts: Failed fetches before a URL waits for its next refresh
+    """
+    def __init__(self,
+                 path: str = FRONTIER_PATH,
+                 refresh_after: Optional[Dict[str, float]] = None,
+                 max_attempts: int = MAX_ATTEMPTS,
+                 retry_base: float = RETRY_BASE_SECONDS):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.refresh_after = {
+            RECIPE: RECIPE_REFRESH_DAYS * 86400,
+            LISTING: LISTING_REFRESH_HOURS * 3600,
+            **(refresh_after or {}),
+        }
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        # WAL keeps every committed page durable without blocking readers
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self) -> "CrawlFrontier":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+
+    def __contains__(self, url: str) -> bool:
+        return self.db.execute(
+            "SELECT 1 FROM urls WHERE canonical_url = ?", (canonical_url(url),)
+        ).fetchone() is not None
+
+    def add_many(self,
+                 urls: Iterable[str],
+                 kind: str = RECIPE,
+                 category: Optional[str] = None,
+                 priority: int = 0,
+                 now: Optional[float] = None) -> int:
+        """
+        Add discovered URLs as pending; returns how many were new
+
+        URLs already in the frontier keep their state. A higher-priority
+        (lower number) rediscovery raises the URL's priority.
+        """
+        now = time.time() if now is None else now
+        added = 0
+        with self.db:
+            for url in urls:
+                cursor = self.db.execute(
+                    "INSERT OR IGNORE INTO urls (canonical_url, url, kind, category, priority, state, discovered_at, due_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (canonical_url(url), url, kind, category, priority, PENDING, now, now)
+                )
+                if cursor.rowcount:
+                    added += 1
+                else:
+                    self.db.execute(
+                        "UPDATE urls SET priority = ? WHERE canonical_url = ? AND priority > ?",
+                        (priority, canonical_url(url), priority)
+                    )
+        return added
+
+    def add(self, url: str, kind: str = RECIPE, category: Optional[str] = None, priority: int = 0) -> bool:
+        """Add one URL; True if it was new"""
+        return self.add_many([url], kind=kind, category=category, priority=priority) == 1
+
+    def seed_fetched(self, pages: Iterable[Tuple[str, Optional[float]]], kind: str = RECIPE) -> int:
+        """Record pages fetched before the frontier existed as (url, fetched_at) pairs; returns how many were new"""
+        added = 0
+        with self.db:
+            for url, fetched_at in pages:
+                fetched_at = fetched_at or 0.0
+                cursor = self.db.execute(
+                    "INSERT OR IGNORE INTO urls (canonical_url, url, kind, state, discovered_at, fetched_at, due_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (canonical_url(url), url, kind, FETCHED, fetched_at, fetched_at,
+                     fetched_at + self.refresh_after[kind])
+                )
+                added += cursor.rowcount
+        return added
+
+    def due(self, kind: str = RECIPE, limit: int = 100, now: Optional[float] = None) -> List[FrontierEntry]:
+        """
+        URLs due for a visit, most important first
+
+        New URLs come before retries and retries before stale pages; within
+        each group, by priority (lower first) and then by how long they
+        have been due.
+        """
+        now = time.time() if now is None else now
+        rows = self.db.execute(
+            "SELECT url, canonical_url, kind, category, priority, state, attempts, fetched_at, due_at "
+            "FROM urls WHERE kind = ? AND due_at <= ? "
+            "ORDER BY CASE state WHEN ? THEN 0 WHEN ? THEN 1 ELSE 2 END, priority, due_at "
+            "LIMIT ?",
+            (kind, now, PENDING, FAILED, limit)
+        ).fetchall()
+        return [FrontierEntry(**dict(row)) for row in rows]
+
+    def iter_due(self, kind: str = RECIPE, batch_size: int = 100) -> Iterator[FrontierEntry]:
+        """
+        Yield due URLs until none are left
+
+        Each URL must be marked fetched or failed before the next batch is
+        read, which moves it out of the due set.
+        """
+        while True:
+            batch = self.due(kind, batch_size)
+            if not batch:
+                return
+            yield from batch
+
+    def mark_fetched(self, url: str, now: Optional[float] = None):
+        """Record a successful fetch; the URL is due again after its refresh interval"""
+        now = time.time() if now is None else now
+        key = canonical_url(url)
+        row = self.db.execute("SELECT kind FROM urls WHERE canonical_url = ?", (key,)).fetchone()
+        refresh_after = self.refresh_after.get(row["kind"] if row else RECIPE, self.refresh_after[RECIPE])
+        with self.db:
+            self.db.execute(
+                "UPDATE urls SET state = ?, attempts = 0, last_error = NULL, fetched_at = ?, due_at = ? "
+                "WHERE canonical_url = ?",
+                (FETCHED, now, now + refresh_after, key)
+            )
+
+    def mark_failed(self, url: str, error: str = "", now: Optional[float] = None):
+        """Record a failed fetch and schedule the retry (exponential backoff)"""
+        now = time.time() if now is None else now
+        key = canonical_url(url)
+        row = self.db.execute("SELECT kind, attempts FROM urls WHERE canonical_url = ?", (key,)).fetchone()
+        if row is None:
+            return
+        attempts = row["attempts"] + 1
+        if attempts < self.max_attempts:
+            retry_at = now + self.retry_base * 2 ** (attempts - 1)
+        else:
+            retry_at = now + self.refresh_after.get(row["kind"], self.refresh_after[RECIPE])
+        with self.db:
+            self.db.execute(
+                "UPDATE urls SET state = ?, attempts = ?, last_error = ?, due_at = ? WHERE canonical_url = ?",
+                (FAILED, attempts, str(error)[:500], retry_at, key)
+            )
+
+    def stats(self, now: Optional[float] = None) -> Dict[str, Dict[str, int]]:
+        """URL counts by kind and state, plus how many of each kind are due now"""
+        now = time.time() if now is None else now
+        stats: Dict[str, Dict[str, int]] = {}
+        for row in self.db.execute(
+            "SELECT kind, state, COUNT(*) AS n, SUM(due_at <= ?) AS due FROM urls GROUP BY kind, state", (now,)
+        ):
+            kind_stats = stats.setdefault(row["kind"], {"due": 0})
+            kind_stats[row["state"]] = row["n"]
+            kind_stats["due"] += row["due"] or 0
+        return stats
@@ -0,0 +1,573 @@
+import os
+import re
+import json
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from data.lazy import lazy_import
+from data.neighbors import NeighborTable
+from data.tracing import span
+from data.artifacts import PROCESSED_DIR
+from data.vectorizers import RecipeVectorizer, hashed_column, query_text
+from data.ann import EMBEDDING_DIMS, SEARCH_ENGINES, RecipeEmbedding
+from data.ranking import add_matches, annotate_search, recommend, top_rows
+
+sparse = lazy_import("scipy.sparse")
+
+INDEX_FILE = "index.npz"
+
+# Recipe columns kept in the index: what searches return by default and filter on
+INDEX_COLUMNS = ['title', 'url', 'image_url', 'prep_time', 'cook_time', 'total_time', 'servings',
+                 'cuisine', 'diet_type', 'difficulty', 'calories_per_serving',
+                 'kmeans_cluster', 'hierarchical_cluster']
+
+# Text columns filtered on by case-insensitive equality, stored as category codes
+CATEGORY_COLUMNS = ['cuisine', 'diet_type', 'difficulty']
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+class QueryVectorizer:
+    """
+    TF-IDF transform of a fitted vectorizer, as plain arrays
+
+    Reproduces TfidfVectorizer.transform for word analyzers (lowercasing,
+    token pattern, n-grams, stop words, sublinear tf, l2 norm), and the
+    hashing profile's HashingVectorizer + IDF, without scikit-learn, so
+    serving processes only need NumPy and SciPy.
+    """
+    def __init__(self, terms: Sequence[str], idf: Optional[np.ndarray], config: Dict):
+        self.terms = _read_only(np.asarray(terms, dtype=object))
+        self.vocabulary: Dict[str, int] = {term: column for column, term in enumerate(self.terms)}
+        self.idf = None if idf is None else _read_only(np.asarray(idf, dtype=np.float32))
+        self.config = dict(config)
+        self._token_re = re.compile(self.config['token_pattern'])
+        self._stop_words = frozenset(self.config.get('stop_words') or ())
+        # Column count of hashing vectorizers, which have no vocabulary
+        self._hash_features = self.config.get('hash_features')
+
+    @classmethod
+    def from_sklearn(cls, vectorizer) -> "QueryVectorizer":
+        """Extract the vocabulary, idf weights and settings of a fitted RecipeVectorizer or TfidfVectorizer"""
+        input_type, idf_model = 'text', None
+        if isinstance(vectorizer, RecipeVectorizer):
+            input_type, idf_model = vectorizer.input, vectorizer.idf_model
+            vectorizer = vectorizer.model
+        if (vectorizer.analyzer != 'word' or vectorizer.tokenizer is not None
+                or vectorizer.preprocessor is not None or vectorizer.strip_accents is not None):
+            raise ValueError("Only word analyzers with the default tokenizer can be frozen")
+
+        stop_words = vectorizer.get_stop_words()
+        config = {
+            'input': input_type,
+            'lowercase': vectorizer.lowercase,
+            'token_pattern': vectorizer.token_pattern,
+            'ngram_range': list(vectorizer.ngram_range),
+            'stop_words': sorted(stop_words) if stop_words else [],
+            'binary': vectorizer.binary,
+        }
+        if idf_model is not None:
+            # HashingVectorizer counts, weighted and normalized by the TfidfTransformer
+            config.update({
+                'hash_features': vectorizer.n_features,
+                'sublinear_tf': idf_model.sublinear_tf,
+                'norm': idf_model.norm,
+            })
+            return cls([], idf_model.idf_ if idf_model.use_idf else None, config)
+
+        terms = [None] * len(vectorizer.vocabulary_)
+        for term, column in vectorizer.vocabulary_.items():
+            terms[column] = term
+        config.update({
+            'sublinear_tf': getattr(vectorizer, 'sublinear_tf', False),
+            'norm': getattr(vectorizer, 'norm', None),
+        })
+        idf = vectorizer.idf_ if getattr(vectorizer, 'use_idf', False) else None
+        return cls(terms, idf, config)
+
+    @property
+    def n_features(self) -> int:
+        return self._hash_features or len(self.terms)
+
+    def query_text(self, ingredients: Sequence[str]) -> str:
+        """Text a list of searched ingredients is vectorized from"""
+        return query_text(ingredients, self.config.get('input', 'text'))
+
+    def column(self, term: str) -> Optional[int]:
+        """Feature column of a term, None if it is not in the vocabulary"""
+        if self._hash_features:
+            return hashed_column(term, self._hash_features)
+        return self.vocabulary.get(term)
+
+    def tokens(self, text: str) -> List[str]:
+        """Terms of a text, as the fitted vectorizer's analyzer produces them"""
+        if self.config['lowercase']:
+            text = text.lower()
+        words = [word for word in self._token_re.findall(text) if word not in self._stop_words]
+        min_n, max_n = self.config['ngram_range']
+        if max_n == 1:
+            return words
+        terms = list(words) if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            terms.extend(' '.join(words[i:i + n]) for i in range(len(words) - n + 1))
+        return terms
+
+    def transform(self, texts: Sequence[str]):
+        """Vectorize texts into a float32 CSR matrix"""
+        indptr, indices, values = [0], [], []
+        for text in texts:
+            counts: Dict[int, int] = {}
+            for term in self.tokens(text):
+                column = self.column(term)
+                if column is not None:
+                    counts[column] = counts.get(column, 0) + 1
+            indices.extend(sorted(counts))
+            values.extend(counts[column] for column in sorted(counts))
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int32)),
+            shape=(len(texts), self.n_features)
+        )
+        if self.config['binary']:
+            matrix.data[:] = 1
+        elif self.config['sublinear_tf']:
+            np.log(matrix.data, out=matrix.data)
+            matrix.data += 1
+        if self.idf is not None:
+            matrix.data *= self.idf[matrix.indices]
+        if self.config['norm'] == 'l2':
+            lengths = self._row_sums(matrix.data ** 2, matrix.indptr)
+            self._scale_rows(matrix, None if lengths is None else np.sqrt(lengths))
+        elif self.config['norm'] == 'l1':
+            self._scale_rows(matrix, self._row_sums(np.abs(matrix.data), matrix.indptr))
+        return matrix
+
+    @staticmethod
+    def _row_sums(values: np.ndarray, indptr: np.ndarray) -> Optional[np.ndarray]:
+        """Sum of each row's values, None if there are none (garbage for empty rows)"""
+        if not len(values):
+            return None
+        # Trailing empty rows start at len(values), which reduceat only accepts with a padding value
+        return np.add.reduceat(np.append(values, values.dtype.type(0)), indptr[:-1])
+
+    @staticmethod
+    def _scale_rows(matrix, lengths):
+        """Divide every non-empty row by its length (reduceat gives garbage for empty rows)"""
+        if lengths is None:
+            return
+        row_nnz = np.diff(matrix.indptr)
+        lengths = np.where((row_nnz > 0) & (lengths > 0), lengths, 1).astype(np.float32)
+        matrix.data /= np.repeat(lengths, row_nnz)
+
+
+class RecipeIndex:
+    """
+    Read-only search index over processed recipes
+
+    Holds only arrays: the query vectorizer's vocabulary and idf weights,
+    the float32 recipe vectors, the id map, filter and display columns,
+    the KMeans centroids, the neighbor table and optionally the dense
+    embeddings of the approximate search engine. It is built once from a
+    processor or saved artifacts and never modified afterwards, so it can
+    be shared by request threads without locks; swap in a new index to
+    pick up new data.
+    """
+    def __init__(self,
+                 vectorizer: QueryVectorizer,
+                 vectors,
+                 ids: Sequence[str],
+                 columns: Dict[str, np.ndarray],
+                 centroids: Optional[np.ndarray] = None,
+                 neighbor_table: Optional[NeighborTable] = None,
+                 version: Optional[str] = None,
+                 indexed_fields: Optional[Sequence[str]] = None,
+                 embedding: Optional[RecipeEmbedding] = None):
+        self.vectorizer = vectorizer
+        self.vectors = sparse.csr_matrix(vectors, dtype=np.float32, copy=True)
+        for array in (self.vectors.data, self.vectors.indices, self.vectors.indptr):
+            _read_only(array)
+        self.row_ids = _read_only(np.asarray([str(recipe_id) for recipe_id in ids], dtype=object))
+        self.id_to_row: Dict[str, int] = {recipe_id: row for row, recipe_id in enumerate(self.row_ids)}
+        # Copies, so freezing them never touches the arrays of a DataFrame they came from
+        self.columns = {name: _read_only(np.array(values)) for name, values in columns.items()}
+        self.centroids = None if centroids is None else _read_only(np.array(centroids, dtype=np.float32))
+        self.neighbor_table = neighbor_table
+        self.embedding = embedding
+        self.version = version
+        # Fields the index answers for, including ones the corpus has no column for
+        self.indexed_fields = frozenset(indexed_fields if indexed_fields is not None else self.columns)
+
+        # Filter columns derived once: lower-cased category codes and numeric minutes
+        self._categories: Dict[str, Tuple[Dict[str, int], np.ndarray]] = {}
+        for name in CATEGORY_COLUMNS:
+            if name in self.columns:
+                self._categories[name] = self._encode_categories(self.columns[name])
+        self._cook_minutes = None
+        if 'cook_time' in self.columns:
+            self._cook_minutes = _read_only(self._leading_number(self.columns['cook_time']))
+        self._calories = None
+        if 'calories_per_serving' in self.columns:
+            self._calories = _read_only(self._as_float(self.columns['calories_per_serving']))
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    @staticmethod
+    def _encode_categories(values: np.ndarray) -> Tuple[Dict[str, int], np.ndarray]:
+        """Map lower-cased values to int codes (-1 for missing values)"""
+        codes_of: Dict[str, int] = {}
+        codes = np.full(len(values), -1, dtype=np.int32)
+        for row, value in enumerate(values):
+            if isinstance(value, str):
+                codes[row] = codes_of.setdefault(value.lower(), len(codes_of))
+        return codes_of, _read_only(codes)
+
+    @staticmethod
+    def _leading_number(values: np.ndarray) -> np.ndarray:
+        """First number in each text value (e.g. '45 mins' -> 45), NaN if there is none"""
+        numbers = np.full(len(values), np.nan, dtype=np.float32)
+        for row, value in enumerate(values):
+            match = re.search(r'(\d+)', value) if isinstance(value, str) else None
+            if match:
+                numbers[row] = float(match.group(1))
+        return numbers
+
+    @staticmethod
+    def _as_float(values: np.ndarray) -> np.ndarray:
+        numbers = np.full(len(values), np.nan, dtype=np.float32)
+        for row, value in enumerate(values):
+            try:
+                numbers[row] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return numbers
+
+    @classmethod
+    def from_processor(cls,
+                       processor,
+                       columns: Sequence[str] = INDEX_COLUMNS,
+                       version: Optional[str] = None,
+                       embedding_dims: int = EMBEDDING_DIMS) -> "RecipeIndex":
+        """Build an index from a processed (or loaded) RecipeProcessor (embedding_dims=0 skips the ANN engine)"""
+        if processor.recipes_df is None or processor.ingredients_vectors is None:
+            raise ValueError("Data not processed")
+
+        recipes_df = processor.recipes_df
+        index_columns = {}
+        for name in columns:
+            if name not in recipes_df.columns:
+                continue
+            values = recipes_df[name]
+            if values.dtype.kind in 'iu':
+                index_columns[name] = values.to_numpy(dtype=np.int64)
+            elif values.dtype.kind == 'f':
+                index_columns[name] = values.to_numpy(dtype=np.float64)
+            else:
+                index_columns[name] = np.asarray(
+                    [None if value is None or (isinstance(value, float) and np.isnan(value)) else value
+                     for value in values.tolist()],
+                    dtype=object
+                )
+
+        centroids = None
+        if processor.kmeans is not None and hasattr(processor.kmeans, 'cluster_centers_'):
+            centroids = processor.kmeans.cluster_centers_
+        embedding = None
+        if embedding_dims > 0:
+            with span("index.embed"):
+                embedding = RecipeEmbedding.build(processor.ingredients_vectors, dims=embedding_dims)
+        return cls(
+            QueryVectorizer.from_sklearn(processor.vectorizer),
+            processor.ingredients_vectors,
+            processor.row_ids,
+            index_columns,
+            centroids=centroids,
+            neighbor_table=processor.neighbor_table,
+            version=version,
+            indexed_fields=columns,
+            embedding=embedding
+        )
+
+    def save(self, directory: str = PROCESSED_DIR):
+        """Save the index as a single NumPy archive (no pickles) in directory"""
+        os.makedirs(directory, exist_ok=True)
+        arrays = {
+            'terms': self.vectorizer.terms.astype(str),
+            'vectorizer_config': np.asarray(json.dumps(self.vectorizer.config)),
+            'vectors_data': self.vectors.data,
+            'vectors_indices': self.vectors.indices,
+            'vectors_indptr': self.vectors.indptr,
+            'vectors_shape': np.asarray(self.vectors.shape, dtype=np.int64),
+            'ids': self.row_ids.astype(str),
+            'indexed_fields': np.asarray(sorted(self.indexed_fields), dtype=str),
+        }
+        if self.vectorizer.idf is not None:
+            arrays['idf'] = self.vectorizer.idf
+        if self.centroids is not None:
+            arrays['centroids'] = self.centroids
+        for name, values in self.columns.items():
+            if values.dtype == object:
+                # Text columns are stored as strings plus a missing-value mask
+                missing = np.asarray([value is None for value in values], dtype=bool)
+                arrays[f'column_{name}'] = np.asarray(['' if value is None else str(value) for value in values], dtype=str)
+                arrays[f'missing_{name}'] = missing
+            else:
+                arrays[f'column_{name}'] = values
+        if self.neighbor_table is not None:
+            arrays['neighbor_ids'] = self.neighbor_table.ids.astype(str)
+            arrays['neighbors'] = self.neighbor_table.neighbors
+            arrays['neighbor_scores'] = self.neighbor_table.scores
+        if self.embedding is not None:
+            arrays.update(self.embedding.arrays())
+        np.savez(os.path.join(directory, INDEX_FILE), **arrays)
+
+    @classmethod
+    def load(cls, directory: str = PROCESSED_DIR, version: Optional[str] = None) -> "RecipeIndex":
+        """Load an index written by save"""
+        with np.load(os.path.join(directory, INDEX_FILE), allow_pickle=False) as data:
+            vectorizer = QueryVectorizer(
+                data['terms'].tolist(),
+                data['idf'] if 'idf' in data else None,
+                json.loads(str(data['vectorizer_config']))
+            )
+            vectors = sparse.csr_matrix(
+                (data['vectors_data'], data['vectors_indices'], data['vectors_indptr']),
+                shape=tuple(data['vectors_shape'])
+            )
+            columns = {}
+            for key in data.files:
+                if not key.startswith('column_'):
+                    continue
+                name = key[len('column_'):]
+                values = data[key]
+                if f'missing_{name}' in data:
+                    values = np.asarray(values.tolist(), dtype=object)
+                    values[data[f'missing_{name}']] = None
+                columns[name] = values
+            neighbor_table = None
+            if 'neighbors' in data:
+                neighbor_table = NeighborTable(data['neighbor_ids'].tolist(), data['neighbors'], data['neighbor_scores'])
+            return cls(
+                vectorizer,
+                vectors,
+                data['ids'].tolist(),
+                columns,
+                centroids=data['centroids'] if 'centroids' in data else None,
+                neighbor_table=neighbor_table,
+                version=version,
+                indexed_fields=data['indexed_fields'].tolist(),
+                embedding=RecipeEmbedding.from_arrays(data)
+            )
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the index arrays, including the strings of text columns"""
+        total = self.vectors.data.nbytes + self.vectors.indices.nbytes + self.vectors.indptr.nbytes
+        total += sum(len(term) + 49 for term in self.vectorizer.terms)
+        if self.vectorizer.idf is not None:
+            total += self.vectorizer.idf.nbytes
+        total += sum(len(recipe_id) + 49 for recipe_id in self.row_ids)
+        for values in self.columns.values():
+            total += values.nbytes
+            if values.dtype == object:
+                total += sum(len(value) + 49 for value in values if isinstance(value, str))
+        if self.centroids is not None:
+            total += self.centroids.nbytes
+        if self.neighbor_table is not None:
+            total += self.neighbor_table.neighbors.nbytes + self.neighbor_table.scores.nbytes
+        if self.embedding is not None:
+            total += self.embedding.nbytes
+        return total
+
+    def get_row(self, recipe_id: str) -> Optional[int]:
+        """Get the row of a recipe in the index"""
+        return self.id_to_row.get(str(recipe_id))
+
+    def has_fields(self, fields: Optional[List[str]]) -> bool:
+        """Whether the index holds every requested field (None means all recipe fields)"""
+        if fields is None:
+            return False
+        computed = {'id', 'similarity', 'matched', 'missing'}
+        return all(field in self.indexed_fields or field in computed for field in fields)
+
+    def _hydrate(self, rows, similarities=None, fields: Optional[List[str]] = None) -> List[Dict]:
+        """Turn row positions into recipe dicts of the index columns"""
+        rows = np.asarray(rows, dtype=np.int64)
+        names = [name for name in self.columns if fields is None or name in fields]
+        values = {name: self.columns[name][rows].tolist() for name in names}
+        include_id = fields is None or 'id' in fields
+        include_similarity = similarities is not None and (fields is None or 'similarity' in fields)
+        ids = self.row_ids[rows]
+
+        records = []
+        for i in range(len(rows)):
+            record = {'id': ids[i]} if include_id else {}
+            for name in names:
+                record[name] = values[name][i]
+            if include_similarity:
+                record['similarity'] = float(similarities[i])
+            records.append(record)
+        return records
+
+    def get_recipe(self, recipe_id: str) -> Optional[Dict]:
+        """Get the indexed fields of a recipe by ID"""
+        row = self.get_row(recipe_id)
+        if row is None:
+            return None
+        return self._hydrate([row])[0]
+
+    def labels(self, name: str) -> Optional[np.ndarray]:
+        """A label or filter column (e.g. kmeans_cluster, cuisine), None if not indexed"""
+        return self.columns.get(name)
+
+    def _similarities(self, query, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity of every recipe (or the given rows) to a one-row query (rows and query are l2-normalized)"""
+        # A dense query makes this one pass over the matrix, whatever the number of columns
+        dense_query = np.zeros(self.vectors.shape[1], dtype=np.float32)
+        dense_query[query.indices] = query.data
+        if rows is not None:
+            return self.vectors[rows] @ dense_query
+        return self.vectors @ dense_query
+
+    def _category_mask(self, name: str, value: str) -> np.ndarray:
+        if name not in self._categories:
+            return np.zeros(len(self), dtype=bool)
+        codes_of, codes = self._categories[name]
+        code = codes_of.get(value.lower())
+        if code is None:
+            return np.zeros(len(self), dtype=bool)
+        return codes == code
+
+    def find_recipes_by_ingredients(self,
+                                    ingredients: List[str],
+                                    cuisine_type: Optional[str] = None,
+                                    diet_type: Optional[str] = None,
+                                    max_cook_time: Optional[int] = None,
+                                    difficulty: Optional[str] = None,
+                                    max_calories: Optional[int] = None,
+                                    max_results: int = 5,
+                                    fields: Optional[List[str]] = None,
+                                    engine: str = 'exact') -> List[Dict]:
+        """
+        Find recipes based on ingredients and additional filters
+
+        Same arguments and ranking as RecipeProcessor.find_recipes_by_ingredients;
+        results only carry the indexed fields. engine='ann' takes candidates from
+        the dense embeddings (see RecipeEmbedding) and ranks them by their exact
+        similarity, scanning more lists when filters leave too few of them;
+        indexes built without embeddings always search exactly.
+        """
+        if engine not in SEARCH_ENGINES:
+            raise ValueError(f"Unknown search engine: {engine} (choose from {', '.join(SEARCH_ENGINES)})")
+        if self.embedding is None:
+            engine = 'exact'
+        with span("search.vectorize"):
+            query = self.vectorizer.transform([self.vectorizer.query_text(ingredients)])
+
+        with span("search.filter"):
+            # No mask without filters, so approximate searches never touch every row
+            mask = None
+            if cuisine_type or diet_type or max_cook_time or difficulty or max_calories:
+                mask = np.ones(len(self), dtype=bool)
+            if cuisine_type:
+                mask &= self._category_mask('cuisine', cuisine_type)
+            if diet_type:
+                mask &= self._category_mask('diet_type', diet_type)
+            if max_cook_time:
+                mask &= self._cook_minutes <= max_cook_time if self._cook_minutes is not None else False
+            if difficulty:
+                mask &= self._category_mask('difficulty', difficulty)
+            if max_calories:
+                mask &= self._calories <= max_calories if self._calories is not None else False
+
+        if engine == 'ann':
+            with span("search.ann"):
+                n_candidates = max_results * self.embedding.rerank
+                candidates = self.embedding.search(query, n_candidates, mask)
+                # A selective filter can leave too few matches in the probed lists:
+                # scan more lists, then fall back to scoring every matching row exactly
+                wanted = min(max_results, len(self) if mask is None else int(mask.sum()))
+                probes = self.embedding.probes
+                while len(candidates) < wanted and probes < self.embedding.n_lists:
+                    probes = min(probes * 2, self.embedding.n_lists)
+                    candidates = self.embedding.search(query, n_candidates, mask, probes=probes)
+                if len(candidates) < wanted:
+                    candidates = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+            with span("search.similarity"):
+                scores = self._similarities(query, candidates)
+            with span("search.rank"):
+                order = top_rows(scores, np.arange(len(candidates)), max_results)
+                rows, row_similarities = candidates[order], scores[order]
+        else:
+            with span("search.similarity"):
+                similarities = self._similarities(query)
+            with span("search.rank"):
+                candidates = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+                rows = top_rows(similarities, candidates, max_results)
+                row_similarities = similarities[rows]
+
+        with span("search.hydrate"):
+            results = self._hydrate(rows, row_similarities, fields=fields)
+        add_matches(results, self.vectorizer, self.vectors, ingredients, rows, fields)
+        annotate_search(
+            ingredients,
+            {
+                'cuisine_type': cuisine_type,
+                'diet_type': diet_type,
+                'max_cook_time': max_cook_time,
+                'difficulty': difficulty,
+                'max_calories': max_calories,
+            },
+            engine=engine,
+            candidates=len(candidates),
+            result_count=len(results)
+        )
+        return results
+
+    def predict_cluster(self, ingredients: List[str]) -> Optional[int]:
+        """KMeans cluster of an ingredient list (nearest centroid), None without centroids"""
+        if self.centroids is None:
+            return None
+        query = self.vectorizer.transform([self.vectorizer.query_text(ingredients)]).toarray()[0]
+        distances = ((self.centroids - query) ** 2).sum(axis=1)
+        return int(np.argmin(distances))
+
+    def get_recipe_recommendations(self, recipe_id: str, max_results: int = 3) -> List[Dict]:
+        """Get similar recipe recommendations based on a recipe ID"""
+        recipe_idx = self.get_row(recipe_id)
+        if recipe_idx is None:
+            raise ValueError(f"Recipe with ID {recipe_id} not found")
+        return recommend(
+            recipe_id, recipe_idx, self.neighbor_table,
+            lambda: self._similarities(self.vectors[recipe_idx]),
+            self._hydrate, max_results
+        )
+
+def has_index(directory: str = PROCESSED_DIR) -> bool:
+    """Whether a RecipeIndex was saved in directory"""
+    return os.path.exists(os.path.join(directory, INDEX_FILE))
+
+
+def load_recipe_index(directory: str = PROCESSED_DIR, source: Optional[str] = None) -> Optional[RecipeIndex]:
+    """
+    Get an index ready to serve searches
+
+    Loads the saved index when there is one; otherwise builds it from a
+    processor (saved artifacts, or trained on MongoDB/JSON data, see
+    load_recipe_processor). Returns None if no data is available.
+    """
+    from data.processor import PROCESSOR_SOURCE, load_recipe_processor
+
+    source = source or PROCESSOR_SOURCE
+    if source == 'auto' and has_index(directory):
+        index = RecipeIndex.load(directory)
+        print(f"Loaded recipe index of {len(index)} recipes")
+        return index
+
+    processor = load_recipe_processor(source)
+    if processor.recipes_df is None:
+        return None
+    return RecipeIndex.from_processor(processor)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+"""
+Versioned recipe indexes and hot swapping in serving processes
+
+Each published index lives in its own directory under versions/, and the
+CURRENT file names the active one. Serving processes watch CURRENT and
+swap in the new index once it is fully loaded, so publishing a version
+(or rolling back to an older one) needs no restart.
+
+Usage:
+    python -m data.index_versions list
+    python -m data.index_versions rollback [version]
+    python -m data.index_versions activate <version>
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import threading
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.artifacts import PROCESSED_DIR
+from data.index import INDEX_FILE, RecipeIndex, load_recipe_index
+
+VERSIONS_DIR = "versions"
+CURRENT_FILE = "CURRENT"
+
+# Published versions kept on disk (the active one is never removed)
+KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", 5))
+
+# How often serving processes check CURRENT for a new version (0 disables the watcher)
+INDEX_POLL_SECONDS = float(os.getenv("INDEX_POLL_SECONDS", 30))
+
+
+def version_dir(version: str, root: str = PROCESSED_DIR) -> str:
+    return os.path.join(root, VERSIONS_DIR, version)
+
+
+def list_versions(root: str = PROCESSED_DIR) -> List[str]:
+    """Published versions holding an index, oldest first"""
+    versions_root = os.path.join(root, VERSIONS_DIR)
+    if not os.path.isdir(versions_root):
+        return []
+    return sorted(
+        name for name in os.listdir(versions_root)
+        if os.path.exists(os.path.join(versions_root, name, INDEX_FILE))
+    )
+
+
+def current_version(root: str = PROCESSED_DIR) -> Optional[str]:
+    """The version CURRENT points to, None if nothing was published"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+
+def set_current(version: str, root: str = PROCESSED_DIR):
+    """Point CURRENT at a published version, atomically"""
+    if version not in list_versions(root):
+        raise ValueError(f"Unknown index version: {version}")
+    temp_path = os.path.join(root, f".{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(temp_path, os.path.join(root, CURRENT_FILE))
+
+
+def _new_version_name(root: str) -> str:
+    """Timestamped version name, unique in root and sorting after every existing version"""
+    name = time.strftime("%Y%m%d-%H%M%S")
+    existing = list_versions(root)
+    latest = existing[-1] if existing else ""
+    # Never go back before the latest version, even if the clock did
+    name = max(name, latest.split(".")[0])
+    candidate, suffix = name, 1
+    # Versions published within the same second get a zero-padded suffix, so
+    # they keep sorting in publish order even after older ones were pruned
+    while candidate <= latest or os.path.exists(version_dir(candidate, root)):
+        candidate = f"{name}.{suffix:03d}"
+        suffix += 1
+    return candidate
+
+
+def publish_index(index: RecipeIndex, root: str = PROCESSED_DIR, keep: int = KEEP_VERSIONS) -> str:
+    """
+    Save an index as a new version and make it the current one
+
+    The index is written to a temporary directory that is renamed into
+    versions/ before CURRENT is switched, so watchers never see a partial
+    version. Returns the version name.
+    """
+    version = _new_version_name(root)
+    versions_root = os.path.join(root, VERSIONS_DIR)
+    temp_dir = os.path.join(versions_root, f".{version}.tmp")
+    index.save(temp_dir)
+    os.replace(temp_dir, version_dir(version, root))
+    set_current(version, root)
+    prune_versions(root, keep)
+    print(f"Published recipe index version {version}")
+    return version
+
+
+def prune_versions(root: str = PROCESSED_DIR, keep: int = KEEP_VERSIONS):
+    """Remove the oldest versions beyond keep, never the current one"""
+    active = current_version(root)
+    versions = list_versions(root)
+    for version in versions[:max(0, len(versions) - keep)]:
+        if version != active:
+            shutil.rmtree(version_dir(version, root), ignore_errors=True)
+
+
+def rollback(version: Optional[str] = None, root: str = PROCESSED_DIR) -> str:
+    """Point CURRENT at the given version, or the one published before the current one"""
+    if version is None:
+        versions = list_versions(root)
+        active = current_version(root)
+        older = [name for name in versions if active is None or name < active]
+        if not older:
+            raise ValueError("No earlier index version to roll back to")
+        version = older[-1]
+    set_current(version, root)
+    return version
+
+
+class IndexManager:
+    """
+    Holds the serving process's current RecipeIndex and swaps in new versions
+
+    Requests take the index once (manager.current) and use that object to
+    the end, so a swap never affects requests in flight: they finish on the
+    old version while new requests get the new one. Versions are loaded in
+    the watcher thread, never on the request path.
+    """
+    def __init__(self,
+                 root: str = PROCESSED_DIR,
+                 poll_interval: float = INDEX_POLL_SECONDS,
+                 on_swap: Optional[Callable[[RecipeIndex], None]] = None):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.on_swap = on_swap
+        self._current: Optional[RecipeIndex] = None
+        self._previous: Optional[RecipeIndex] = None
+        self.loaded_at: Optional[float] = None
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def current(self) -> Optional[RecipeIndex]:
+        return self._current
+
+    @property
+    def version(self) -> Optional[str]:
+        index = self._current
+        return None if index is None else index.version
+
+    def swap(self, index: RecipeIndex):
+        """Make index the current one; the replaced index is kept for rollback"""
+        with self._load_lock:
+            self._previous, self._current = self._current, index
+            self.loaded_at = time.time()
+        if self.on_swap is not None:
+            self.on_swap(index)
+
+    def _load_version(self, version: str) -> RecipeIndex:
+        return RecipeIndex.load(version_dir(version, self.root), version=version)
+
+    def load(self) -> Optional[RecipeIndex]:
+        """
+        Load the current index if none is loaded yet
+
+        Uses the version CURRENT points to, or an unversioned index built
+        by load_recipe_index (saved index.npz, artifacts or training).
+        Returns None if no data is available.
+        """
+        if self._current is not None:
+            return self._current
+        with self._load_lock:
+            if self._current is None:
+                version = current_version(self.root)
+                if version is not None:
+                    index = self._load_version(version)
+                    print(f"Loaded recipe index version {version} ({len(index)} recipes)")
+                else:
+                    index = load_recipe_index(self.root)
+                if index is None:
+                    return None
+                self._current = index
+                self.loaded_at = time.time()
+                # Only the thread that loaded the index runs the swap hooks
+                if self.on_swap is not None:
+                    self.on_swap(index)
+        return self._current
+
+    def check(self) -> bool:
+        """Swap in the version CURRENT points to if it is not the loaded one; True if swapped"""
+        version = current_version(self.root)
+        if version is None or version == self.version:
+            return False
+
+        # Rolling back to the index that was just replaced needs no load
+        previous = self._previous
+        if previous is not None and previous.version == version:
+            index = previous
+        else:
+            start = time.perf_counter()
+            index = self._load_version(version)
+            print(f"Loaded recipe index version {version} in {time.perf_counter() - start:.2f}s")
+        self.swap(index)
+        return True
+
+    def rollback(self, version: Optional[str] = None) -> str:
+        """Roll CURRENT back (see rollback) and swap to that version now"""
+        version = rollback(version, self.root)
+        self.check()
+        return version
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check()
+            except Exception as e:
+                # Keep serving the loaded version if the new one cannot be loaded
+                print(f"Warning: Could not load recipe index version {current_version(self.root)}: {e}")
+
+    def start(self):
+        """Start watching CURRENT in a background thread (unless polling is disabled)"""
+        if self.poll_interval <= 0 or self._thread is not None:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="ingreedy-index-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def status(self) -> Dict:
+        """Active version, recipe count and load time, as reported by /health"""
+        index = self._current
+        return {
+            "index_version": None if index is None else index.version,
+            "recipes": 0 if index is None else len(index),
+            "loaded_at": None if self.loaded_at is None else time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.loaded_at)),
+            "published_version": current_version(self.root),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage published recipe index versions")
+    parser.add_argument("--root", default=PROCESSED_DIR, help="Processed data directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List published versions")
+    rollback_parser = commands.add_parser("rollback", help="Activate the previous (or given) version")
+    rollback_parser.add_argument("version", nargs="?")
+    activate_parser = commands.add_parser("activate", help="Activate a version")
+    activate_parser.add_argument("version")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        active = current_version(args.root)
+        for version in list_versions(args.root):
+            print(f"{'*' if version == active else ' '} {version}")
+    elif args.command == "rollback":
+        print(f"Current index version: {rollback(args.version, args.root)}")
+    else:
+        set_current(args.version, args.root)
+        print(f"Current index version: {args.version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import sys
+import importlib
+import threading
+
+
+class _LazyModule:
+    """Stand-in for a module that imports it on first attribute access"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # importlib's LazyLoader is not thread-safe before Python 3.12: a second
+        # thread could see the module half-initialised while the first imports it
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        module = self._module or self._load()
+        return getattr(module, attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self._name!r}>"
+
+
+def lazy_import(name: str):
+    """
+    Import a module on first attribute access instead of now
+
+    Heavy dependencies (pandas, scipy, joblib) are imported this way at module
+    level, so importing the processor or the APIs stays cheap and processes
+    only pay for what they use. The first access may come from any request
+    thread; it imports the module under a lock.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return _LazyModule(name)
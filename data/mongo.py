@@ -0,0 +1,56 @@
+import os
+import threading
+from typing import Dict, Optional
+
+# Shared clients by URI, created on first use
+_clients: Dict[str, object] = {}
+_lock = threading.Lock()
+
+
+def get_client(uri: Optional[str] = None):
+    """Get the shared MongoClient for a URI (MONGO_URI by default), creating it on first use"""
+    uri = uri or os.getenv("MONGO_URI", "mongodb://localhost:27017")
+    client = _clients.get(uri)
+    if client is None:
+        with _lock:
+            client = _clients.get(uri)
+            if client is None:
+                from pymongo import MongoClient
+                client = _clients[uri] = MongoClient(uri)
+    return client
+
+
+def get_collection(name: str, db_name: Optional[str] = None, uri: Optional[str] = None):
+    """Get a collection of the DB_NAME (or db_name) database"""
+    return get_client(uri)[db_name or os.getenv("DB_NAME", "ingreedy")][name]
+
+
+def close_clients():
+    """Close every shared client; the next use creates new ones"""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+class LazyCollection:
+    """
+    Collection handle that connects on first use
+
+    Lets modules define their collections at import time without opening
+    a connection; every attribute is forwarded to the real collection.
+    """
+    def __init__(self, name: str, db_name: Optional[str] = None, uri: Optional[str] = None):
+        self._name = name
+        self._db_name = db_name
+        self._uri = uri
+
+    @property
+    def collection(self):
+        return get_collection(self._name, self._db_name, self._uri)
+
+    def __getattr__(self, attribute):
+        return getattr(self.collection, attribute)
+
+    def __repr__(self):
+        return f"LazyCollection({self._name!r}, {self._db_name!r})"
@@ -0,0 +1,142 @@
+import os
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Memory for the similarity blocks of the neighbor table, shared by all workers
+NEIGHBOR_BLOCK_MB = int(os.getenv("NEIGHBOR_BLOCK_MB", 512))
+
+# Largest block, where bigger blocks stop making the matrix products faster
+MAX_BLOCK_SIZE = 512
+
+# Peak bytes per similarity while a block is scored: the sparse product (value and
+# index), the dense float32 block and argpartition's int64 positions
+BYTES_PER_SIMILARITY = 24
+
+
+def neighbor_block_size(n_rows: int, workers: int = 1, memory_mb: int = NEIGHBOR_BLOCK_MB) -> int:
+    """Rows per block so that workers blocks of n_rows similarities fit in memory_mb"""
+    budget = memory_mb * 1024 * 1024 // max(1, workers)
+    return int(max(1, min(MAX_BLOCK_SIZE, budget // (BYTES_PER_SIMILARITY * max(1, n_rows)))))
+
+
+def build_neighbor_table(vectors,
+                         k: int = 10,
+                         block_size: Optional[int] = None,
+                         workers: int = 1,
+                         memory_mb: int = NEIGHBOR_BLOCK_MB) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the top-k most similar rows for every row of an L2-normalized matrix
+
+    The matrix is multiplied by its transpose one block of rows at a time, so
+    memory is bounded by the block size: by default it is derived from
+    memory_mb, which all workers' dense block_size x n_rows blocks share.
+
+    Args:
+        vectors: Sparse (CSR) or dense matrix with L2-normalized rows
+        k: Number of neighbors to keep per row
+        block_size: Number of rows scored per block (derived from memory_mb by default)
+        workers: Threads scoring blocks concurrently (the matrix products release the GIL)
+        memory_mb: Memory budget of the blocks when block_size is not given
+
+    Returns:
+        (neighbors, scores): int32 and float32 arrays of shape (n_rows, k), sorted
+        by descending score. Rows with fewer than k other rows are padded with -1.
+    """
+    n_rows = vectors.shape[0]
+    neighbors = np.full((n_rows, k), -1, dtype=np.int32)
+    scores = np.zeros((n_rows, k), dtype=np.float32)
+    if n_rows < 2 or k < 1:
+        return neighbors, scores
+
+    block_size = block_size or neighbor_block_size(n_rows, workers, memory_mb)
+    transposed = vectors.T.tocsc() if hasattr(vectors, 'tocsc') else vectors.T
+    keep = min(k, n_rows - 1)
+
+    def score_block(start: int):
+        end = min(start + block_size, n_rows)
+        block = vectors[start:end] @ transposed
+        # Densify straight to float32 rather than through a float64 copy
+        block = block.astype(np.float32).toarray() if hasattr(block, 'toarray') else np.asarray(block, dtype=np.float32)
+
+        # Never recommend a recipe to itself
+        rows = np.arange(end - start)
+        block[rows, rows + start] = -np.inf
+
+        # Select the top candidates without sorting the whole row, then order them
+        top = np.argpartition(block, n_rows - keep, axis=1)[:, n_rows - keep:]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+
+        neighbors[start:end, :keep] = np.take_along_axis(top, order, axis=1)
+        scores[start:end, :keep] = np.take_along_axis(top_scores, order, axis=1)
+
+    # Blocks write disjoint rows of the output, so threads need no locking
+    starts = range(0, n_rows, block_size)
+    if workers > 1 and len(starts) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(score_block, starts))
+    else:
+        for start in starts:
+            score_block(start)
+
+    return neighbors, scores
+
+
+class NeighborTable:
+    """Precomputed recipe-to-recipe neighbors with O(1) lookup by recipe id"""
+
+    def __init__(self, ids: Sequence[str], neighbors: np.ndarray, scores: np.ndarray):
+        self.ids = np.asarray([str(recipe_id) for recipe_id in ids], dtype=object)
+        self.neighbors = np.asarray(neighbors, dtype=np.int32)
+        self.scores = np.asarray(scores, dtype=np.float32)
+        self._row_of: Dict[str, int] = {recipe_id: row for row, recipe_id in enumerate(self.ids)}
+
+    @classmethod
+    def build(cls, ids: Sequence[str], vectors, k: int = 10, block_size: Optional[int] = None,
+              workers: int = 1) -> "NeighborTable":
+        """Build the table from a matrix of L2-normalized recipe vectors"""
+        neighbors, scores = build_neighbor_table(vectors, k=k, block_size=block_size, workers=workers)
+        return cls(ids, neighbors, scores)
+
+    @property
+    def k(self) -> int:
+        return self.neighbors.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, recipe_id) -> bool:
+        return str(recipe_id) in self._row_of
+
+    def lookup(self, recipe_id, max_results: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Get (row, score) pairs of the neighbors of a recipe"""
+        row = self._row_of.get(str(recipe_id))
+        if row is None:
+            raise KeyError(recipe_id)
+
+        limit = self.k if max_results is None else min(max_results, self.k)
+        neighbor_rows = self.neighbors[row, :limit]
+        neighbor_scores = self.scores[row, :limit]
+        valid = neighbor_rows >= 0
+        return list(zip(neighbor_rows[valid].tolist(), neighbor_scores[valid].tolist()))
+
+    def similar_ids(self, recipe_id, max_results: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Get (recipe id, score) pairs of the neighbors of a recipe"""
+        return [(self.ids[row], score) for row, score in self.lookup(recipe_id, max_results)]
+
+    def save(self, file_path: str):
+        """Save the table as a compressed NumPy archive"""
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        np.savez_compressed(
+            file_path,
+            ids=self.ids.astype(str),
+            neighbors=self.neighbors,
+            scores=self.scores
+        )
+
+    @classmethod
+    def load(cls, file_path: str) -> "NeighborTable":
+        """Load a table written by save"""
+        with np.load(file_path, allow_pickle=False) as data:
+            return cls(data['ids'].tolist(), data['neighbors'], data['scores'])
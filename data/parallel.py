@@ -0,0 +1,76 @@
+import os
+import time
+import contextlib
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Worker processes and estimator threads of the offline pipeline (0 uses every available core)
+PROCESSOR_WORKERS = int(os.getenv("PROCESSOR_WORKERS", 0))
+
+# Recipes per chunk handed to a worker; corpora up to one chunk are processed in-process
+PROCESSOR_CHUNK_SIZE = int(os.getenv("PROCESSOR_CHUNK_SIZE", 20000))
+
+
+def resolve_workers(workers: Optional[int] = None) -> int:
+    """Number of workers to use: the given count, else PROCESSOR_WORKERS, 0 meaning all cores"""
+    workers = PROCESSOR_WORKERS if workers is None else workers
+    if workers > 0:
+        return workers
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def chunk_bounds(n_items: int, chunk_size: int = PROCESSOR_CHUNK_SIZE) -> List[range]:
+    """Consecutive [start, end) ranges covering n_items, at most chunk_size each"""
+    chunk_size = max(1, chunk_size)
+    return [range(start, min(start + chunk_size, n_items)) for start in range(0, n_items, chunk_size)]
+
+
+def map_chunks(func: Callable, chunks: Sequence, args: Tuple = (), workers: Optional[int] = None) -> List:
+    """
+    Apply func(chunk, *args) to every chunk, in a process pool when there are several
+
+    func must be a module-level function so worker processes can import it.
+    Results are returned in chunk order.
+    """
+    workers = min(resolve_workers(workers), len(chunks))
+    if workers <= 1:
+        return [func(chunk, *args) for chunk in chunks]
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(func, chunk, *args) for chunk in chunks]
+        return [future.result() for future in futures]
+
+
+@contextlib.contextmanager
+def thread_limits(workers: Optional[int] = None):
+    """Let BLAS and OpenMP estimators (KMeans, matrix products) use this many threads"""
+    from threadpoolctl import threadpool_limits
+    with threadpool_limits(limits=resolve_workers(workers)):
+        yield
+
+
+@contextlib.contextmanager
+def stage(name: str, timings: Optional[Dict[str, float]] = None) -> Iterator[None]:
+    """Print the start and duration of a pipeline stage, recording it in timings"""
+    print(f"[{name}] started")
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        print(f"[{name}] failed after {time.perf_counter() - start:.2f}s")
+        raise
+    elapsed = time.perf_counter() - start
+    print(f"[{name}] done in {elapsed:.2f}s")
+    if timings is not None:
+        timings[name] = elapsed
+
+
+def print_timings(timings: Dict[str, float]):
+    """Print a summary of stage durations"""
+    total = sum(timings.values())
+    print("Stage timings:")
+    for name, seconds in timings.items():
+        print(f"  {name:24s} {seconds:8.2f}s  {seconds / total if total else 0:6.1%}")
+    print(f"  {'total':24s} {total:8.2f}s")
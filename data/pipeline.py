@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+"""
+Resumable recipe processing pipeline with stage-level caching
+
+The pipeline runs load -> normalize -> vectorize -> cluster -> neighbors
+-> index. The output of each stage after load is cached under
+processed_data/cache/<stage>/<key>/. The key hashes the stage's settings
+together with the keys of its inputs, and the load key hashes the
+recipes themselves. On a rerun every stage whose key is unchanged is
+restored from the cache instead of being recomputed, so unchanged data
+is not reprocessed, and a run that failed resumes after its last
+completed stage.
+
+Usage:
+    python -m data.pipeline [--workers N] [--rerun-from STAGE]
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import contextlib
+from typing import Callable, Dict, Iterator, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from data.lazy import lazy_import
+from data.artifacts import PROCESSED_DIR, save_recipes_table, load_recipes_table, save_vectors, load_vectors
+from data.parallel import PROCESSOR_CHUNK_SIZE, print_timings, resolve_workers, stage
+from data.processor import RecipeProcessor
+from data.neighbors import NeighborTable
+from data.vectorizers import PROFILES
+from data.index import INDEX_COLUMNS
+from data.ann import EMBEDDING_DIMS
+from data.index_versions import current_version, list_versions, set_current
+
+joblib = lazy_import("joblib")
+
+CACHE_DIR = os.path.join(PROCESSED_DIR, "cache")
+MANIFEST_FILE = "stage.json"
+
+# Keys of the last completed run, to tell whether the published artifacts are up to date
+STATE_FILE = os.path.join(PROCESSED_DIR, "pipeline.json")
+
+# Bump when a stage's code changes what it produces, so cached outputs are not reused
+CACHE_VERSION = 1
+
+STAGES = ['load', 'normalize', 'vectorize', 'cluster', 'neighbors', 'index']
+
+
+def fingerprint(*parts) -> str:
+    """Stable hash of JSON-serializable parts"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def recipes_fingerprint(recipes_df, batch_size: int = 10000) -> str:
+    """Hash of the recipes of a frame, in row order (rows are addressed by position)"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(recipes_df.columns), default=str).encode('utf-8'))
+    for start in range(0, len(recipes_df), batch_size):
+        records = recipes_df.iloc[start:start + batch_size].to_dict('records')
+        digest.update(json.dumps(records, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class StageCache:
+    """Completed stage outputs on disk, one directory per stage and key"""
+
+    def __init__(self, directory: str = CACHE_DIR):
+        self.directory = directory
+
+    def path(self, name: str, key: str) -> str:
+        return os.path.join(self.directory, name, key)
+
+    def has(self, name: str, key: str) -> bool:
+        """Whether the stage completed with this key (the manifest is written last)"""
+        return os.path.exists(os.path.join(self.path(name, key), MANIFEST_FILE))
+
+    @contextlib.contextmanager
+    def write(self, name: str, key: str) -> Iterator[str]:
+        """
+        Directory to write a stage's output to
+
+        The output is written to a temporary directory that only replaces
+        the cached entry once the block completes, so a failure never
+        leaves a partial entry behind.
+        """
+        final_path = self.path(name, key)
+        temp_path = os.path.join(self.directory, name, f".{key}.{os.getpid()}.tmp")
+        shutil.rmtree(temp_path, ignore_errors=True)
+        os.makedirs(temp_path)
+        try:
+            yield temp_path
+            with open(os.path.join(temp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+                json.dump({"stage": name, "key": key, "cache_version": CACHE_VERSION}, f)
+            shutil.rmtree(final_path, ignore_errors=True)
+            os.replace(temp_path, final_path)
+        finally:
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+    def prune(self, keys: Dict[str, str]):
+        """Remove every cached entry except the given key of each stage"""
+        for name in STAGES:
+            stage_dir = os.path.join(self.directory, name)
+            if not os.path.isdir(stage_dir):
+                continue
+            for entry in os.listdir(stage_dir):
+                if entry != keys.get(name):
+                    shutil.rmtree(os.path.join(stage_dir, entry), ignore_errors=True)
+
+
+def _read_state() -> Dict:
+    try:
+        with open(STATE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_state(state: Dict):
+    temp_path = f"{STATE_FILE}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(temp_path, STATE_FILE)
+
+
+class ProcessingPipeline:
+    """
+    Runs the processing stages on a RecipeProcessor, reusing cached outputs
+
+    Args:
+        workers: Worker processes and estimator threads (see data.parallel.resolve_workers)
+        chunk_size: Recipes per vectorization chunk
+        n_clusters: KMeans and hierarchical clusters
+        neighbors: Neighbors kept per recipe
+        rerun_from: Recompute this stage and every later one even if cached
+        cache: Where stage outputs are cached
+    """
+    def __init__(self,
+                 workers: Optional[int] = None,
+                 chunk_size: int = PROCESSOR_CHUNK_SIZE,
+                 n_clusters: int = 5,
+                 neighbors: int = 10,
+                 rerun_from: Optional[str] = None,
+                 cache: Optional[StageCache] = None):
+        if rerun_from is not None and rerun_from not in STAGES:
+            raise ValueError(f"Unknown stage: {rerun_from} (choose from {', '.join(STAGES)})")
+        self.processor = RecipeProcessor()
+        self.workers = resolve_workers(workers)
+        self.chunk_size = chunk_size
+        self.n_clusters = n_clusters
+        self.neighbors = neighbors
+        self.rerun = set(STAGES[STAGES.index(rerun_from):]) if rerun_from is not None else set()
+        self.cache = cache or StageCache()
+        self.keys: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+
+    def _key(self, name: str, inputs, settings: Optional[Dict] = None) -> str:
+        key = fingerprint(CACHE_VERSION, name, [self.keys[input_name] for input_name in inputs], settings or {})
+        self.keys[name] = key
+        return key
+
+    def _run_stage(self, name: str, key: str, compute: Callable, save: Callable, restore: Callable):
+        """Restore a stage from the cache, or compute it and cache its output"""
+        if name not in self.rerun and self.cache.has(name, key):
+            with stage(f"{name} (cached)", self.timings):
+                restore(self.cache.path(name, key))
+            return
+        with stage(name, self.timings):
+            compute()
+            with self.cache.write(name, key) as path:
+                save(path)
+
+    def load(self) -> bool:
+        """Read the raw recipes (always, since the source may have changed) and hash them"""
+        with stage("load", self.timings):
+            processor = self.processor
+            if not (processor.load_data_from_mongodb() or processor.load_data_from_json()):
+                return False
+            self.keys['load'] = fingerprint(CACHE_VERSION, 'load', recipes_fingerprint(processor.recipes_df))
+        return True
+
+    def normalize(self):
+        processor = self.processor
+
+        def restore(path):
+            processor.recipes_df = load_recipes_table(path)
+            processor.recipes_df['id'] = processor.recipes_df['id'].astype(str)
+            processor.build_id_index()
+
+        self._run_stage(
+            'normalize', self._key('normalize', ['load']),
+            compute=processor.preprocess_ingredients,
+            save=lambda path: save_recipes_table(processor.recipes_df, path),
+            restore=restore
+        )
+
+    def vectorize(self):
+        processor = self.processor
+        profile = processor.vectorizer.profile
+
+        def save(path):
+            save_vectors(processor.ingredients_vectors, path)
+            joblib.dump(processor.vectorizer, os.path.join(path, "vectorizer.joblib"))
+
+        def restore(path):
+            processor.ingredients_vectors = load_vectors(path)
+            processor.vectorizer = joblib.load(os.path.join(path, "vectorizer.joblib"))
+
+        self._run_stage(
+            'vectorize', self._key('vectorize', ['normalize'], {'profile': profile, 'settings': PROFILES[profile]}),
+            compute=lambda: processor.vectorize_ingredients(workers=self.workers, chunk_size=self.chunk_size),
+            save=save,
+            restore=restore
+        )
+
+    def cluster(self):
+        processor = self.processor
+
+        def compute():
+            processor.apply_kmeans_clustering(self.n_clusters, workers=self.workers)
+            processor.apply_hierarchical_clustering(self.n_clusters, workers=self.workers)
+
+        def save(path):
+            joblib.dump(processor.kmeans, os.path.join(path, "kmeans.joblib"))
+            joblib.dump(processor.hierarchical, os.path.join(path, "hierarchical.joblib"))
+            np.savez(
+                os.path.join(path, "labels.npz"),
+                kmeans_cluster=processor.recipes_df['kmeans_cluster'].to_numpy(),
+                hierarchical_cluster=processor.recipes_df['hierarchical_cluster'].to_numpy()
+            )
+
+        def restore(path):
+            processor.kmeans = joblib.load(os.path.join(path, "kmeans.joblib"))
+            processor.hierarchical = joblib.load(os.path.join(path, "hierarchical.joblib"))
+            with np.load(os.path.join(path, "labels.npz")) as labels:
+                for column in labels.files:
+                    processor.recipes_df[column] = labels[column]
+
+        self._run_stage(
+            'cluster', self._key('cluster', ['vectorize'], {'n_clusters': self.n_clusters}),
+            compute=compute,
+            save=save,
+            restore=restore
+        )
+
+    def build_neighbors(self):
+        processor = self.processor
+
+        def restore(path):
+            processor.neighbor_table = NeighborTable.load(os.path.join(path, "neighbors.npz"))
+
+        self._run_stage(
+            'neighbors', self._key('neighbors', ['vectorize'], {'k': self.neighbors}),
+            compute=lambda: processor.build_recipe_neighbors(self.neighbors, workers=self.workers),
+            save=lambda path: processor.neighbor_table.save(os.path.join(path, "neighbors.npz")),
+            restore=restore
+        )
+
+    def index(self):
+        """Save the processed artifacts and publish the index, unless the last run already did"""
+        key = self._key('index', ['cluster', 'neighbors'], {'columns': INDEX_COLUMNS, 'embedding_dims': EMBEDDING_DIMS})
+        state = _read_state()
+        version = state.get('version')
+        if 'index' not in self.rerun and state.get('keys', {}).get('index') == key and version in list_versions():
+            with stage("index (cached)", self.timings):
+                if current_version() != version:
+                    set_current(version)
+                    print(f"Current index version: {version}")
+            return
+
+        with stage("index", self.timings):
+            self.processor.save_processed_data()
+        _write_state({'keys': dict(self.keys), 'version': current_version()})
+
+    def run(self) -> bool:
+        """Run every stage; False if there was no data or a stage failed (completed stages stay cached)"""
+        print(f"Processing with {self.workers} worker(s)")
+        steps = [self.normalize, self.vectorize, self.cluster, self.build_neighbors, self.index]
+        try:
+            if not self.load():
+                print("Failed to load data")
+                return False
+            for step in steps:
+                step()
+        except Exception as e:
+            print(f"Processing failed: {e}")
+            print("Completed stages are cached; run again to resume from the failed stage")
+            return False
+
+        self.cache.prune(self.keys)
+        print("Data processing complete")
+        print_timings(self.timings)
+        return True
+
+
+def run_pipeline(workers: Optional[int] = None,
+                 chunk_size: int = PROCESSOR_CHUNK_SIZE,
+                 rerun_from: Optional[str] = None) -> bool:
+    """Process the recipes, reusing the cached output of unchanged stages"""
+    return ProcessingPipeline(workers=workers, chunk_size=chunk_size, rerun_from=rerun_from).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process recipe data and publish a new recipe index")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes and estimator threads (0 uses every core)")
+    parser.add_argument("--chunk-size", type=int, default=PROCESSOR_CHUNK_SIZE,
+                        help="Recipes per vectorization chunk")
+    parser.add_argument("--rerun-from", choices=STAGES,
+                        help="Recompute this stage and every later one even if cached")
+    args = parser.parse_args()
+    if not run_pipeline(args.workers, args.chunk_size, args.rerun_from):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
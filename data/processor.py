@@ -1,16 +1,23 @@
 import os
-import pandas as pd
 import numpy as np
 import json
 import re
-from pymongo import MongoClient
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans, AgglomerativeClustering
-from sklearn.metrics.pairwise import cosine_similarity
 from dotenv import load_dotenv
-from sklearn.model_selection import train_test_split
 from typing import List, Dict, Tuple, Optional
-import joblib
+from data.lazy import lazy_import
+from data.mongo import LazyCollection
+from data.neighbors import NeighborTable
+from data.index import RecipeIndex
+from data.index_versions import publish_index
+from data.vectorizers import VECTORIZER_PROFILE, RecipeVectorizer
+from data.tracing import span
+from data.ranking import add_matches, annotate_search, recommend, top_rows
+from data.parallel import PROCESSOR_CHUNK_SIZE, resolve_workers, thread_limits
+from data.artifacts import PROCESSED_DIR, has_recipes_table, save_recipes_table, load_recipes_table, save_vectors, load_vectors
+
+# Heavy dependencies are imported on first use; scikit-learn inside the methods that need it
+pd = lazy_import("pandas")
+joblib = lazy_import("joblib")
 
 # Load environment variables
 load_dotenv()
@@ -18,22 +25,46 @@ load_dotenv()
 # MongoDB setup
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 DB_NAME = os.getenv("DB_NAME", "ingreedy")
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
-recipes_collection = db["recipes"]
-processed_collection = db["processed_recipes"]
+recipes_collection = LazyCollection("recipes", DB_NAME, MONGO_URI)
+processed_collection = LazyCollection("processed_recipes", DB_NAME, MONGO_URI)
+
+# Where serving processes get their processor: 'auto' loads the artifacts saved
+# by run_processor.py when there are any, 'train' always fits on MongoDB data
+PROCESSOR_SOURCE = os.getenv("PROCESSOR_SOURCE", "auto")
+
+# Compact result projection used by the search APIs unless more fields are requested
+SUMMARY_FIELDS = ['id', 'title', 'url', 'image_url', 'prep_time', 'cook_time', 'total_time',
+                  'similarity', 'matched', 'missing']
+
+def resolve_fields(fields=None) -> Optional[List[str]]:
+    """
+    Turn a fields= request parameter into a field list for find_recipes_by_ingredients
+    
+    None or empty selects SUMMARY_FIELDS, 'all' selects every field (None),
+    anything else is a list or comma-separated string of field names.
+    """
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+    if not fields:
+        return SUMMARY_FIELDS
+    if fields == ['all']:
+        return None
+    return list(fields)
 
 class RecipeProcessor:
-    def __init__(self):
+    def __init__(self, vectorizer_profile: str = VECTORIZER_PROFILE):
         self.recipes_df = None
         self.ingredient_vectorizer = None
         self.ingredient_vectors = None
         self.kmeans_model = None
         self.hierarchical_model = None
-        self.vectorizer = TfidfVectorizer()
+        self.vectorizer = RecipeVectorizer(vectorizer_profile)
         self.kmeans = None
         self.hierarchical = None
         self.ingredients_vectors = None
+        self.neighbor_table = None
+        self.id_to_row: Dict[str, int] = {}
+        self.row_ids = np.empty(0, dtype=object)
         
     def load_data_from_mongodb(self):
         """Load recipe data from MongoDB"""
@@ -63,10 +94,8 @@ class RecipeProcessor:
         if self.recipes_df is None:
             raise ValueError("No data loaded. Call load_data_from_json first.")
             
-        # Convert ingredients lists to strings
-        self.recipes_df['ingredients_text'] = self.recipes_df['ingredients'].apply(
-            lambda x: ' '.join(x) if isinstance(x, list) else x
-        )
+        self.recipes_df = self._prepare_recipes(self.recipes_df)
+        self.build_id_index()
         
         print("Preprocessed ingredients")
         # Print sample ingredients
@@ -77,13 +106,67 @@ class RecipeProcessor:
             print(f"  Text: {recipe['ingredients_text'][:100]}...")
             print()
         
-    def vectorize_ingredients(self):
-        """Convert ingredients to TF-IDF vectors"""
+    @staticmethod
+    def _prepare_recipes(recipes_df: 'pd.DataFrame') -> 'pd.DataFrame':
+        """Add string ids and ingredients text to a frame of raw recipes"""
+        # Rows are addressed by position, so drop whatever index the source had
+        recipes_df = recipes_df.reset_index(drop=True)
+        
+        # Make sure every recipe has a string id (Mongo documents only carry _id)
+        if 'id' not in recipes_df.columns and '_id' in recipes_df.columns:
+            recipes_df['id'] = recipes_df['_id'].astype(str)
+        elif 'id' in recipes_df.columns:
+            recipes_df['id'] = recipes_df['id'].astype(str)
+        
+        # Convert ingredients lists to strings
+        recipes_df['ingredients_text'] = [
+            ' '.join(x) if isinstance(x, list) else x for x in recipes_df['ingredients'].tolist()
+        ]
+        return recipes_df
+        
+    def build_id_index(self):
+        """Build the recipe id -> row hash index and its inverse"""
+        if self.recipes_df is None:
+            raise ValueError("No data loaded")
+            
+        self.row_ids = self.recipes_df['id'].to_numpy(dtype=object)
+        self.id_to_row = {recipe_id: row for row, recipe_id in enumerate(self.row_ids)}
+        
+    def get_row(self, recipe_id: str) -> Optional[int]:
+        """Get the row of a recipe in recipes_df and ingredients_vectors"""
+        return self.id_to_row.get(str(recipe_id))
+        
+    def get_recipe(self, recipe_id: str) -> Optional[Dict]:
+        """Get a single recipe by ID without scanning the corpus"""
+        if self.recipes_df is None:
+            return None
+            
+        row = self.get_row(recipe_id)
+        if row is None:
+            return None
+        return self._hydrate([row])[0]
+        
+    def _hydrate(self, rows, similarities=None, fields: Optional[List[str]] = None) -> List[Dict]:
+        """Turn row positions into recipe dicts, optionally with similarity scores"""
+        if fields is None:
+            columns = [column for column in self.recipes_df.columns if column != '_id']
+        else:
+            columns = [column for column in fields if column in self.recipes_df.columns and column != '_id']
+        
+        # Only the selected columns are turned into dicts
+        records = self.recipes_df.iloc[list(rows)][columns].to_dict('records')
+        if similarities is not None and (fields is None or 'similarity' in fields):
+            for record, similarity in zip(records, similarities):
+                record['similarity'] = float(similarity)
+        return records
+        
+    def vectorize_ingredients(self, workers: Optional[int] = None, chunk_size: int = PROCESSOR_CHUNK_SIZE):
+        """Convert ingredients to TF-IDF vectors, chunk by chunk in worker processes for large corpora"""
         if 'ingredients_text' not in self.recipes_df.columns:
             raise ValueError("Ingredients not preprocessed. Call preprocess_ingredients first.")
             
-        self.ingredients_vectors = self.vectorizer.fit_transform(
-            self.recipes_df['ingredients_text']
+        self.ingredients_vectors = self.vectorizer.fit_transform_recipes(
+            self.recipes_df, workers=workers, chunk_size=chunk_size
         )
         
         print("Vectorizing ingredients...")
@@ -91,8 +174,10 @@ class RecipeProcessor:
         for text in self.recipes_df['ingredients_text'].head(3):
             print(f"- {text}")
         
-    def apply_kmeans_clustering(self, n_clusters: int = 5):
-        """Apply K-means clustering to recipes"""
+        return True
+        
+    def apply_kmeans_clustering(self, n_clusters: int = 5, workers: Optional[int] = None):
+        """Apply K-means clustering to recipes (on up to workers threads)"""
         if self.ingredients_vectors is None:
             raise ValueError("Ingredients not vectorized. Call vectorize_ingredients first.")
             
@@ -102,11 +187,13 @@ class RecipeProcessor:
             n_clusters = max(2, n_samples)
             print(f"Adjusted number of clusters to {n_clusters} based on dataset size")
             
+        from sklearn.cluster import KMeans
         self.kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        self.recipes_df['kmeans_cluster'] = self.kmeans.fit_predict(self.ingredients_vectors)
+        with thread_limits(workers):
+            self.recipes_df['kmeans_cluster'] = self.kmeans.fit_predict(self.ingredients_vectors)
         
-    def apply_hierarchical_clustering(self, n_clusters: int = 5):
-        """Apply hierarchical clustering to recipes"""
+    def apply_hierarchical_clustering(self, n_clusters: int = 5, workers: Optional[int] = None):
+        """Apply hierarchical clustering to recipes (on up to workers threads)"""
         if self.ingredients_vectors is None:
             raise ValueError("Ingredients not vectorized. Call vectorize_ingredients first.")
             
@@ -116,10 +203,12 @@ class RecipeProcessor:
             n_clusters = max(2, n_samples)
             print(f"Adjusted number of clusters to {n_clusters} based on dataset size")
             
+        from sklearn.cluster import AgglomerativeClustering
         self.hierarchical = AgglomerativeClustering(n_clusters=n_clusters)
-        self.recipes_df['hierarchical_cluster'] = self.hierarchical.fit_predict(
-            self.ingredients_vectors.toarray()
-        )
+        with thread_limits(workers):
+            self.recipes_df['hierarchical_cluster'] = self.hierarchical.fit_predict(
+                self.ingredients_vectors.toarray()
+            )
         
     def find_recipes_by_ingredients(self, 
                                   ingredients: List[str], 
@@ -128,7 +217,8 @@ class RecipeProcessor:
                                   max_cook_time: Optional[int] = None,
                                   difficulty: Optional[str] = None,
                                   max_calories: Optional[int] = None,
-                                  max_results: int = 5) -> List[Dict]:
+                                  max_results: int = 5,
+                                  fields: Optional[List[str]] = None) -> List[Dict]:
         """
         Find recipes based on ingredients and additional filters
         
@@ -140,43 +230,67 @@ class RecipeProcessor:
             difficulty: Recipe difficulty level (e.g., 'Easy', 'Medium')
             max_calories: Maximum calories per serving
             max_results: Maximum number of results to return
+            fields: Fields to return for each recipe (e.g. SUMMARY_FIELDS), all fields if None
+            
+        Each result carries 'matched' and 'missing': the searched ingredients
+        that are / are not found in the recipe's ingredient vector.
         """
         if self.recipes_df is None or self.ingredients_vectors is None:
             raise ValueError("Data not processed. Call load_data_from_json and process data first.")
             
         # Convert input ingredients to vector
-        ingredients_text = ' '.join(ingredients)
-        ingredients_vector = self.vectorizer.transform([ingredients_text])
+        with span("search.vectorize"):
+            ingredients_text = self.vectorizer.query_text(ingredients)
+            ingredients_vector = self.vectorizer.transform([ingredients_text])
         
         # Calculate similarity with all recipes
-        similarities = cosine_similarity(ingredients_vector, self.ingredients_vectors)[0]
-        
-        # Create a copy of the DataFrame with similarities
-        results_df = self.recipes_df.copy()
-        results_df['similarity'] = similarities
+        with span("search.similarity"):
+            from sklearn.metrics.pairwise import cosine_similarity
+            similarities = cosine_similarity(ingredients_vector, self.ingredients_vectors)[0]
         
-        # Apply filters
-        if cuisine_type:
-            results_df = results_df[results_df['cuisine'].str.lower() == cuisine_type.lower()]
-            
-        if diet_type:
-            results_df = results_df[results_df['diet_type'].str.lower() == diet_type.lower()]
+        # Apply filters as a row mask instead of copying the DataFrame
+        with span("search.filter"):
+            recipes = self.recipes_df
+            mask = np.ones(len(recipes), dtype=bool)
             
-        if max_cook_time:
-            # Convert cook_time to minutes
-            results_df['cook_minutes'] = results_df['cook_time'].str.extract('(\d+)').astype(float)
-            results_df = results_df[results_df['cook_minutes'] <= max_cook_time]
-            
-        if difficulty:
-            results_df = results_df[results_df['difficulty'].str.lower() == difficulty.lower()]
-            
-        if max_calories:
-            results_df = results_df[results_df['calories_per_serving'] <= max_calories]
+            if cuisine_type:
+                mask &= (recipes['cuisine'].str.lower() == cuisine_type.lower()).to_numpy()
+                
+            if diet_type:
+                mask &= (recipes['diet_type'].str.lower() == diet_type.lower()).to_numpy()
+                
+            if max_cook_time:
+                # Convert cook_time to minutes
+                cook_minutes = recipes['cook_time'].str.extract('(\d+)')[0].astype(float)
+                mask &= (cook_minutes <= max_cook_time).to_numpy()
+                
+            if difficulty:
+                mask &= (recipes['difficulty'].str.lower() == difficulty.lower()).to_numpy()
+                
+            if max_calories:
+                mask &= (recipes['calories_per_serving'] <= max_calories).to_numpy()
             
         # Sort by similarity and return top results
-        top_recipes = results_df.nlargest(max_results, 'similarity')
+        with span("search.rank"):
+            candidates = np.flatnonzero(mask)
+            rows = top_rows(similarities, candidates, max_results)
         
-        return top_recipes.to_dict('records')
+        with span("search.hydrate"):
+            results = self._hydrate(rows, similarities[rows], fields=fields)
+        add_matches(results, self.vectorizer, self.ingredients_vectors, ingredients, rows, fields)
+        annotate_search(
+            ingredients,
+            {
+                'cuisine_type': cuisine_type,
+                'diet_type': diet_type,
+                'max_cook_time': max_cook_time,
+                'difficulty': difficulty,
+                'max_calories': max_calories,
+            },
+            candidates=len(candidates),
+            result_count=len(results)
+        )
+        return results
     
     def get_recipe_stats(self) -> Dict:
         """Get statistics about the recipe database"""
@@ -194,55 +308,68 @@ class RecipeProcessor:
         
         return stats
         
+    def build_recipe_neighbors(self, k: int = 10, block_size: Optional[int] = None, workers: Optional[int] = None):
+        """Precompute the k most similar recipes for every recipe (blocks scored on up to workers threads)"""
+        if self.ingredients_vectors is None:
+            raise ValueError("Ingredients not vectorized. Call vectorize_ingredients first.")
+            
+        self.neighbor_table = NeighborTable.build(
+            self.recipes_df['id'].tolist(),
+            self.ingredients_vectors,
+            k=k,
+            block_size=block_size,
+            workers=resolve_workers(workers)
+        )
+        print(f"Built neighbor table with {k} neighbors for {len(self.neighbor_table)} recipes")
+        
     def get_recipe_recommendations(self, recipe_id: str, max_results: int = 3) -> List[Dict]:
         """Get similar recipe recommendations based on a recipe ID"""
         if self.recipes_df is None or self.ingredients_vectors is None:
             raise ValueError("Data not processed")
             
         # Find the recipe
-        recipe = self.recipes_df[self.recipes_df['id'] == recipe_id]
-        if len(recipe) == 0:
+        recipe_idx = self.get_row(recipe_id)
+        if recipe_idx is None:
             raise ValueError(f"Recipe with ID {recipe_id} not found")
             
-        # Get the recipe's vector
-        recipe_idx = recipe.index[0]
-        recipe_vector = self.ingredients_vectors[recipe_idx]
-        
-        # Calculate similarities
-        similarities = cosine_similarity(recipe_vector, self.ingredients_vectors)[0]
-        
-        # Add similarities to DataFrame
-        results_df = self.recipes_df.copy()
-        results_df['similarity'] = similarities
-        
-        # Remove the original recipe
-        results_df = results_df[results_df['id'] != recipe_id]
+        def similarities():
+            from sklearn.metrics.pairwise import cosine_similarity
+            return cosine_similarity(self.ingredients_vectors[recipe_idx], self.ingredients_vectors)[0]
         
-        # Get top similar recipes
-        recommendations = results_df.nlargest(max_results, 'similarity')
-        
-        return recommendations.to_dict('records')
+        # The neighbor table answers when it covers the request, else every recipe is scored
+        return recommend(recipe_id, recipe_idx, self.neighbor_table, similarities, self._hydrate, max_results)
     
     def save_processed_data(self):
         """Save processed data and models"""
         if self.recipes_df is None:
             raise ValueError("No data to save. Process data first.")
             
-        os.makedirs(os.path.join("data", "processed_data"), exist_ok=True)
+        os.makedirs(PROCESSED_DIR, exist_ok=True)
         
-        # Save processed DataFrame
-        self.recipes_df.to_json(os.path.join("data", "processed_data", "processed_recipes.json"), orient='records')
+        # Save processed DataFrame as columnar files, and the vectors it was indexed with
+        save_recipes_table(self.recipes_df, PROCESSED_DIR)
+        if self.ingredients_vectors is not None:
+            save_vectors(self.ingredients_vectors, PROCESSED_DIR)
         
         # Save models
         joblib.dump(self.vectorizer, os.path.join("data", "processed_data", "vectorizer.joblib"))
         joblib.dump(self.kmeans, os.path.join("data", "processed_data", "kmeans.joblib"))
         joblib.dump(self.hierarchical, os.path.join("data", "processed_data", "hierarchical.joblib"))
         
-    def split_data(self, test_size: float = 0.2, random_state: int = 42) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        # Save recipe neighbors
+        if self.neighbor_table is not None:
+            self.neighbor_table.save(os.path.join("data", "processed_data", "neighbors.npz"))
+        
+        # Publish the read-only serving index as a new version; running APIs swap it in
+        if self.ingredients_vectors is not None:
+            publish_index(RecipeIndex.from_processor(self), PROCESSED_DIR)
+        
+    def split_data(self, test_size: float = 0.2, random_state: int = 42) -> Tuple['pd.DataFrame', 'pd.DataFrame']:
         """Split data into training and testing sets"""
         if self.recipes_df is None:
             raise ValueError("No data loaded. Call load_data_from_json first.")
             
+        from sklearn.model_selection import train_test_split
         train_df, test_df = train_test_split(
             self.recipes_df, 
             test_size=test_size, 
@@ -256,48 +383,91 @@ class RecipeProcessor:
         
         return train_df, test_df
     
-    def load_processed_data(self):
-        """Load processed data and models"""
+    def load_processed_data(self, columns: Optional[List[str]] = None, include_text: bool = True):
+        """
+        Load processed data and models
+        
+        Args:
+            columns: Recipe columns to load (all if None); serving only needs
+                the fields it returns and filters on
+            include_text: Also load ingredients, instructions and ingredients_text
+        """
         try:
+            # Saved vectors make the ingredients text unnecessary at load time
+            self.ingredients_vectors = load_vectors(PROCESSED_DIR)
+            
             # Load processed DataFrame
-            self.recipes_df = pd.read_json(os.path.join("data", "processed_data", "processed_recipes.json"))
+            self.recipes_df = load_recipes_table(
+                PROCESSED_DIR,
+                columns=columns,
+                include_text=include_text or self.ingredients_vectors is None
+            )
             
             # Load models
             self.vectorizer = joblib.load(os.path.join("data", "processed_data", "vectorizer.joblib"))
+            if not isinstance(self.vectorizer, RecipeVectorizer):
+                # Saved before vectorizer profiles existed
+                self.vectorizer = RecipeVectorizer.wrap(self.vectorizer)
             self.kmeans = joblib.load(os.path.join("data", "processed_data", "kmeans.joblib"))
             self.hierarchical = joblib.load(os.path.join("data", "processed_data", "hierarchical.joblib"))
             
-            # Recreate ingredients vectors
-            self.ingredients_vectors = self.vectorizer.transform(
-                self.recipes_df['ingredients_text']
-            )
+            self.recipes_df = self.recipes_df.reset_index(drop=True)
+            self.recipes_df['id'] = self.recipes_df['id'].astype(str)
+            self.build_id_index()
+            
+            # Recreate ingredients vectors when they were not saved
+            if self.ingredients_vectors is None:
+                self.ingredients_vectors = self.vectorizer.transform(
+                    self.vectorizer.recipe_texts(self.recipes_df)
+                )
+            
+            # Load recipe neighbors if they were built
+            neighbors_path = os.path.join("data", "processed_data", "neighbors.npz")
+            if os.path.exists(neighbors_path):
+                self.neighbor_table = NeighborTable.load(neighbors_path)
             
             return True
         except Exception as e:
             print(f"Error loading processed data: {str(e)}")
             return False
 
-def main():
-    """Main function to process recipe data"""
+def load_recipe_processor(source: str = PROCESSOR_SOURCE) -> RecipeProcessor:
+    """
+    Get a processor ready to serve searches
+    
+    Args:
+        source: 'auto' to load saved artifacts when they exist, 'train' to
+            fit on MongoDB (or JSON) data
+            
+    The processor has no recipes_df if no data is available.
+    """
     processor = RecipeProcessor()
+    if source == 'auto' and has_recipes_table(PROCESSED_DIR):
+        if processor.load_processed_data():
+            print(f"Loaded {len(processor.recipes_df)} processed recipes")
+            return processor
+        processor = RecipeProcessor()
     
-    # Load data
     if not processor.load_data_from_mongodb():
         if not processor.load_data_from_json():
-            print("Failed to load data")
-            return
+            print("Warning: No recipe data available")
+            return processor
     
-    # Process data
     processor.preprocess_ingredients()
+    processor.vectorize_ingredients()
+    processor.apply_kmeans_clustering()
+    processor.apply_hierarchical_clustering()
+    return processor
+
+def main(workers: Optional[int] = None, chunk_size: int = PROCESSOR_CHUNK_SIZE, rerun_from: Optional[str] = None) -> bool:
+    """
+    Main function to process recipe data
     
-    # Attempt vectorization
-    if processor.vectorize_ingredients():
-        processor.apply_kmeans_clustering()
-        processor.apply_hierarchical_clustering()
-        processor.save_processed_data()
-        print("Data processing complete")
-    else:
-        print("Failed to vectorize ingredients. Data processing incomplete.")
+    Runs the cached, resumable pipeline of data.pipeline; returns False if
+    there was no data or a stage failed.
+    """
+    from data.pipeline import run_pipeline
+    return run_pipeline(workers=workers, chunk_size=chunk_size, rerun_from=rerun_from)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,99 @@
+"""
+Ranking steps shared by RecipeProcessor and RecipeIndex
+
+Both classes serve the same searches and recommendations, the processor
+from its DataFrame and the index from its read-only arrays. Everything
+that does not depend on how the recipes are stored lives here, so both
+rank, match and trace results the same way.
+"""
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+from data.tracing import span, annotate, tracing_request
+
+
+def top_rows(scores: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+    """Get the candidate rows with the k highest scores, best first"""
+    if k <= 0 or len(candidates) == 0:
+        return np.empty(0, dtype=np.int64)
+    if len(candidates) > k:
+        candidates = np.sort(candidates[np.argpartition(-scores[candidates], k - 1)[:k]])
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def match_ingredients(vectorizer, vectors, ingredients: List[str], rows) -> List[Tuple[List[str], List[str]]]:
+    """
+    Split searched ingredients into (matched, missing) for each recipe row
+
+    An ingredient matches a recipe when every vectorizer feature of the
+    ingredient is present in the recipe's vector, which is the same
+    representation the similarity ranking uses. vectorizer is a
+    RecipeVectorizer or QueryVectorizer and vectors the recipe matrix.
+    """
+    rows = list(rows)
+    if not rows or not ingredients:
+        return [([], list(ingredients)) for _ in rows]
+
+    # Features of each searched ingredient and of each recipe, as 0/1 matrices
+    ingredient_features = vectorizer.transform(
+        [vectorizer.query_text([ingredient]) for ingredient in ingredients]
+    ) != 0
+    recipe_features = vectors[rows] != 0
+
+    # Shared features per (recipe, ingredient) against features needed per ingredient
+    shared = (recipe_features.astype(np.int32) @ ingredient_features.astype(np.int32).T).toarray()
+    needed = np.asarray(ingredient_features.sum(axis=1)).ravel()
+    is_match = (shared == needed) & (needed > 0)
+
+    return [
+        ([ing for ing, hit in zip(ingredients, hits) if hit],
+         [ing for ing, hit in zip(ingredients, hits) if not hit])
+        for hits in is_match
+    ]
+
+
+def add_matches(results: List[Dict], vectorizer, vectors, ingredients: List[str], rows,
+                fields: Optional[List[str]] = None):
+    """Set 'matched' and 'missing' on search results, unless fields leaves them out"""
+    if fields is not None and 'matched' not in fields and 'missing' not in fields:
+        return
+    with span("search.match"):
+        for result, (matched, missing) in zip(results, match_ingredients(vectorizer, vectors, ingredients, rows)):
+            if fields is None or 'matched' in fields:
+                result['matched'] = matched
+            if fields is None or 'missing' in fields:
+                result['missing'] = missing
+
+
+def annotate_search(ingredients: List[str], filters: Dict, **details):
+    """Record a search's ingredients, set filters and details for the slow-query log of traced requests"""
+    if tracing_request():
+        annotate(
+            ingredients=list(ingredients),
+            filters={name: value for name, value in filters.items() if value is not None},
+            **details
+        )
+
+
+def recommend(recipe_id: str,
+              row: int,
+              neighbor_table,
+              similarities: Callable[[], np.ndarray],
+              hydrate: Callable,
+              max_results: int) -> List[Dict]:
+    """
+    Recipes most similar to the one at row, best first
+
+    Served from the precomputed neighbor table when it covers the request,
+    else by scoring every recipe with similarities() and ranking all but
+    the recipe itself. hydrate(rows, scores) turns rows into recipe dicts.
+    """
+    if neighbor_table is not None and recipe_id in neighbor_table and max_results <= neighbor_table.k:
+        with span("recommend.neighbors"):
+            neighbors = neighbor_table.lookup(recipe_id, max_results)
+        return hydrate([neighbor_row for neighbor_row, _ in neighbors], [score for _, score in neighbors])
+
+    with span("recommend.similarity"):
+        scores = similarities()
+    candidates = np.flatnonzero(np.arange(len(scores)) != row)
+    rows = top_rows(scores, candidates, max_results)
+    return hydrate(rows, scores[rows])
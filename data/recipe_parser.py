@@ -0,0 +1,266 @@
+"""
+Recipe page parsing for the scrapers
+
+A page is first searched for its schema.org JSON-LD Recipe block, which
+is read straight from the raw HTML without building a document tree.
+Only pages without a usable block are parsed into a tree and read with
+the CSS selectors of the scraper's page layout. The tree is built by the
+fastest installed backend (selectolax, then lxml, then Python's
+html.parser); with the BeautifulSoup backends only the elements the
+layout selects are kept (SoupStrainer).
+"""
+import os
+import re
+import json
+import html as html_lib
+import importlib.util
+from typing import Dict, Iterator, List, Optional, Union
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Tree backend for the CSS fallback: auto (fastest installed), selectolax, lxml or html.parser
+RECIPE_PARSER = os.getenv("RECIPE_PARSER", "auto")
+
+# Backends in order of preference, with the module each one needs
+PARSER_BACKENDS = {'selectolax': 'selectolax', 'lxml': 'lxml', 'html.parser': None}
+
+# CSS selectors of the fields of an AllRecipes recipe page, for pages without structured data
+ALLRECIPES_LAYOUT = {
+    'title': 'h1.article-heading',
+    'ingredients': 'li.mntl-structured-ingredients__list-item',
+    'instructions': 'li.comp.mntl-sc-block-group--LI',
+    'image': 'img.primary-image',
+    'prep_time': 'div.mntl-recipe-details__item--prep-time',
+    'cook_time': 'div.mntl-recipe-details__item--cook-time',
+    'servings': 'div.mntl-recipe-details__item--servings',
+    'tags': 'a.mntl-breadcrumbs__link',
+}
+
+# Layout fields holding several values; the others hold one
+LIST_FIELDS = ['ingredients', 'instructions', 'tags']
+
+JSON_LD_SCRIPT = re.compile(
+    r"<script[^>]*type\s*=\s*[\"']application/ld\+json[\"'][^>]*>(.*?)</script\s*>",
+    re.IGNORECASE | re.DOTALL
+)
+ISO_DURATION = re.compile(r"^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+(?:\.\d+)?)S)?)?$", re.IGNORECASE)
+SELECTOR_HEAD = re.compile(r"^([a-zA-Z][a-zA-Z0-9]*)((?:\.[\w-]+)+)$")
+
+
+def available_backends() -> List[str]:
+    """Installed tree backends, fastest first"""
+    return [name for name, module in PARSER_BACKENDS.items()
+            if module is None or importlib.util.find_spec(module) is not None]
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """Backend to use: the given one, else RECIPE_PARSER, auto meaning the fastest installed"""
+    backend = backend or RECIPE_PARSER
+    if backend == 'auto':
+        return available_backends()[0]
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend: {backend} (choose from auto, {', '.join(PARSER_BACKENDS)})")
+    if backend not in available_backends():
+        raise ValueError(f"Parser backend {backend} is not installed")
+    return backend
+
+
+def _as_text(page: Union[str, bytes]) -> str:
+    return page.decode('utf-8', errors='replace') if isinstance(page, bytes) else page
+
+
+def _clean(value) -> str:
+    """Unescaped, whitespace-collapsed text of a JSON-LD value"""
+    return re.sub(r"\s+", " ", html_lib.unescape(str(value))).strip()
+
+
+def _as_list(value) -> List:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _has_type(node: Dict, name: str) -> bool:
+    return name in _as_list(node.get('@type'))
+
+
+def _json_ld_nodes(page: str) -> Iterator[Dict]:
+    """Every object of the page's JSON-LD blocks, including those of @graph lists"""
+    for match in JSON_LD_SCRIPT.finditer(page):
+        try:
+            # strict=False accepts the raw newlines some sites leave in their strings
+            data = json.loads(match.group(1).strip(), strict=False)
+        except ValueError:
+            continue
+        stack = _as_list(data)
+        while stack:
+            node = stack.pop(0)
+            if isinstance(node, list):
+                stack.extend(node)
+            elif isinstance(node, dict):
+                yield node
+                stack.extend(_as_list(node.get('@graph')))
+
+
+def format_duration(value) -> Optional[str]:
+    """ISO 8601 duration ("PT1H15M") as the sites show it ("1 hr 15 mins"); other text unchanged"""
+    if not value:
+        return None
+    match = ISO_DURATION.match(str(value).strip())
+    if not match or not any(match.groups()):
+        return _clean(value)
+    days, hours, minutes, seconds = (float(part or 0) for part in match.groups())
+    minutes += round(seconds / 60)
+    hours += minutes // 60
+    minutes %= 60
+    days += hours // 24
+    hours %= 24
+    parts = []
+    for amount, unit in ((days, 'day'), (hours, 'hr'), (minutes, 'min')):
+        if amount:
+            parts.append(f"{int(amount)} {unit}{'s' if amount != 1 else ''}")
+    return " ".join(parts) or "0 mins"
+
+
+def _instructions(value) -> List[str]:
+    """Steps of recipeInstructions: text, HowToStep objects or HowToSection lists of them"""
+    if isinstance(value, str):
+        return [_clean(line) for line in re.split(r"\n+", html_lib.unescape(value)) if line.strip()]
+    steps = []
+    for item in _as_list(value):
+        if isinstance(item, str):
+            steps.append(_clean(item))
+        elif isinstance(item, dict) and 'itemListElement' in item:
+            steps.extend(_instructions(item['itemListElement']))
+        elif isinstance(item, dict) and (item.get('text') or item.get('name')):
+            steps.append(_clean(item.get('text') or item.get('name')))
+    return [step for step in steps if step]
+
+
+def _image_url(value) -> Optional[str]:
+    for image in _as_list(value):
+        if isinstance(image, dict):
+            image = image.get('url')
+        if image:
+            return str(image)
+    return None
+
+
+def _breadcrumbs(node: Dict) -> List[str]:
+    items = [item for item in _as_list(node.get('itemListElement')) if isinstance(item, dict)]
+    items.sort(key=lambda item: item.get('position') or 0)
+    names = []
+    for item in items:
+        name = item.get('name')
+        if not name and isinstance(item.get('item'), dict):
+            name = item['item'].get('name')
+        if name:
+            names.append(_clean(name))
+    return names
+
+
+def recipe_from_json_ld(page: Union[str, bytes]) -> Optional[Dict]:
+    """
+    Recipe fields of the page's JSON-LD Recipe block, None if it has none with a name and ingredients
+
+    Tags are the page's breadcrumbs, else the recipe's categories and cuisines.
+    """
+    recipe, breadcrumbs = None, []
+    for node in _json_ld_nodes(_as_text(page)):
+        if recipe is None and _has_type(node, 'Recipe'):
+            recipe = node
+        elif not breadcrumbs and _has_type(node, 'BreadcrumbList'):
+            breadcrumbs = _breadcrumbs(node)
+    if recipe is None or not recipe.get('name') or not recipe.get('recipeIngredient'):
+        return None
+
+    servings = _as_list(recipe.get('recipeYield'))
+    tags = breadcrumbs or [
+        _clean(tag) for tag in _as_list(recipe.get('recipeCategory')) + _as_list(recipe.get('recipeCuisine')) if tag
+    ]
+    return {
+        'title': _clean(recipe['name']),
+        'ingredients': [_clean(ingredient) for ingredient in _as_list(recipe['recipeIngredient']) if ingredient],
+        'instructions': _instructions(recipe.get('recipeInstructions')),
+        'image_url': _image_url(recipe.get('image')),
+        'prep_time': format_duration(recipe.get('prepTime')),
+        'cook_time': format_duration(recipe.get('cookTime')),
+        'servings': _clean(servings[0]) if servings else None,
+        'tags': tags,
+    }
+
+
+def layout_strainer(layout: Dict[str, str]) -> Optional[SoupStrainer]:
+    """
+    SoupStrainer keeping only the elements a layout's selectors start from
+
+    Each selector must start with a tag and class ("li.ingredients-item",
+    "div.recipe-tags a"); the matching elements are kept with everything
+    inside them. None (parse everything) if a selector does not.
+    """
+    names, classes = set(), set()
+    for selector in layout.values():
+        match = SELECTOR_HEAD.match(selector.split()[0])
+        if not match:
+            return None
+        names.add(match.group(1))
+        classes.add(match.group(2).split('.')[-1])
+    # While parsing, the class attribute can still be one space-separated string
+    class_pattern = re.compile(r"(?:^|\s)(?:%s)(?:\s|$)" % "|".join(re.escape(name) for name in sorted(classes)))
+    return SoupStrainer(name=sorted(names), attrs={'class': class_pattern})
+
+
+def recipe_from_html(page: Union[str, bytes],
+                     layout: Dict[str, str],
+                     backend: Optional[str] = None,
+                     strain: bool = True) -> Dict:
+    """
+    Recipe fields read with a layout's CSS selectors
+
+    Args:
+        page: HTML of the recipe page
+        layout: CSS selector per field (title, ingredients, instructions, image,
+            prep_time, cook_time, servings, tags); fields without one are empty
+        backend: Tree backend (see resolve_backend)
+        strain: Only keep the elements the selectors need (BeautifulSoup backends)
+    """
+    backend = resolve_backend(backend)
+    page = _as_text(page)
+
+    if backend == 'selectolax':
+        from selectolax.lexbor import LexborHTMLParser
+        tree = LexborHTMLParser(page)
+        select = tree.css
+        text = lambda node: node.text().strip()
+        attribute = lambda node, name: node.attributes.get(name)
+    else:
+        soup = BeautifulSoup(page, backend, parse_only=layout_strainer(layout) if strain else None)
+        select = soup.select
+        text = lambda node: node.get_text().strip()
+        attribute = lambda node, name: node.get(name)
+
+    fields = {}
+    for field in ['title', 'prep_time', 'cook_time', 'servings']:
+        nodes = select(layout[field]) if field in layout else []
+        fields[field] = text(nodes[0]) if nodes else None
+    for field in LIST_FIELDS:
+        fields[field] = [text(node) for node in select(layout[field])] if field in layout else []
+    images = select(layout['image']) if 'image' in layout else []
+    fields['image_url'] = attribute(images[0], 'src') if images else None
+    return fields
+
+
+def parse_recipe_page(page: Union[str, bytes],
+                      layout: Dict[str, str],
+                      backend: Optional[str] = None,
+                      structured: bool = True) -> Dict:
+    """
+    Recipe fields of a page: its JSON-LD Recipe block, else the layout's CSS selectors
+
+    Fields the page does not have are None (lists are empty).
+    """
+    if structured:
+        fields = recipe_from_json_ld(page)
+        if fields is not None:
+            return fields
+    return recipe_from_html(page, layout, backend)
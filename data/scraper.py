@@ -3,10 +3,17 @@ import time
 import random
 import json
 import os
+import sys
 from bs4 import BeautifulSoup
 from pymongo import MongoClient
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.frontier import CrawlFrontier, LISTING, RECIPE
+from data.recipe_parser import ALLRECIPES_LAYOUT, parse_recipe_page
+from backend.services.recipe_store import recipe_slug
+
 # Load environment variables
 load_dotenv()
 
@@ -44,33 +51,25 @@ categories = [
     "https://www.allrecipes.com/recipes/1227/world-cuisine/"
 ]
 
-def get_recipe_links(category_url, max_pages=3):
-    """Extract recipe links from category pages"""
-    recipe_links = []
-    
-    for page_num in range(1, max_pages + 1):
-        url = f"{category_url}?page={page_num}"
-        try:
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Find recipe cards
-                recipe_cards = soup.find_all("a", class_="mntl-card-list-items")
-                
-                for card in recipe_cards:
-                    link = card.get('href')
-                    if link and '/recipe/' in link:
-                        recipe_links.append(link)
-                
-                # Random delay between requests to avoid being blocked
-                time.sleep(random.uniform(2, 5))
-            else:
-                print(f"Failed to fetch {url}, status code: {response.status_code}")
-        except Exception as e:
-            print(f"Error fetching {url}: {e}")
-    
-    return recipe_links
+def get_listing_links(url):
+    """Extract the recipe links of one category listing page, None if it could not be fetched"""
+    try:
+        response = requests.get(url, headers=headers)
+        if response.status_code != 200:
+            print(f"Failed to fetch {url}, status code: {response.status_code}")
+            return None
+        soup = BeautifulSoup(response.content, 'html.parser')
+        
+        # Find recipe cards
+        recipe_links = []
+        for card in soup.find_all("a", class_="mntl-card-list-items"):
+            link = card.get('href')
+            if link and '/recipe/' in link:
+                recipe_links.append(link)
+        return recipe_links
+    except Exception as e:
+        print(f"Error fetching {url}: {e}")
+        return None
 
 def parse_recipe(url):
     """Parse a single recipe page"""
@@ -80,56 +79,22 @@ def parse_recipe(url):
             print(f"Failed to fetch {url}, status code: {response.status_code}")
             return None
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Get recipe title
-        title_element = soup.find("h1", class_="article-heading")
-        title = title_element.text.strip() if title_element else "Unknown Recipe"
-        
-        # Get ingredients
-        ingredients_list = []
-        ingredients_elements = soup.find_all("li", class_="mntl-structured-ingredients__list-item")
-        for ingredient in ingredients_elements:
-            ingredients_list.append(ingredient.text.strip())
-        
-        # Get instructions
-        instructions_list = []
-        instructions_elements = soup.find_all("li", class_="comp mntl-sc-block-group--LI")
-        for instruction in instructions_elements:
-            instructions_list.append(instruction.text.strip())
-        
-        # Get image URL
-        image_element = soup.find("img", class_="primary-image")
-        image_url = image_element.get('src') if image_element else None
-        
-        # Get preparation and cooking time
-        prep_time_element = soup.find("div", class_="mntl-recipe-details__item--prep-time")
-        prep_time = prep_time_element.text.strip() if prep_time_element else "Not specified"
-        
-        cook_time_element = soup.find("div", class_="mntl-recipe-details__item--cook-time")
-        cook_time = cook_time_element.text.strip() if cook_time_element else "Not specified"
-        
-        # Get serving size
-        serving_element = soup.find("div", class_="mntl-recipe-details__item--servings")
-        servings = serving_element.text.strip() if serving_element else "Not specified"
-        
-        # Get categories/tags
-        tags = []
-        tags_elements = soup.find_all("a", class_="mntl-breadcrumbs__link")
-        for tag in tags_elements:
-            tags.append(tag.text.strip())
+        # Structured data first, the page layout's selectors otherwise
+        fields = parse_recipe_page(response.content, ALLRECIPES_LAYOUT)
+        ingredients_list = fields["ingredients"]
         
         # Create recipe object
         recipe = {
-            "title": title,
+            "title": fields["title"] or "Unknown Recipe",
             "url": url,
+            "slug": recipe_slug(url),
             "ingredients": ingredients_list,
-            "instructions": instructions_list,
-            "image_url": image_url,
-            "prep_time": prep_time,
-            "cook_time": cook_time,
-            "servings": servings,
-            "tags": tags,
+            "instructions": fields["instructions"],
+            "image_url": fields["image_url"],
+            "prep_time": fields["prep_time"] or "Not specified",
+            "cook_time": fields["cook_time"] or "Not specified",
+            "servings": fields["servings"] or "Not specified",
+            "tags": fields["tags"],
             "ingredients_simple": [i.split(',')[0].strip().lower() for i in ingredients_list],
             "scraped_at": time.time()
         }
@@ -179,42 +144,73 @@ def save_to_json(recipe, filename="recipes.json"):
     except Exception as e:
         print(f"Error saving to JSON: {e}")
 
-def main():
-    """Main function to run the scraper"""
-    all_recipe_links = []
+def seed_frontier(frontier):
+    """Fill a new frontier from the links files and recipes of runs before it existed"""
+    for name in sorted(os.listdir("raw_data")):
+        if name.startswith("links_") and name.endswith(".txt"):
+            category_name = name[len("links_"):-len(".txt")]
+            with open(os.path.join("raw_data", name)) as f:
+                frontier.add_many([line.strip() for line in f if line.strip()], category=category_name)
+    
+    # Recipes already in MongoDB count as fetched when they were scraped
+    scraped = ((recipe["url"], recipe.get("scraped_at")) for recipe in
+               recipes_collection.find({"url": {"$exists": True}}, {"url": 1, "scraped_at": 1}))
+    print(f"Seeded the crawl frontier with {frontier.seed_fetched(scraped)} scraped recipes")
+
+def main(max_pages=2):
+    """
+    Main function to run the scraper
     
+    Progress is kept in the crawl frontier (see data/frontier.py): a rerun
+    continues with the pages that are still pending, retries failures that
+    are due and only revisits pages that became stale.
+    """
     # Create data directory if it doesn't exist
     os.makedirs("raw_data", exist_ok=True)
     
-    for category_url in categories:
-        category_name = category_url.split('/')[-2]
-        print(f"Scraping category: {category_name}")
-        
-        recipe_links = get_recipe_links(category_url, max_pages=2)
-        all_recipe_links.extend(recipe_links)
-        
-        print(f"Found {len(recipe_links)} recipes in {category_name}")
-        
-        # Save links to file
-        with open(f"raw_data/links_{category_name}.txt", "w") as f:
-            for link in recipe_links:
-                f.write(f"{link}\n")
-    
-    # Remove duplicates
-    all_recipe_links = list(set(all_recipe_links))
-    print(f"Total unique recipes to scrape: {len(all_recipe_links)}")
-    
-    # Scrape recipes
-    for i, link in enumerate(all_recipe_links):
-        print(f"Scraping recipe {i+1}/{len(all_recipe_links)}: {link}")
-        
-        recipe = parse_recipe(link)
-        if recipe:
-            save_to_mongodb(recipe)
-            save_to_json(recipe, "raw_data/recipes.json")
+    with CrawlFrontier() as frontier:
+        if len(frontier) == 0:
+            seed_frontier(frontier)
+        
+        # Category listing pages, earlier categories first
+        for priority, category_url in enumerate(categories):
+            category_name = category_url.split('/')[-2]
+            frontier.add_many(
+                [f"{category_url}?page={page_num}" for page_num in range(1, max_pages + 1)],
+                kind=LISTING, category=category_name, priority=priority
+            )
+        
+        for entry in frontier.iter_due(LISTING):
+            print(f"Scraping category page: {entry.url}")
+            recipe_links = get_listing_links(entry.url)
+            if recipe_links is None:
+                frontier.mark_failed(entry.url, "listing fetch failed")
+            else:
+                new_links = frontier.add_many(recipe_links, category=entry.category, priority=entry.priority)
+                frontier.mark_fetched(entry.url)
+                print(f"Found {len(recipe_links)} recipes ({new_links} new) in {entry.category}")
+            
+            # Random delay between requests to avoid being blocked
+            time.sleep(random.uniform(2, 5))
+        
+        print(f"Recipes due: {frontier.stats().get(RECIPE, {}).get('due', 0)}")
+        
+        # Scrape recipes
+        for i, entry in enumerate(frontier.iter_due(RECIPE)):
+            print(f"Scraping recipe {i+1}: {entry.url}")
+            
+            recipe = parse_recipe(entry.url)
+            if recipe:
+                save_to_mongodb(recipe)
+                save_to_json(recipe, "raw_data/recipes.json")
+                frontier.mark_fetched(entry.url)
+            else:
+                frontier.mark_failed(entry.url, "fetch or parse failed")
+            
+            # Random delay between requests
+            time.sleep(random.uniform(3, 7))
         
-        # Random delay between requests
-        time.sleep(random.uniform(3, 7))
+        print(f"Crawl frontier: {frontier.stats()}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
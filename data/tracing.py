@@ -0,0 +1,197 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# Tracing is on unless METRICS_ENABLED is set to 0/false/no
+_enabled = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+
+# Bucket upper bounds in seconds, from sub-millisecond stages to slow requests
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def enabled() -> bool:
+    """Whether spans and request timings are being recorded"""
+    return _enabled
+
+
+def set_enabled(flag: bool):
+    """Turn tracing on or off at runtime"""
+    global _enabled
+    _enabled = flag
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    """Thread-safe histogram with one series per label combination"""
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        """Record one value for the given label values (in label_names order)"""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict]:
+        """Counts, sum and count of every series"""
+        with self._lock:
+            return {
+                labels: {"buckets": list(counts), "sum": total, "count": count}
+                for labels, (counts, total, count) in self._series.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> List[str]:
+        """Prometheus text exposition lines, with cumulative buckets"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.snapshot().items()):
+            pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = ",".join(pairs + [f'le="{le}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            label_text = f'{{{",".join(pairs)}}}' if pairs else ""
+            lines.append(f"{self.name}_sum{label_text} {series['sum']:.9g}")
+            lines.append(f"{self.name}_count{label_text} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named histograms rendered together at /metrics"""
+    def __init__(self):
+        self._metrics: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help_text: str, label_names: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        """Get or create a histogram"""
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, help_text, label_names, buckets)
+            return self._metrics[name]
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            for metric in self._metrics.values():
+                metric.reset()
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "ingreedy_stage_seconds", "Time spent in each traced stage", ("stage",)
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "ingreedy_request_seconds", "HTTP request handling time", ("method", "route", "status")
+)
+
+# Shared no-op returned by span() while tracing is disabled
+_NOOP_SPAN = nullcontext()
+
+# Stage timings and attributes of the request being handled, when one is traced
+_current_trace: ContextVar[Optional[Dict]] = ContextVar("ingreedy_trace", default=None)
+
+
+def start_trace() -> Tuple[Dict, object]:
+    """
+    Start collecting the spans and attributes of the current request
+
+    Works whether or not metrics are enabled. Returns the trace and a token
+    for end_trace.
+    """
+    trace = {"stages": [], "attributes": {}}
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token):
+    """Stop collecting into the trace started with start_trace"""
+    _current_trace.reset(token)
+
+
+def tracing_request() -> bool:
+    """Whether the current request is being traced"""
+    return _current_trace.get() is not None
+
+
+def annotate(**attributes):
+    """Attach attributes (e.g. ingredients, candidate count) to the current request's trace"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace["attributes"].update(attributes)
+
+
+class Span:
+    """Times a block and records it in the stage histogram and the current trace"""
+    __slots__ = ("name", "start", "elapsed")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = 0.0
+        self.elapsed: Optional[float] = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.start
+        if _enabled:
+            STAGE_SECONDS.observe(self.elapsed, self.name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace["stages"].append((self.name, self.elapsed))
+        return False
+
+
+def span(name: str):
+    """
+    Context manager timing a stage, e.g. `with span("search.similarity"):`
+
+    Returns a shared no-op when tracing is disabled and no request is traced.
+    """
+    if not _enabled and _current_trace.get() is None:
+        return _NOOP_SPAN
+    return Span(name)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float):
+    """Record the handling time of one HTTP request"""
+    REQUEST_SECONDS.observe(seconds, method, route, str(status))
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text format"""
+    return REGISTRY.render()
@@ -0,0 +1,304 @@
+import os
+import re
+from numbers import Integral
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from data.lazy import lazy_import
+from data.parallel import PROCESSOR_CHUNK_SIZE, chunk_bounds, map_chunks, resolve_workers
+
+sparse = lazy_import("scipy.sparse")
+
+# Vectorizer profile used by new processors unless one is passed explicitly
+VECTORIZER_PROFILE = os.getenv("VECTORIZER_PROFILE", "default")
+
+# Token pattern of the ingredient-level profiles: documents are space-separated
+# canonical ingredient names with their inner spaces replaced by '_'
+INGREDIENT_TOKEN_PATTERN = r"[^ ]+"
+
+# Ways to turn recipes into TF-IDF features:
+#   default: words of the raw ingredient lines (quantities, units and prep
+#       words included), unbounded vocabulary, float64
+#   ingredients: one token per canonical ingredient name, rare names dropped,
+#       capped vocabulary, float32
+#   hashing: canonical ingredient names hashed into a fixed number of columns
+#       with IDF weights; no vocabulary, so new recipes never need a refit
+PROFILES: Dict[str, Dict] = {
+    'default': {'input': 'text'},
+    'ingredients': {'input': 'ingredients', 'min_df': 2, 'max_features': 20000, 'dtype': 'float32'},
+    'hashing': {'input': 'ingredients', 'hashing': True, 'n_features': 2 ** 18, 'dtype': 'float32'},
+}
+
+# Measures that may follow a leading quantity ("2 cups flour", "3 cloves garlic")
+UNITS = ['cup', 'tablespoon', 'tbsp', 'teaspoon', 'tsp', 'ounce', 'oz', 'pound', 'lb', 'gram', 'g', 'kg',
+         'milliliter', 'ml', 'liter', 'l', 'quart', 'pint', 'gallon', 'pinch', 'dash', 'clove', 'can',
+         'package', 'slice', 'stick', 'bunch', 'sprig', 'head', 'piece', 'jar']
+
+# Preparation and size words that do not change what the ingredient is
+PREP_WORDS = ['chopped', 'diced', 'minced', 'sliced', 'grated', 'shredded', 'crushed', 'softened', 'melted',
+              'beaten', 'peeled', 'divided', 'drained', 'rinsed', 'cubed', 'halved', 'finely', 'coarsely',
+              'thinly', 'large', 'medium', 'small', 'to taste', 'or as needed', 'as needed', 'optional']
+
+_QUANTITY_RE = re.compile(
+    r"^[\d\s/.\-½¼¾⅓⅔⅛]+(?:(?:%s)(?:es|s)?\b\.?)?" % "|".join(sorted(UNITS, key=len, reverse=True))
+)
+_PREP_RE = re.compile(r"\b(?:%s)\b" % "|".join(re.escape(word) for word in PREP_WORDS))
+_PARENS_RE = re.compile(r"\([^)]*\)")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def canonical_ingredient(line: str) -> str:
+    """
+    Canonical name of an ingredient line or searched ingredient
+
+    '2 cups onion, finely chopped' -> 'onion', '1 pinch salt (optional)' -> 'salt'.
+    Descriptive words such as 'smoked' or 'brown' are kept.
+    """
+    name = _PARENS_RE.sub(' ', line.lower()).split(',')[0]
+    name = _QUANTITY_RE.sub(' ', name.strip())
+    name = _PREP_RE.sub(' ', name)
+    name = _NUMBER_RE.sub(' ', name)
+    return _SPACES_RE.sub(' ', name).strip(' -')
+
+
+def ingredient_tokens(ingredients: Sequence[str]) -> str:
+    """Document of canonical ingredient names, one token each (e.g. 'olive_oil garlic')"""
+    names = (canonical_ingredient(ingredient) for ingredient in ingredients if isinstance(ingredient, str))
+    return ' '.join(name.replace(' ', '_') for name in names if name)
+
+
+def query_text(ingredients: Sequence[str], input_type: str = 'text') -> str:
+    """Text a list of searched ingredients is vectorized from, for a profile's input type"""
+    if input_type == 'ingredients':
+        return ingredient_tokens(ingredients)
+    return ' '.join(ingredients)
+
+
+def recipe_texts(values: Sequence, input_type: str = 'text') -> List[str]:
+    """Texts recipes are vectorized from: their ingredients text, or canonical ingredient tokens"""
+    if input_type == 'ingredients':
+        return [
+            ingredient_tokens(ingredients if isinstance(ingredients, (list, tuple, np.ndarray)) else [ingredients])
+            for ingredients in values
+        ]
+    return list(values)
+
+
+# TfidfVectorizer settings that apply to the whole corpus rather than to counting one chunk
+_CORPUS_PARAMS = ['max_df', 'min_df', 'max_features', 'vocabulary', 'norm', 'use_idf', 'smooth_idf', 'sublinear_tf']
+
+
+def _count_chunk(values: Sequence, input_type: str, params: Dict, hashing: bool) -> Tuple[Optional[Dict[str, int]], object]:
+    """
+    Normalize, tokenize and count one chunk of recipes (runs in a worker process)
+
+    Returns the chunk's own vocabulary (None when hashing) and its term count matrix.
+    """
+    texts = recipe_texts(values, input_type)
+    if hashing:
+        from sklearn.feature_extraction.text import HashingVectorizer
+        return None, HashingVectorizer(**params).transform(texts)
+
+    from sklearn.feature_extraction.text import CountVectorizer
+    counter = CountVectorizer(**params)
+    try:
+        counts = counter.fit_transform(texts)
+    except ValueError:
+        # No recipe of the chunk has a token; other chunks may
+        return {}, sparse.csr_matrix((len(texts), 0), dtype=params.get('dtype', np.float64))
+    return counter.vocabulary_, counts
+
+
+def murmurhash3_32(data: bytes, seed: int = 0) -> int:
+    """Signed 32-bit MurmurHash3 (x86), the hash HashingVectorizer uses for its columns"""
+    c1, c2, mask = 0xcc9e2d51, 0x1b873593, 0xffffffff
+    length = len(data)
+    h1 = seed & mask
+    rounded_end = length & ~3
+    for i in range(0, rounded_end, 4):
+        k1 = int.from_bytes(data[i:i + 4], 'little')
+        k1 = (k1 * c1) & mask
+        k1 = ((k1 << 15) | (k1 >> 17)) & mask
+        k1 = (k1 * c2) & mask
+        h1 ^= k1
+        h1 = ((h1 << 13) | (h1 >> 19)) & mask
+        h1 = (h1 * 5 + 0xe6546b64) & mask
+
+    k1 = 0
+    tail = length & 3
+    if tail == 3:
+        k1 ^= data[rounded_end + 2] << 16
+    if tail >= 2:
+        k1 ^= data[rounded_end + 1] << 8
+    if tail >= 1:
+        k1 ^= data[rounded_end]
+        k1 = (k1 * c1) & mask
+        k1 = ((k1 << 15) | (k1 >> 17)) & mask
+        k1 = (k1 * c2) & mask
+        h1 ^= k1
+
+    h1 ^= length
+    h1 ^= h1 >> 16
+    h1 = (h1 * 0x85ebca6b) & mask
+    h1 ^= h1 >> 13
+    h1 = (h1 * 0xc2b2ae35) & mask
+    h1 ^= h1 >> 16
+    return h1 - (1 << 32) if h1 & 0x80000000 else h1
+
+
+def hashed_column(token: str, n_features: int) -> int:
+    """Column HashingVectorizer puts a token in"""
+    h = murmurhash3_32(token.encode('utf-8'))
+    if h == -2 ** 31:
+        return (2 ** 31 - 1 - (n_features - 1)) % n_features
+    return abs(h) % n_features
+
+
+class RecipeVectorizer:
+    """
+    TF-IDF features of recipe ingredients for one profile (see PROFILES)
+
+    Wraps the scikit-learn vectorizer of the profile together with how
+    recipes and searches are turned into text, so the same preparation is
+    used when fitting, adding recipes and searching.
+    """
+    def __init__(self, profile: str = VECTORIZER_PROFILE):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown vectorizer profile: {profile} (choose from {', '.join(PROFILES)})")
+        self.profile = profile
+        settings = PROFILES[profile]
+        self.input = settings['input']
+        dtype = np.dtype(settings.get('dtype', 'float64')).type
+
+        from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer
+        token_pattern = INGREDIENT_TOKEN_PATTERN if self.input == 'ingredients' else r"(?u)\b\w\w+\b"
+        if settings.get('hashing'):
+            self.model = HashingVectorizer(
+                n_features=settings['n_features'],
+                token_pattern=token_pattern,
+                alternate_sign=False,
+                norm=None,
+                dtype=dtype
+            )
+            self.idf_model = TfidfTransformer()
+        else:
+            self.model = TfidfVectorizer(
+                token_pattern=token_pattern,
+                min_df=settings.get('min_df', 1),
+                max_features=settings.get('max_features'),
+                dtype=dtype
+            )
+            self.idf_model = None
+
+    @classmethod
+    def wrap(cls, model) -> "RecipeVectorizer":
+        """Wrap a fitted TfidfVectorizer saved before profiles existed (default profile)"""
+        vectorizer = cls.__new__(cls)
+        vectorizer.profile = 'default'
+        vectorizer.input = 'text'
+        vectorizer.model = model
+        vectorizer.idf_model = None
+        return vectorizer
+
+    @property
+    def hashing(self) -> bool:
+        return self.idf_model is not None
+
+    def _text_column(self, recipes_df):
+        return recipes_df['ingredients' if self.input == 'ingredients' else 'ingredients_text']
+
+    def recipe_texts(self, recipes_df) -> List[str]:
+        """Texts the recipes of a prepared frame (see RecipeProcessor) are vectorized from"""
+        return recipe_texts(self._text_column(recipes_df).tolist(), self.input)
+
+    def query_text(self, ingredients: Sequence[str]) -> str:
+        """Text a list of searched ingredients is vectorized from"""
+        return query_text(ingredients, self.input)
+
+    def fit_transform(self, texts: Sequence[str]):
+        if self.hashing:
+            return self.idf_model.fit_transform(self.model.transform(texts))
+        return self.model.fit_transform(texts)
+
+    def transform(self, texts: Sequence[str]):
+        if self.hashing:
+            return self.idf_model.transform(self.model.transform(texts))
+        return self.model.transform(texts)
+
+    def fit_transform_recipes(self,
+                              recipes_df,
+                              workers: Optional[int] = None,
+                              chunk_size: int = PROCESSOR_CHUNK_SIZE):
+        """
+        Fit on the recipes of a prepared frame and return their TF-IDF matrix
+
+        Corpora larger than one chunk are normalized, tokenized and counted
+        chunk by chunk in a process pool. The chunk vocabularies are merged
+        and pruned like TfidfVectorizer does (min_df, max_df, max_features),
+        so the fitted model and matrix are the same as fit_transform's (up to
+        float rounding).
+
+        Args:
+            recipes_df: Frame prepared by RecipeProcessor
+            workers: Worker processes (see data.parallel.resolve_workers)
+            chunk_size: Recipes per chunk
+        """
+        chunks = chunk_bounds(len(recipes_df), chunk_size)
+        fixed = not self.hashing and (self.model.vocabulary is not None or not self.model.use_idf)
+        if len(chunks) <= 1 or resolve_workers(workers) <= 1 or fixed:
+            return self.fit_transform(self.recipe_texts(recipes_df))
+
+        values = self._text_column(recipes_df).tolist()
+        params = {name: value for name, value in self.model.get_params().items() if name not in _CORPUS_PARAMS}
+        results = map_chunks(
+            _count_chunk,
+            [values[bounds.start:bounds.stop] for bounds in chunks],
+            args=(self.input, params, self.hashing),
+            workers=workers
+        )
+        if self.hashing:
+            return self.idf_model.fit_transform(sparse.vstack([counts for _, counts in results], format='csr'))
+
+        # Merge the chunk vocabularies into one sorted vocabulary, as TfidfVectorizer orders it
+        terms = sorted(set().union(*(vocabulary for vocabulary, _ in results)))
+        column_of = {term: column for column, term in enumerate(terms)}
+        blocks = []
+        for vocabulary, counts in results:
+            mapping = np.empty(len(vocabulary), dtype=counts.indices.dtype)
+            for term, local_column in vocabulary.items():
+                mapping[local_column] = column_of[term]
+            blocks.append(sparse.csr_matrix((counts.data, mapping[counts.indices], counts.indptr),
+                                            shape=(counts.shape[0], len(terms))))
+        counts = sparse.vstack(blocks, format='csr')
+        counts.sort_indices()
+
+        # Prune rare, common and surplus terms with TfidfVectorizer's rules
+        n_docs = counts.shape[0]
+        max_df, min_df, max_features = self.model.max_df, self.model.min_df, self.model.max_features
+        max_doc_count = max_df if isinstance(max_df, Integral) else max_df * n_docs
+        min_doc_count = min_df if isinstance(min_df, Integral) else min_df * n_docs
+        document_frequency = np.bincount(counts.indices, minlength=len(terms))
+        mask = (document_frequency <= max_doc_count) & (document_frequency >= min_doc_count)
+        if max_features is not None and mask.sum() > max_features:
+            term_frequency = np.asarray(counts.sum(axis=0)).ravel()
+            keep = (-term_frequency[mask]).argsort()[:max_features]
+            new_mask = np.zeros(len(terms), dtype=bool)
+            new_mask[np.where(mask)[0][keep]] = True
+            mask = new_mask
+        kept = np.where(mask)[0]
+        if len(kept) == 0:
+            raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+        counts = counts[:, kept]
+
+        from sklearn.feature_extraction.text import TfidfTransformer
+        transformer = TfidfTransformer(
+            norm=self.model.norm,
+            use_idf=self.model.use_idf,
+            smooth_idf=self.model.smooth_idf,
+            sublinear_tf=self.model.sublinear_tf
+        )
+        vectors = transformer.fit_transform(counts)
+        self.model.vocabulary_ = {terms[column]: position for position, column in enumerate(kept)}
+        if self.model.use_idf:
+            self.model.idf_ = transformer.idf_
+        return vectors
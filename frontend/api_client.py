@@ -0,0 +1,120 @@
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional, Tuple
+
+# Backend endpoints: (ingredients path, search path)
+ENDPOINTS = {
+    "FastAPI": ("/ingredients", "/recipes"),
+    "Flask": ("/ingredients", "/recipes/search"),
+}
+
+
+class CircuitBreaker:
+    """Remembers whether a backend is healthy so requests skip it while it is down"""
+
+    def __init__(self, reset_timeout: float = 30.0):
+        self.reset_timeout = reset_timeout
+        self.healthy: Optional[bool] = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Closed or never checked: allow. Open: allow one trial once reset_timeout has passed"""
+        with self._lock:
+            if self.healthy is not False:
+                return True
+            if time.monotonic() - self.checked_at >= self.reset_timeout:
+                # Half-open: let this request through and hold off the others
+                self.checked_at = time.monotonic()
+                return True
+            return False
+
+    def record(self, healthy: bool):
+        with self._lock:
+            self.healthy = healthy
+            self.checked_at = time.monotonic()
+
+    def is_fresh(self, ttl: float) -> bool:
+        """Whether the last recorded outcome is younger than ttl seconds"""
+        return self.healthy is not None and time.monotonic() - self.checked_at < ttl
+
+
+class ApiClient:
+    """HTTP client for the recipe APIs with pooled connections and per-backend circuit breakers"""
+
+    def __init__(self,
+                 backends: Dict[str, str],
+                 timeout: Tuple[float, float] = (2.0, 5.0),
+                 health_ttl: float = 30.0,
+                 pool_size: int = 10):
+        """
+        Args:
+            backends: Backend name -> base URL, in order of preference
+            timeout: (connect, read) timeout in seconds
+            health_ttl: Seconds a backend's health is remembered before it is probed again
+            pool_size: Number of pooled connections per backend
+        """
+        self.backends = backends
+        self.timeout = timeout
+        self.health_ttl = health_ttl
+        self.breakers = {name: CircuitBreaker(reset_timeout=health_ttl) for name in backends}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(backends), pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _get(self, name: str, path: str, params: Optional[Dict] = None) -> Optional[requests.Response]:
+        """GET a backend path, recording the outcome on its circuit breaker"""
+        breaker = self.breakers[name]
+        if not breaker.allow_request():
+            return None
+
+        try:
+            response = self.session.get(f"{self.backends[name]}{path}", params=params, timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            breaker.record(False)
+            return None
+
+        # Server errors count against the backend, client errors don't
+        breaker.record(response.status_code < 500)
+        return response if response.status_code == 200 else None
+
+    def get_ingredients(self) -> List[str]:
+        """Get all available ingredients from the first backend that answers"""
+        for name in self.backends:
+            response = self._get(name, ENDPOINTS[name][0])
+            if response is not None:
+                data = response.json()
+                return data["ingredients"] if isinstance(data, dict) else data
+        return []
+
+    def search_recipes(self, ingredients: List[str], max_results: int = 5) -> Optional[Dict]:
+        """Search recipes on the first backend that answers, or None if none does"""
+        params = {"ingredients": ",".join(ingredients), "max_results": max_results}
+        for name in self.backends:
+            response = self._get(name, ENDPOINTS[name][1], params=params)
+            if response is not None:
+                return response.json()
+        return None
+
+    def get_recipe(self, recipe_id: str) -> Optional[Dict]:
+        """Get a full recipe by ID from the first backend that has it"""
+        for name in self.backends:
+            response = self._get(name, f"/recipes/{recipe_id}")
+            if response is not None:
+                return response.json()
+        return None
+
+    def is_healthy(self, name: str) -> bool:
+        """Whether a backend is up, probing it only when its remembered health has expired"""
+        breaker = self.breakers[name]
+        if not breaker.is_fresh(self.health_ttl):
+            try:
+                response = self.session.get(self.backends[name], timeout=self.timeout)
+                breaker.record(response.status_code == 200)
+            except requests.exceptions.RequestException:
+                breaker.record(False)
+        return bool(breaker.healthy)
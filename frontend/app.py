@@ -1,9 +1,9 @@
 import os
-import requests
 import json
 import streamlit as st
 from streamlit_chat import message
 from dotenv import load_dotenv
+from api_client import ApiClient
 
 # Load environment variables
 load_dotenv()
@@ -12,6 +12,11 @@ load_dotenv()
 FLASK_API_URL = os.getenv("FLASK_API_URL", "http://localhost:5000")
 FASTAPI_URL = os.getenv("FASTAPI_URL", "http://localhost:8000")
 
+# Cache lifetimes in seconds
+HEALTH_CACHE_TTL = int(os.getenv("HEALTH_CACHE_TTL", 15))
+INGREDIENTS_CACHE_TTL = int(os.getenv("INGREDIENTS_CACHE_TTL", 3600))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 600))
+
 # App configuration
 st.set_page_config(
     page_title="Ingreedy - Recipe Finder",
@@ -370,28 +375,53 @@ if 'search_executed' not in st.session_state:
 if 'found_recipes' not in st.session_state:
     st.session_state['found_recipes'] = []
 
-# Function to check API connection with timeout handling
-def is_api_connected(url, timeout=5):
-    try:
-        response = requests.get(url, timeout=timeout)
-        return response.status_code == 200
-    except requests.exceptions.RequestException:
-        return False
+# Cached API access. Streamlit reruns this script on every interaction, so
+# anything fetched from the APIs goes through these caches.
+@st.cache_resource
+def get_api_client():
+    """API client (pooled session and backend health) shared by all sessions and reruns"""
+    return ApiClient({"FastAPI": FASTAPI_URL, "Flask": FLASK_API_URL})
+
+@st.cache_data(ttl=HEALTH_CACHE_TTL, show_spinner=False)
+def get_api_status():
+    """Backend name -> whether it is connected"""
+    client = get_api_client()
+    return {name: client.is_healthy(name) for name in client.backends}
+
+@st.cache_data(ttl=INGREDIENTS_CACHE_TTL, show_spinner=False)
+def fetch_ingredients():
+    """Ingredient vocabulary; raises when no API answers so failures aren't cached"""
+    ingredients = get_api_client().get_ingredients()
+    if not ingredients:
+        raise ConnectionError("No recipe API returned ingredients")
+    return sorted(ingredients)
+
+@st.cache_data(ttl=SEARCH_CACHE_TTL, max_entries=256, show_spinner=False)
+def fetch_search_results(ingredients_key):
+    """Search results for a normalized ingredients tuple; raises when no API answers"""
+    results = get_api_client().search_recipes(list(ingredients_key), max_results=5)
+    if results is None:
+        raise ConnectionError("No recipe API is available")
+    return results
+
+@st.cache_data(ttl=SEARCH_CACHE_TTL, max_entries=512, show_spinner=False)
+def fetch_recipe(recipe_id):
+    """Full recipe for a search result; raises when no API has it so misses aren't cached"""
+    recipe = get_api_client().get_recipe(recipe_id)
+    if recipe is None:
+        raise LookupError(f"Recipe {recipe_id} is not available")
+    return recipe
+
+def normalize_ingredients(ingredients):
+    """Cache key for a search: lowercased, de-duplicated and sorted ingredients"""
+    return tuple(sorted({ing.strip().lower() for ing in ingredients if ing.strip()}))
 
 # Functions
 def get_ingredients():
     """Get all available ingredients from API"""
     try:
-        if is_api_connected(f"{FASTAPI_URL}/ingredients", timeout=5):
-            response = requests.get(f"{FASTAPI_URL}/ingredients", timeout=5)
-            if response.status_code == 200:
-                return response.json()
-        
-        if is_api_connected(f"{FLASK_API_URL}/ingredients", timeout=5):
-            response = requests.get(f"{FLASK_API_URL}/ingredients", timeout=5)
-            if response.status_code == 200:
-                return response.json()['ingredients']
-                
+        return fetch_ingredients()
+    except ConnectionError:
         return []
     except Exception as e:
         st.error(f"Error retrieving ingredients: {e}")
@@ -399,31 +429,11 @@ def get_ingredients():
 
 def search_recipes(ingredients):
     """Search for recipes with the given ingredients"""
-    ingredients_str = ",".join(ingredients)
-    
     try:
-        # Try FastAPI first
-        if is_api_connected(FASTAPI_URL, timeout=5):
-            response = requests.get(
-                f"{FASTAPI_URL}/recipes",
-                params={"ingredients": ingredients_str, "max_results": 5},
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-        
-        # If FastAPI fails, try Flask
-        if is_api_connected(FLASK_API_URL, timeout=5):
-            response = requests.get(
-                f"{FLASK_API_URL}/recipes/search",
-                params={"ingredients": ingredients_str},
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-        
+        # FastAPI first, then Flask, skipping backends known to be down
+        return fetch_search_results(normalize_ingredients(ingredients))
+    
+    except ConnectionError:
         # If both APIs fail, return a fallback response
         st.warning("⚠️ Unable to connect to recipe APIs. Using demo mode with sample recipes.")
         return {
@@ -565,7 +575,7 @@ with col1:
     st.markdown("<h3 class='section-title'>Popular Ingredients</h3>", unsafe_allow_html=True)
     all_ingredients = get_ingredients()
     if all_ingredients:
-        sample_ingredients = sorted(all_ingredients)[:15]  # Take first 15 alphabetically
+        sample_ingredients = all_ingredients[:15]  # Take first 15 alphabetically
         st.markdown("<div style='background-color: white; padding: 15px; border-radius: 10px; box-shadow: 0 2px 5px rgba(0,0,0,0.1);'>", unsafe_allow_html=True)
         st.write("Try some of these ingredients:")
         
@@ -611,37 +621,44 @@ with col2:
                         st.markdown(f"<span class='recipe-detail'>🍽️ Serves: {recipe['servings']}</span>", unsafe_allow_html=True)
                     st.markdown("</div>", unsafe_allow_html=True)
                     
-                    # Highlight matched ingredients
-                    if st.session_state.ingredients:
-                        matched = []
-                        for user_ing in st.session_state.ingredients:
-                            for recipe_ing in recipe.get('ingredients_simple', []):
-                                if user_ing in recipe_ing:
-                                    matched.append(user_ing)
-                                    break
-                        
-                        if matched:
-                            st.markdown("<p><strong>Your ingredients used:</strong></p>", unsafe_allow_html=True)
-                            st.markdown(", ".join(f"<span class='matched-ingredient'>{ing}</span>" 
-                                                for ing in matched), unsafe_allow_html=True)
-                
-                # Ingredients
-                st.markdown("<h4>Ingredients:</h4>", unsafe_allow_html=True)
-                ingredients_list = recipe.get('ingredients', [])
-                cols = st.columns(2)
-                half = len(ingredients_list) // 2 + len(ingredients_list) % 2
-                
-                for i, ingredient in enumerate(ingredients_list[:half]):
-                    cols[0].write(f"• {ingredient}")
+                    # Highlight matched ingredients, as computed by the search backend
+                    matched = recipe.get('matched', [])
+                    if matched:
+                        st.markdown("<p><strong>Your ingredients used:</strong></p>", unsafe_allow_html=True)
+                        st.markdown(", ".join(f"<span class='matched-ingredient'>{ing}</span>" 
+                                            for ing in matched), unsafe_allow_html=True)
+                    
+                    missing = recipe.get('missing', [])
+                    if missing:
+                        st.markdown(f"<p><strong>Not used:</strong> {', '.join(missing)}</p>", unsafe_allow_html=True)
                 
-                for i, ingredient in enumerate(ingredients_list[half:]):
-                    cols[1].write(f"• {ingredient}")
+                # Search results are summaries; the full recipe is loaded on demand
+                details = recipe if 'ingredients' in recipe else None
+                if details is None and recipe.get('id') is not None:
+                    if st.checkbox("Show ingredients and instructions", key=f"details_{recipe['id']}"):
+                        try:
+                            details = fetch_recipe(recipe['id'])
+                        except LookupError:
+                            st.warning("Full recipe is not available right now.")
                 
-                # Instructions
-                with st.expander("Show Instructions"):
-                    instructions = recipe.get('instructions', [])
-                    for i, instruction in enumerate(instructions, 1):
-                        st.write(f"{i}. {instruction}")
+                if details is not None:
+                    # Ingredients
+                    st.markdown("<h4>Ingredients:</h4>", unsafe_allow_html=True)
+                    ingredients_list = details.get('ingredients', [])
+                    cols = st.columns(2)
+                    half = len(ingredients_list) // 2 + len(ingredients_list) % 2
+                    
+                    for i, ingredient in enumerate(ingredients_list[:half]):
+                        cols[0].write(f"• {ingredient}")
+                    
+                    for i, ingredient in enumerate(ingredients_list[half:]):
+                        cols[1].write(f"• {ingredient}")
+                    
+                    # Instructions
+                    with st.expander("Show Instructions"):
+                        instructions = details.get('instructions', [])
+                        for i, instruction in enumerate(instructions, 1):
+                            st.write(f"{i}. {instruction}")
                 
                 # Recipe URL
                 if 'url' in recipe:
@@ -725,20 +742,15 @@ with st.sidebar:
     
     st.markdown("<h3 class='sidebar-subtitle'></h3>", unsafe_allow_html=True)
     
-    # Safely check API status with proper exception handling
-    try:
-        flask_status = "✅ Connected" if is_api_connected(FLASK_API_URL) else "❌ Not Connected"
-        flask_class = "status-connected" if is_api_connected(FLASK_API_URL) else "status-disconnected"
-    except:
-        flask_status = "❌ Not Connected"
-        flask_class = "status-disconnected"
-        
-    try:
-        fastapi_status = "✅ Connected" if is_api_connected(FASTAPI_URL) else "❌ Not Connected"
-        fastapi_class = "status-connected" if is_api_connected(FASTAPI_URL) else "status-disconnected"
-    except:
-        fastapi_status = "❌ Not Connected"
-        fastapi_class = "status-disconnected"
+    # API status comes from the cached backend health
+    api_status = get_api_status()
+    flask_connected = api_status["Flask"]
+    flask_status = "✅ Connected" if flask_connected else "❌ Not Connected"
+    flask_class = "status-connected" if flask_connected else "status-disconnected"
+    
+    fastapi_connected = api_status["FastAPI"]
+    fastapi_status = "✅ Connected" if fastapi_connected else "❌ Not Connected"
+    fastapi_class = "status-connected" if fastapi_connected else "status-disconnected"
     
     st.markdown(f"""
     <div class="api-status-container">
@@ -0,0 +1 @@
+# HTTP load testing of the Ingreedy APIs against an in-process MongoDB stand-in
@@ -0,0 +1,102 @@
+import io
+import os
+import sys
+import threading
+import contextlib
+import importlib.util
+from typing import Dict, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT_DIR, "backend")
+
+# The three servable apps: file, framework and how to initialize them
+APPS = {
+    "fastapi": {"path": os.path.join("backend", "api", "main.py"), "framework": "asgi"},
+    "mongo": {"path": os.path.join("backend", "main.py"), "framework": "asgi"},
+    "flask": {"path": os.path.join("backend", "app.py"), "framework": "wsgi", "init": "init_app"},
+}
+
+
+class Response:
+    """Status and body size of a response, whichever client produced it"""
+    def __init__(self, status_code: int, size: int):
+        self.status_code = status_code
+        self.size = size
+
+
+def load_module(name: str):
+    """Import one of the apps from its file, under its own module name"""
+    app_info = APPS[name]
+    # backend/main.py imports its sibling database module
+    if BACKEND_DIR not in sys.path:
+        sys.path.append(BACKEND_DIR)
+    if ROOT_DIR not in sys.path:
+        sys.path.append(ROOT_DIR)
+
+    spec = importlib.util.spec_from_file_location(f"loadtest_{name}_app", os.path.join(ROOT_DIR, app_info["path"]))
+    module = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+        if app_info.get("init"):
+            getattr(module, app_info["init"])()
+    return module
+
+
+class InProcessTarget:
+    """Send requests to an app in this process, through its ASGI or WSGI test client"""
+    def __init__(self, name: str):
+        self.name = name
+        self.module = load_module(name)
+        self.framework = APPS[name]["framework"]
+        self._local = threading.local()
+        self._asgi_client = None
+        if self.framework == "asgi":
+            from fastapi.testclient import TestClient
+            # Server errors are reported as 500s instead of raised in the client
+            self._asgi_client = TestClient(self.module.app, raise_server_exceptions=False)
+            self._asgi_client.__enter__()
+
+    def _client(self):
+        # The ASGI test client is shared (calls go through one event loop portal),
+        # Flask test clients are per thread
+        if self._asgi_client is not None:
+            return self._asgi_client
+        if not hasattr(self._local, "client"):
+            self._local.client = self.module.app.test_client()
+        return self._local.client
+
+    def send(self, method: str, path: str, params: Optional[Dict] = None, json: Optional[Dict] = None) -> Response:
+        """Send one request and return its status"""
+        client = self._client()
+        if self.framework == "asgi":
+            response = client.request(method, path, params=params, json=json)
+            return Response(response.status_code, len(response.content))
+        response = client.open(path, method=method, query_string=params, json=json)
+        return Response(response.status_code, len(response.get_data()))
+
+    def close(self):
+        if self._asgi_client is not None:
+            self._asgi_client.__exit__(None, None, None)
+
+
+class HttpTarget:
+    """Send requests to a running server over HTTP"""
+    def __init__(self, base_url: str, pool_size: int = 32, timeout: float = 30):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.name = base_url
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def send(self, method: str, path: str, params: Optional[Dict] = None, json: Optional[Dict] = None) -> Response:
+        """Send one request and return its status"""
+        response = self.session.request(method, self.base_url + path, params=params, json=json, timeout=self.timeout)
+        return Response(response.status_code, len(response.content))
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,61 @@
+import os
+from typing import List, Optional
+
+from benchmarks.corpus import generate_corpus
+from backend.services.recipe_store import recipe_slug
+from data.mongo import close_clients, get_client
+
+# Where the apps connect to; the stand-in intercepts clients for this server
+STAND_IN_URI = "mongodb://localhost:27017"
+
+
+class MongoStandIn:
+    """
+    In-process MongoDB stand-in seeded with a synthetic recipe corpus
+
+    Patches pymongo with mongomock; the apps' shared clients (data.mongo)
+    are created on first use, so they connect to the stand-in. mongomock
+    does not implement $setIntersection, so backend/main.py's search
+    aggregation needs a real server (--url).
+    """
+    def __init__(self, n_recipes: int = 2000, seed: int = 42, db_name: Optional[str] = None):
+        self.n_recipes = n_recipes
+        self.seed = seed
+        self.db_name = db_name or os.getenv("DB_NAME", "ingreedy")
+        self.recipe_ids: List[str] = []
+        self._patcher = None
+
+    def start(self):
+        """Patch pymongo and seed the recipes and ingredients collections"""
+        import mongomock
+
+        os.environ["MONGO_URI"] = STAND_IN_URI
+        self._patcher = mongomock.patch(servers=(("localhost", 27017),))
+        self._patcher.start()
+        close_clients()
+
+        corpus = generate_corpus(self.n_recipes, seed=self.seed)
+        recipes = corpus.drop(columns=['id']).to_dict('records')
+        for recipe in recipes:
+            recipe['slug'] = recipe_slug(recipe['url'])
+
+        database = get_client(STAND_IN_URI)[self.db_name]
+        database.recipes.delete_many({})
+        database.ingredients.delete_many({})
+        self.recipe_ids = [str(_id) for _id in database.recipes.insert_many(recipes).inserted_ids]
+        names = sorted({name.lower() for simple in corpus['ingredients_simple'] for name in simple})
+        database.ingredients.insert_many([{"name": name} for name in names])
+        return self
+
+    def stop(self):
+        """Remove the pymongo patch and drop the clients connected to the stand-in"""
+        if self._patcher is not None:
+            close_clients()
+            self._patcher.stop()
+            self._patcher = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,124 @@
+import json
+import numpy as np
+from typing import Dict, List, NamedTuple, Optional
+
+from benchmarks.corpus import generate_queries
+
+# Default share of each operation in the replayed traffic
+DEFAULT_MIX = {"search": 0.7, "detail": 0.15, "similar": 0.1, "random": 0.05}
+
+
+class Request(NamedTuple):
+    """One request to replay"""
+    operation: str
+    method: str
+    path: str
+    params: Optional[Dict] = None
+    json: Optional[Dict] = None
+
+
+def _search_get(ingredients: List[str], max_results: int, path: str) -> Request:
+    return Request("search", "GET", path, params={"ingredients": ",".join(ingredients), "max_results": max_results})
+
+
+# How each app exposes every operation; operations an app lacks are left out
+ROUTES = {
+    "fastapi": {
+        "search": lambda ingredients, recipe_id, max_results: Request(
+            "search", "POST", "/recipes/search", json={"ingredients": ingredients, "max_results": max_results}),
+        "detail": lambda ingredients, recipe_id, max_results: Request("detail", "GET", f"/recipes/{recipe_id}"),
+        "similar": lambda ingredients, recipe_id, max_results: Request(
+            "similar", "GET", f"/recipes/{recipe_id}/similar"),
+        "random": lambda ingredients, recipe_id, max_results: Request("random", "GET", "/recipes/random"),
+        "ingredients": lambda ingredients, recipe_id, max_results: Request("ingredients", "GET", "/ingredients"),
+    },
+    "mongo": {
+        "search": lambda ingredients, recipe_id, max_results: _search_get(ingredients, max_results, "/recipes"),
+        "detail": lambda ingredients, recipe_id, max_results: Request("detail", "GET", f"/recipes/{recipe_id}"),
+        "ingredients": lambda ingredients, recipe_id, max_results: Request("ingredients", "GET", "/ingredients"),
+    },
+    "flask": {
+        "search": lambda ingredients, recipe_id, max_results: _search_get(ingredients, max_results, "/recipes/search"),
+        "detail": lambda ingredients, recipe_id, max_results: Request("detail", "GET", f"/recipes/{recipe_id}"),
+        "similar": lambda ingredients, recipe_id, max_results: Request(
+            "similar", "GET", f"/recipes/{recipe_id}/similar"),
+        "random": lambda ingredients, recipe_id, max_results: Request("random", "GET", "/recipes/random"),
+        "ingredients": lambda ingredients, recipe_id, max_results: Request("ingredients", "GET", "/ingredients"),
+    },
+}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse 'search=0.7,detail=0.3' into operation weights"""
+    weights = {}
+    for part in mix.split(","):
+        operation, _, weight = part.partition("=")
+        weights[operation.strip()] = float(weight)
+    return weights
+
+
+def load_query_log(file_path: str) -> List[List[str]]:
+    """
+    Load ingredient queries from a log file
+
+    Each line is either a JSON object with an "ingredients" list, a JSON
+    list of ingredients, or comma-separated ingredients.
+    """
+    queries = []
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line[0] in "[{":
+                entry = json.loads(line)
+                ingredients = entry.get("ingredients", []) if isinstance(entry, dict) else entry
+            else:
+                ingredients = line.split(",")
+            ingredients = [ingredient.strip() for ingredient in ingredients if ingredient.strip()]
+            if ingredients:
+                queries.append(ingredients)
+    return queries
+
+
+def build_requests(app: str,
+                   n_requests: int,
+                   recipe_ids: List[str],
+                   mix: Optional[Dict[str, float]] = None,
+                   queries: Optional[List[List[str]]] = None,
+                   max_results: int = 5,
+                   seed: int = 0) -> List[Request]:
+    """
+    Sample a sequence of requests following an operation mix
+
+    Args:
+        app: One of ROUTES
+        n_requests: Number of requests
+        recipe_ids: Recipe ids for detail and similar requests
+        mix: Operation weights, DEFAULT_MIX if None; operations the app lacks are dropped
+        queries: Ingredient queries to sample searches from, generated if None
+        max_results: Results per search
+        seed: Random seed
+    """
+    routes = ROUTES[app]
+    weights = {operation: weight for operation, weight in (mix or DEFAULT_MIX).items() if operation in routes}
+    if not weights:
+        raise ValueError(f"None of the operations in the mix are served by {app}")
+    if queries is None:
+        queries = generate_queries(1000, seed=seed)
+
+    rng = np.random.default_rng(seed)
+    operations = list(weights)
+    probabilities = np.array([weights[operation] for operation in operations], dtype=float)
+    picks = rng.choice(len(operations), size=n_requests, p=probabilities / probabilities.sum())
+    query_picks = rng.integers(0, len(queries), size=n_requests)
+    id_picks = rng.integers(0, max(len(recipe_ids), 1), size=n_requests)
+
+    return [
+        routes[operations[pick]](
+            queries[query_picks[i]],
+            recipe_ids[id_picks[i]] if recipe_ids else "missing",
+            max_results
+        )
+        for i, pick in enumerate(picks)
+    ]
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+"""
+Replay a query mix at target request rates and find where an app saturates
+
+Usage:
+    python run_loadtest.py --app fastapi --rps 20,50,100,200 --duration 10
+    python run_loadtest.py --url http://localhost:5000 --app flask --rps 100
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loadtest.queries import DEFAULT_MIX, ROUTES, Request, build_requests, load_query_log, parse_mix
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+def histogram(latencies_ms: np.ndarray) -> List[Dict]:
+    """Count latencies per bucket"""
+    counts = np.bincount(np.searchsorted(HISTOGRAM_BOUNDS_MS, latencies_ms), minlength=len(HISTOGRAM_BOUNDS_MS) + 1)
+    labels = [f"<={bound}ms" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+    return [{"bucket": label, "count": int(count)} for label, count in zip(labels, counts)]
+
+
+def latency_summary(latencies_ms: np.ndarray) -> Dict:
+    """Percentiles of latencies in milliseconds"""
+    if len(latencies_ms) == 0:
+        return {}
+    p50, p90, p95, p99 = np.percentile(latencies_ms, [50, 90, 95, 99])
+    return {
+        "mean_ms": round(float(latencies_ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p90_ms": round(float(p90), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(latencies_ms.max()), 3),
+    }
+
+
+def run_step(target, requests: List[Request], rps: float, concurrency: int) -> Dict:
+    """
+    Send requests open-loop at a fixed rate
+
+    Requests are scheduled at i / rps regardless of how fast earlier ones
+    complete, and latency is measured from the scheduled time, so queueing
+    in front of a saturated app shows up in the results.
+    """
+    records = []
+    lock = threading.Lock()
+
+    def send(request: Request, scheduled: float):
+        started = time.perf_counter()
+        try:
+            status = target.send(request.method, request.path, params=request.params, json=request.json).status_code
+        except Exception:
+            status = 0
+        finished = time.perf_counter()
+        with lock:
+            records.append((request.operation, status, finished - scheduled, finished - started, finished))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i, request in enumerate(requests):
+            scheduled = start + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, request, scheduled)
+
+    elapsed = max(record[4] for record in records) - start
+    operations = np.array([record[0] for record in records])
+    statuses = np.array([record[1] for record in records])
+    latencies = np.array([record[2] for record in records]) * 1000
+    service_times = np.array([record[3] for record in records]) * 1000
+    errors = (statuses == 0) | (statuses >= 500)
+
+    by_operation = {}
+    for operation in sorted(set(operations)):
+        mask = operations == operation
+        by_operation[operation] = {
+            "requests": int(mask.sum()),
+            "error_rate": round(float(errors[mask].mean()), 4),
+            **latency_summary(latencies[mask]),
+        }
+
+    return {
+        "target_rps": rps,
+        "achieved_rps": round(len(records) / elapsed, 2),
+        "requests": len(records),
+        "error_rate": round(float(errors.mean()), 4),
+        "client_errors": int(((statuses >= 400) & (statuses < 500)).sum()),
+        "status_codes": {str(code): int((statuses == code).sum()) for code in sorted(set(statuses.tolist()))},
+        "latency": latency_summary(latencies),
+        "service_time": latency_summary(service_times),
+        "histogram": histogram(latencies),
+        "operations": by_operation,
+    }
+
+
+def is_saturated(step: Dict, slo_p99_ms: float, max_error_rate: float) -> bool:
+    """An app is saturated when it falls behind the rate, misses the p99 SLO or errors"""
+    return (
+        step["achieved_rps"] < 0.95 * step["target_rps"]
+        or step["latency"].get("p99_ms", 0) > slo_p99_ms
+        or step["error_rate"] > max_error_rate
+    )
+
+
+def run_ramp(target, app: str, rates: List[float], duration: float, recipe_ids: List[str],
+             mix: Dict[str, float], queries, concurrency: int, slo_p99_ms: float,
+             max_error_rate: float, seed: int = 0) -> Dict:
+    """Run one step per rate until the app saturates"""
+    steps = []
+    saturation_rps = None
+    for step_number, rps in enumerate(rates):
+        requests = build_requests(app, max(1, int(rps * duration)), recipe_ids, mix, queries, seed=seed + step_number)
+        step = run_step(target, requests, rps, concurrency)
+        step["saturated"] = is_saturated(step, slo_p99_ms, max_error_rate)
+        steps.append(step)
+        print_step(step)
+        if step["saturated"]:
+            saturation_rps = rps
+            break
+
+    sustained = [step["achieved_rps"] for step in steps if not step["saturated"]]
+    return {
+        "steps": steps,
+        "saturation_rps": saturation_rps,
+        "max_sustained_rps": max(sustained) if sustained else None,
+    }
+
+
+def print_step(step: Dict):
+    """Print a step's summary and latency histogram"""
+    latency = step["latency"]
+    print(f"\n{step['target_rps']:>7.1f} rps target -> {step['achieved_rps']:.1f} achieved, "
+          f"{step['requests']} requests, {step['error_rate']:.1%} errors"
+          f"{'  SATURATED' if step.get('saturated') else ''}")
+    if latency:
+        print(f"  latency p50={latency['p50_ms']:.1f} p95={latency['p95_ms']:.1f} "
+              f"p99={latency['p99_ms']:.1f} max={latency['max_ms']:.1f} ms")
+    peak = max(bucket["count"] for bucket in step["histogram"]) or 1
+    for bucket in step["histogram"]:
+        if bucket["count"]:
+            print(f"  {bucket['bucket']:>10s} {'#' * max(1, int(40 * bucket['count'] / peak))} {bucket['count']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingreedy API load test")
+    parser.add_argument("--app", choices=sorted(ROUTES), default="fastapi", help="App (and route set) to test")
+    parser.add_argument("--url", help="Base URL of a running server; the app is run in-process if omitted")
+    parser.add_argument("--rps", default="10,25,50,100,200", help="Comma-separated request rates to step through")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per step")
+    parser.add_argument("--concurrency", type=int, default=32, help="Maximum requests in flight")
+    parser.add_argument("--mix", help=f"Operation weights (default: {','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())})")
+    parser.add_argument("--query-log", help="File of ingredient queries to replay instead of generated ones")
+    parser.add_argument("--recipe-ids", help="File of recipe ids (one per line) for detail requests with --url")
+    parser.add_argument("--recipes", type=int, default=2000, help="Recipes seeded into the MongoDB stand-in")
+    parser.add_argument("--slo-p99-ms", type=float, default=500, help="p99 latency above which the app is saturated")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Error rate above which the app is saturated")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Save the report as JSON")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    queries = load_query_log(args.query_log) if args.query_log else None
+    rates = [float(rate) for rate in args.rps.split(",")]
+
+    if args.app == "mongo" and not args.url and "search" in mix:
+        # mongomock lacks $setIntersection, so every search would fail and fake a saturation
+        mix = {operation: weight for operation, weight in mix.items() if operation != "search"}
+        print("Note: searches are left out of the mix; mongomock lacks $setIntersection, use --url to load test them")
+    if args.url and not args.recipe_ids:
+        # Without known ids, detail requests would only measure 404s
+        mix = {operation: weight for operation, weight in mix.items() if operation not in ("detail", "similar")}
+    if not mix:
+        parser.error("none of the operations in the mix can be load tested this way")
+
+    stand_in = None
+    if args.url:
+        from loadtest.apps import HttpTarget
+        target = HttpTarget(args.url, pool_size=args.concurrency)
+        recipe_ids = []
+        if args.recipe_ids:
+            with open(args.recipe_ids) as f:
+                recipe_ids = [line.strip() for line in f if line.strip()]
+        print(f"Load testing {args.url} ({args.app} routes)")
+    else:
+        from loadtest.fixtures import MongoStandIn
+        from loadtest.apps import InProcessTarget
+        print(f"Seeding the MongoDB stand-in with {args.recipes} recipes...")
+        stand_in = MongoStandIn(args.recipes, seed=args.seed).start()
+        print(f"Starting the {args.app} app in-process...")
+        target = InProcessTarget(args.app)
+        recipe_ids = stand_in.recipe_ids
+
+    try:
+        report = run_ramp(target, args.app, rates, args.duration, recipe_ids, mix, queries,
+                          args.concurrency, args.slo_p99_ms, args.max_error_rate, args.seed)
+    finally:
+        target.close()
+        if stand_in is not None:
+            stand_in.stop()
+
+    report = {"app": args.app, "url": args.url, "mix": mix, "concurrency": args.concurrency, **report}
+    if report["saturation_rps"] is None:
+        print(f"\nNo saturation up to {rates[-1]} rps")
+    else:
+        print(f"\nSaturated at {report['saturation_rps']} rps; "
+              f"max sustained {report['max_sustained_rps']} rps")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
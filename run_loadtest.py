@@ -0,0 +1,18 @@
+#!/usr/bin/env python
+"""
+Load test one of the Ingreedy APIs against an in-process MongoDB stand-in
+"""
+from loadtest.runner import main as loadtest_main
+
+def main():
+    """Main function to run the load test"""
+    print("Starting Ingreedy load test...")
+    print("The app runs in-process against a seeded MongoDB stand-in unless --url is given.")
+    
+    # Run the load test
+    loadtest_main()
+    
+    print("Load test complete!")
+
+if __name__ == "__main__":
+    main()
@@ -4,18 +4,31 @@ Run the recipe processor to prepare data for ML algorithms
 """
 import os
 import sys
+import argparse
 from data.processor import main as processor_main
+from data.parallel import PROCESSOR_CHUNK_SIZE, PROCESSOR_WORKERS
+from data.pipeline import STAGES
 
 def main():
     """Main function to run the processor"""
+    parser = argparse.ArgumentParser(description="Process recipe data and publish a new recipe index")
+    parser.add_argument("--workers", type=int, default=PROCESSOR_WORKERS,
+                        help="Worker processes and estimator threads (0 uses every core)")
+    parser.add_argument("--chunk-size", type=int, default=PROCESSOR_CHUNK_SIZE,
+                        help="Recipes per vectorization chunk")
+    parser.add_argument("--rerun-from", choices=STAGES,
+                        help="Recompute this stage and every later one even if cached")
+    args = parser.parse_args()
+
     print("Starting recipe data processor...")
     print("This will process recipe data and prepare it for ML algorithms.")
     print("Make sure MongoDB is running and contains recipe data!")
-    
-    # Run the processor
-    processor_main()
-    
+
+    # Run the processor; unchanged stages are restored from the cache
+    if not processor_main(workers=args.workers, chunk_size=args.chunk_size, rerun_from=args.rerun_from):
+        sys.exit(1)
+
     print("Processing complete!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,84 @@
+import time
+import mongomock
+import numpy as np
+from bson import ObjectId
+from backend.services.catalog import RecipeCatalog
+from backend.services.recipe_store import recipe_slug
+from backend.services.sampler import RecipeSampler
+
+class StubIndex:
+    """Index holding one recipe that is not stored in MongoDB"""
+    row_ids = np.asarray(['7'], dtype=object)
+
+    def __len__(self):
+        return 1
+
+    def get_recipe(self, recipe_id):
+        return {'id': '7', 'title': 'Indexed only'} if recipe_id == '7' else None
+
+    def labels(self, name):
+        return None
+
+def make_catalog(index=None, **kwargs):
+    collection = mongomock.MongoClient().ingreedy.recipes
+    catalog = RecipeCatalog(collection, **kwargs)
+    catalog.index_manager.load = lambda: index
+    return catalog, collection
+
+def test_recipes_by_ids_resolves_every_key_kind():
+    catalog, collection = make_catalog(StubIndex())
+    object_id = ObjectId()
+    url = "https://www.allrecipes.com/recipe/7063/amish-bread/"
+    collection.insert_many([
+        {'_id': object_id, 'title': 'Scraped', 'url': 'https://example.com/scraped'},
+        {'_id': 'imported-1', 'title': 'Amish Bread', 'url': url, 'slug': 'amish-bread'},
+    ])
+    keys = ['amish-bread', str(object_id), 'missing', '7', url, 'imported-1']
+    recipes = catalog.get_recipes_by_ids(keys)
+    assert [recipe['title'] for recipe in recipes] == ['Amish Bread', 'Scraped', 'Indexed only', 'Amish Bread', 'Amish Bread']
+    # Served from the cache the second time, in the same order
+    assert catalog.get_recipes_by_ids(keys) == recipes
+
+def test_recipe_slug():
+    assert recipe_slug("https://www.allrecipes.com/recipe/7063/Amish-Bread/") == "amish-bread"
+    assert recipe_slug("https://www.allrecipes.com/recipe/7063/amish-bread/?utm_source=x#reviews") == "amish-bread"
+    assert recipe_slug("https://www.allrecipes.com/") == ""
+
+def test_sampler_groups_normalized_labels():
+    sampler = RecipeSampler(seed=0)
+    sampler.refresh(
+        ['a', 'b', 'c', 'd', 'e'],
+        {'cuisine': ['Italian', 'italian', None, 'Mexican', float('nan')],
+         'kmeans_cluster': np.asarray([1, 2, 1, 1, 2])}
+    )
+    assert sorted(sampler.sample(10, cuisine='ITALIAN')) == ['a', 'b']
+    assert sorted(sampler.sample(10, cluster='1')) == ['a', 'c', 'd']
+    assert sampler.sample(10, cluster=1, cuisine='italian') == ['a']
+    assert sampler.sample(10, cuisine='french') == []
+    assert sorted(sampler.sample(10)) == ['a', 'b', 'c', 'd', 'e']
+
+def test_sampler_rescans_collection_in_background():
+    catalog, collection = make_catalog(sampler_ttl=0)
+    collection.insert_one({'_id': 'first'})
+    assert catalog.sample(5) == ['first']
+
+    # Past the TTL, requests keep sampling the old ids while a thread rescans
+    collection.insert_one({'_id': 'second'})
+    refresh = catalog.sampler.refresh_from_collection
+    def slow_refresh(documents):
+        time.sleep(0.2)
+        return refresh(documents)
+    catalog.sampler.refresh_from_collection = slow_refresh
+    assert catalog.sample(5) == ['first']
+    deadline = time.time() + 5
+    while len(catalog.sampler) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert sorted(catalog.sample(5)) == ['first', 'second']
+
+def test_loaded_index_is_sampled_without_rescans():
+    catalog, collection = make_catalog(sampler_ttl=0)
+    collection.insert_one({'_id': 'stored'})
+    catalog.index_manager.swap(StubIndex())
+    assert catalog.sample(5) == ['7']
+    assert catalog.sample(5) == ['7']
+    assert not catalog._rescanning
@@ -0,0 +1,82 @@
+import datetime
+import json
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from bson import ObjectId
+from backend.services import encoding
+
+OBJECT_ID = ObjectId("64b7f0c2a1b2c3d4e5f60718")
+
+def document():
+    """A result mixing the types pandas rows and MongoDB documents carry"""
+    return {
+        "_id": OBJECT_ID,
+        "similarity": np.float32(0.5),
+        "calories": np.int64(420),
+        "vegan": np.bool_(True),
+        "rating": float("nan"),
+        "score": np.float64("inf"),
+        "missing": np.float64("nan"),
+        "clusters": np.asarray([1, 2, 3], dtype=np.int64),
+        "weights": np.asarray([0.25, np.nan]),
+        "scraped_at": datetime.datetime(2024, 1, 2, 3, 4, 5),
+        "tags": ("dessert",),
+        "updated": pd.NaT,
+        "servings": pd.NA,
+        "nested": [{"value": float("nan")}, {"value": 1.5}],
+    }
+
+EXPECTED = {
+    "_id": str(OBJECT_ID),
+    "similarity": 0.5,
+    "calories": 420,
+    "vegan": True,
+    "rating": None,
+    "score": None,
+    "missing": None,
+    "clusters": [1, 2, 3],
+    "weights": [0.25, None],
+    "scraped_at": "2024-01-02T03:04:05",
+    "tags": ["dessert"],
+    "updated": None,
+    "servings": None,
+    "nested": [{"value": None}, {"value": 1.5}],
+}
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(encoding, "orjson", None)
+    return request.param
+
+def test_dumps(backend):
+    body = encoding.dumps(document())
+    assert isinstance(body, bytes)
+    # Strict parse: NaN and Infinity must have been written as null
+    assert json.loads(body, parse_constant=lambda name: pytest.fail(f"{name} in output")) == EXPECTED
+    assert encoding.loads(body) == EXPECTED
+    assert encoding.loads(body.decode("utf-8")) == EXPECTED
+
+def test_dumps_rejects_unknown_types(backend):
+    with pytest.raises(TypeError):
+        encoding.dumps({"value": object()})
+
+def test_fastapi_response():
+    response = encoding.FastJSONResponse({"recipes": [{"_id": OBJECT_ID, "similarity": np.float32(0.25)}]})
+    assert json.loads(response.body) == {"recipes": [{"_id": str(OBJECT_ID), "similarity": 0.25}]}
+    assert response.media_type == "application/json"
+
+def test_flask_provider():
+    from backend.app import app
+    with app.app_context():
+        response = app.json.response({"value": np.float64("nan"), "id": OBJECT_ID})
+        assert json.loads(response.get_data()) == {"value": None, "id": str(OBJECT_ID)}
+        assert json.loads(app.json.response(1, np.int64(2)).get_data()) == [1, 2]
+        assert json.loads(app.json.response().get_data()) is None
+        with pytest.raises(TypeError):
+            app.json.response(1, value=2)
+        assert app.json.loads(app.json.dumps({"weights": np.asarray([0.5, np.nan])})) == {"weights": [0.5, None]}
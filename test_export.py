@@ -0,0 +1,53 @@
+import gzip
+import mongomock
+import numpy as np
+from backend.services.encoding import loads
+from backend.services.export import CUISINE_COLLATION, iter_recipes, iter_ndjson, iter_gzip
+
+class RecordingCollection:
+    """Collection wrapper recording the options of every find"""
+    def __init__(self, collection):
+        self.collection = collection
+        self.finds = []
+
+    def find(self, query, projection, **options):
+        self.finds.append((query, options))
+        return self.collection.find(query, projection)
+
+class StubIndex:
+    """Index labelling recipe 'a' with cluster 0 and recipe 'b' with cluster 1"""
+    row_ids = np.asarray(['a', 'b'], dtype=object)
+
+    def labels(self, name):
+        return np.asarray([0, 1]) if name == 'kmeans_cluster' else None
+
+    def get_row(self, recipe_id):
+        return {'a': 0, 'b': 1}.get(recipe_id)
+
+def make_collection():
+    collection = mongomock.MongoClient().ingreedy.recipes
+    collection.insert_many([
+        {'_id': 'a', 'title': 'Pasta', 'cuisine': 'Italian'},
+        {'_id': 'b', 'title': 'Curry', 'cuisine': 'Thai'},
+    ])
+    return RecordingCollection(collection)
+
+def test_cuisine_is_an_indexable_equality_match():
+    collection = make_collection()
+    documents = list(iter_recipes(collection, cuisine='Italian'))
+    assert [document['id'] for document in documents] == ['a']
+    assert collection.finds == [({'cuisine': 'Italian'}, {'collation': CUISINE_COLLATION})]
+
+    # The unfiltered export runs without a collation, like any other query
+    list(iter_recipes(collection))
+    assert collection.finds[-1] == ({}, {})
+
+def test_cluster_export_adds_labels():
+    documents = list(iter_recipes(make_collection(), index=StubIndex(), cluster=1))
+    assert [(document['id'], document['kmeans_cluster']) for document in documents] == [('b', 1)]
+    assert 'hierarchical_cluster' not in documents[0]
+
+def test_gzip_ndjson_round_trip():
+    documents = [{'id': str(i), 'title': f'Recipe {i}'} for i in range(1000)]
+    data = b''.join(iter_gzip(iter_ndjson(iter(documents)), flush_bytes=1024))
+    assert [loads(line) for line in gzip.decompress(data).splitlines()] == documents
@@ -0,0 +1,72 @@
+from data.frontier import CrawlFrontier, FAILED, FETCHED, LISTING, PENDING, RECIPE, canonical_url
+
+def test_canonical_url():
+    url = "https://allrecipes.com/recipe/1/pie"
+    assert canonical_url("http://www.allrecipes.com/recipe/1/pie/") == url
+    assert canonical_url("https://allrecipes.com/recipe/1/pie?utm_source=x#reviews") == url
+    assert canonical_url("/recipe/1/pie/", base="https://www.allrecipes.com/recipes/") == url
+    assert canonical_url("https://allrecipes.com/r?b=2&a=1") == "https://allrecipes.com/r?a=1&b=2"
+
+def test_dedup_by_canonical_url():
+    with CrawlFrontier(":memory:") as frontier:
+        added = frontier.add_many([
+            "https://www.allrecipes.com/recipe/1/pie/",
+            "http://allrecipes.com/recipe/1/pie?utm_medium=email",
+            "https://allrecipes.com/recipe/2/cake/",
+        ])
+        assert added == 2
+        assert len(frontier) == 2
+        assert not frontier.add("https://allrecipes.com/recipe/2/cake")
+        assert "https://www.allrecipes.com/recipe/2/cake/" in frontier
+
+def test_due_order_and_priority():
+    with CrawlFrontier(":memory:", retry_base=10) as frontier:
+        frontier.add_many(["https://a.com/late"], priority=5, now=0)
+        frontier.add_many(["https://a.com/early", "https://a.com/failed"], priority=1, now=0)
+        frontier.mark_failed("https://a.com/failed", "timeout", now=0)
+        # Rediscovery under a higher-priority category raises the priority
+        frontier.add_many(["https://a.com/late"], priority=0, now=0)
+        assert [entry.url for entry in frontier.due(now=1)] == ["https://a.com/late", "https://a.com/early"]
+        # The failure is retried once its backoff has passed, after new URLs
+        assert [entry.url for entry in frontier.due(now=10)][-1] == "https://a.com/failed"
+        assert frontier.due(kind=LISTING, now=10) == []
+
+def test_retry_backoff_and_refresh():
+    with CrawlFrontier(":memory:", refresh_after={RECIPE: 1000}, max_attempts=3, retry_base=10) as frontier:
+        url = "https://a.com/recipe"
+        frontier.add(url)
+        frontier.mark_failed(url, "boom", now=0)
+        assert frontier.due(now=9) == [] and len(frontier.due(now=10)) == 1
+        frontier.mark_failed(url, "boom", now=10)
+        assert frontier.due(now=29) == [] and len(frontier.due(now=30)) == 1
+        # After max_attempts the URL waits for its next refresh
+        frontier.mark_failed(url, "boom", now=30)
+        assert frontier.due(now=1029) == [] and frontier.due(now=1030)[0].state == FAILED
+        frontier.mark_fetched(url, now=2000)
+        entry = frontier.due(now=3000)[0]
+        assert (entry.state, entry.attempts) == (FETCHED, 0)
+
+def test_resume_after_restart(tmp_path):
+    path = str(tmp_path / "frontier.sqlite3")
+    urls = [f"https://a.com/recipe/{i}" for i in range(5)]
+    with CrawlFrontier(path) as frontier:
+        frontier.add_many(urls)
+        for entry in frontier.due(limit=2):
+            frontier.mark_fetched(entry.url)
+
+    # A new run only sees the pages the first one did not finish
+    with CrawlFrontier(path) as frontier:
+        assert len(frontier) == 5
+        visited = []
+        for entry in frontier.iter_due(batch_size=2):
+            visited.append(entry.url)
+            frontier.mark_fetched(entry.url)
+        assert sorted(visited) == urls[2:]
+        assert frontier.stats()[RECIPE] == {"due": 0, FETCHED: 5}
+        assert PENDING not in frontier.stats()[RECIPE]
+
+def test_seed_fetched():
+    with CrawlFrontier(":memory:", refresh_after={RECIPE: 100}) as frontier:
+        assert frontier.seed_fetched([("https://a.com/old", 0.0), ("https://a.com/new", 50.0)]) == 2
+        assert frontier.seed_fetched([("https://www.a.com/old/", 0.0)]) == 0
+        assert [entry.url for entry in frontier.due(now=120)] == ["https://a.com/old"]
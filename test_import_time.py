@@ -0,0 +1,55 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Cold-import budget in seconds (generous for slow CI machines)
+IMPORT_BUDGET = float(os.getenv("IMPORT_BUDGET", 1.5))
+
+# Modules that must not be loaded just by importing the processor or the API
+HEAVY_MODULES = ["sklearn", "pandas", "scipy.sparse", "joblib", "pymongo"]
+
+# Times an import in a fresh interpreter and lists the heavy modules it loaded.
+# Modules wrapped by lazy_import are only imported (and in sys.modules) once used.
+CHECK_SCRIPT = """
+import sys, json, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+loaded = [
+    name for name in {heavy!r}
+    if name in sys.modules and type(sys.modules[name]).__name__ != '_LazyModule'
+]
+print(json.dumps({{"elapsed": elapsed, "loaded": loaded}}))
+"""
+
+def check_import(statement):
+    """Run an import statement in a fresh interpreter from the repo root"""
+    code = CHECK_SCRIPT.format(statement=statement, heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_processor_import_time():
+    result = check_import("import data.processor")
+    print(f"import data.processor: {result['elapsed'] * 1000:.0f} ms")
+    assert result["loaded"] == []
+    assert result["elapsed"] < IMPORT_BUDGET
+
+def test_api_import_does_not_load_data():
+    # Importing the API must neither train models nor connect to MongoDB
+    statement = (
+        "import importlib.util; "
+        "spec = importlib.util.spec_from_file_location('api_main', 'backend/api/main.py'); "
+        "module = importlib.util.module_from_spec(spec); "
+        "spec.loader.exec_module(module); "
+        "assert module.index_manager.current is None"
+    )
+    result = check_import(statement)
+    print(f"import backend/api/main.py: {result['elapsed'] * 1000:.0f} ms")
+    assert "sklearn" not in result["loaded"]
+    assert "pymongo" not in result["loaded"]
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from data.index import QueryVectorizer, RecipeIndex
+from data.vectorizers import PROFILES
+
+@pytest.mark.parametrize("profile", sorted(PROFILES))
+def test_query_vectorizer_matches_sklearn(make_processor, queries, profile):
+    processor = make_processor(profile=profile)
+    frozen = QueryVectorizer.from_sklearn(processor.vectorizer)
+    texts = [processor.vectorizer.query_text(query) for query in queries] + ["", "unknown words only"]
+    expected = processor.vectorizer.transform(texts)
+    actual = frozen.transform(texts)
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual.toarray(), expected.toarray(), rtol=1e-5, atol=1e-6)
+
+@pytest.mark.parametrize("profile", sorted(PROFILES))
+def test_index_search_matches_processor(make_processor, queries, profile):
+    processor = make_processor(profile=profile)
+    index = RecipeIndex.from_processor(processor, embedding_dims=0)
+    searches = [{}, {'cuisine_type': 'italian'}, {'diet_type': 'Vegan', 'max_calories': 700},
+                {'difficulty': 'Easy', 'max_cook_time': 45}]
+    for query in queries:
+        for filters in searches:
+            expected = processor.find_recipes_by_ingredients(query, max_results=8, **filters)
+            actual = index.find_recipes_by_ingredients(query, max_results=8, **filters)
+            assert [recipe['id'] for recipe in actual] == [recipe['id'] for recipe in expected]
+            assert [recipe['similarity'] for recipe in actual] == pytest.approx(
+                [recipe['similarity'] for recipe in expected], rel=1e-5, abs=1e-6)
+            assert [recipe['matched'] for recipe in actual] == [recipe['matched'] for recipe in expected]
+
+def test_filtered_ann_search_widens(make_processor, queries):
+    """Filtered approximate searches scan more lists until they find enough matching recipes"""
+    processor = make_processor()
+    index = RecipeIndex.from_processor(processor, embedding_dims=16)
+    index.embedding.probes = 1
+    df = processor.recipes_df
+    filters = [
+        {'cuisine_type': 'Asian', 'max_results': 20},
+        {'cuisine_type': 'Asian', 'diet_type': 'Vegan', 'difficulty': 'Hard', 'max_results': 10},
+    ]
+    for query_filters in filters:
+        matching = df[df['cuisine'] == 'Asian']
+        if 'diet_type' in query_filters:
+            matching = matching[(matching['diet_type'] == 'Vegan') & (matching['difficulty'] == 'Hard')]
+        exact = index.find_recipes_by_ingredients(queries[0], **query_filters)
+        ann = index.find_recipes_by_ingredients(queries[0], engine='ann', **query_filters)
+        assert len(ann) == len(exact) == min(query_filters['max_results'], len(matching))
+        assert all(recipe['cuisine'] == 'Asian' for recipe in ann)
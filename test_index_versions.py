@@ -0,0 +1,65 @@
+import threading
+import time
+import pytest
+from data.index import RecipeIndex
+from data.index_versions import (IndexManager, current_version, list_versions, publish_index,
+                                 rollback, set_current)
+
+@pytest.fixture
+def index(make_processor):
+    return RecipeIndex.from_processor(make_processor(100), embedding_dims=0)
+
+def test_publish_and_rollback(tmp_path, index):
+    root = str(tmp_path)
+    first = publish_index(index, root)
+    second = publish_index(index, root)
+    assert list_versions(root) == [first, second]
+    assert current_version(root) == second
+
+    assert rollback(root=root) == first
+    assert current_version(root) == first
+    with pytest.raises(ValueError):
+        rollback(root=root)
+    set_current(second, root)
+    with pytest.raises(ValueError):
+        set_current("missing", root)
+
+def test_publish_prunes_old_versions(tmp_path, index):
+    root = str(tmp_path)
+    versions = [publish_index(index, root, keep=2) for _ in range(4)]
+    assert list_versions(root) == versions[-2:]
+
+def test_manager_swaps_to_current(tmp_path, index):
+    root = str(tmp_path)
+    first = publish_index(index, root)
+    swapped = []
+    manager = IndexManager(root, poll_interval=0, on_swap=swapped.append)
+    assert manager.load().version == first
+    assert not manager.check()
+
+    second = publish_index(index, root)
+    assert manager.check() and manager.version == second
+    assert manager.rollback() == first
+    assert manager.version == first
+    assert [swapped_index.version for swapped_index in swapped] == [first, second, first]
+
+def test_concurrent_first_load_runs_hooks_once(tmp_path, index, monkeypatch):
+    root = str(tmp_path)
+    publish_index(index, root)
+    swapped = []
+    manager = IndexManager(root, poll_interval=0, on_swap=swapped.append)
+    load_version = manager._load_version
+
+    def slow_load(version):
+        time.sleep(0.1)
+        return load_version(version)
+    monkeypatch.setattr(manager, "_load_version", slow_load)
+
+    loaded = []
+    threads = [threading.Thread(target=lambda: loaded.append(manager.load())) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(swapped) == 1
+    assert all(result is swapped[0] for result in loaded)
@@ -0,0 +1,32 @@
+import sys
+import threading
+from data.lazy import lazy_import
+
+SLOW_MODULE = """
+import time
+time.sleep(0.2)
+VALUE = 42
+"""
+
+def test_concurrent_first_access(tmp_path, monkeypatch):
+    # A module that takes a while to import, first used from several threads at once
+    (tmp_path / "slow_lazy_module.py").write_text(SLOW_MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    module = lazy_import("slow_lazy_module")
+    assert "slow_lazy_module" not in sys.modules
+
+    results, errors = [], []
+    def use():
+        try:
+            results.append(module.VALUE)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sys.modules.pop("slow_lazy_module", None)
+    assert errors == []
+    assert results == [42] * 8
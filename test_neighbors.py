@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from data.neighbors import BYTES_PER_SIMILARITY, NeighborTable, build_neighbor_table, neighbor_block_size
+
+def random_vectors(n_rows=60, n_cols=40, seed=0):
+    matrix = sparse.random(n_rows, n_cols, density=0.15, format='csr', random_state=seed, dtype=np.float64)
+    norms = np.sqrt(matrix.multiply(matrix).sum(axis=1)).A1
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix)
+
+def brute_force_scores(vectors, k):
+    similarities = (vectors @ vectors.T).toarray()
+    np.fill_diagonal(similarities, -np.inf)
+    return -np.sort(-similarities, axis=1)[:, :k]
+
+@pytest.mark.parametrize("block_size,workers", [(None, 1), (1, 1), (7, 1), (7, 3), (512, 1)])
+def test_matches_brute_force(block_size, workers):
+    vectors = random_vectors()
+    neighbors, scores = build_neighbor_table(vectors, k=5, block_size=block_size, workers=workers)
+    np.testing.assert_allclose(scores, brute_force_scores(vectors, 5), rtol=1e-5, atol=1e-6)
+    # Scores are those of the listed neighbors, never the row itself
+    rows = np.arange(vectors.shape[0])[:, None]
+    assert not (neighbors == rows).any()
+    exact = (vectors @ vectors.T).toarray()
+    np.testing.assert_allclose(np.take_along_axis(exact, neighbors, axis=1), scores, rtol=1e-5, atol=1e-6)
+
+def test_small_corpus_is_padded():
+    neighbors, scores = build_neighbor_table(random_vectors(n_rows=3), k=5)
+    assert (neighbors[:, 2:] == -1).all()
+    assert (neighbors[:, :2] >= 0).all()
+
+def test_block_size_fits_memory_budget():
+    # 1M recipes in 512 MB shared by 4 workers: each block stays within its share
+    block_size = neighbor_block_size(1_000_000, workers=4, memory_mb=512)
+    assert 1 <= block_size <= 512
+    assert 4 * block_size * 1_000_000 * BYTES_PER_SIMILARITY <= 512 * 1024 * 1024
+    assert neighbor_block_size(1000, workers=1, memory_mb=512) == 512
+    assert neighbor_block_size(10**9, workers=8, memory_mb=1) == 1
+
+def test_lookup_and_round_trip(tmp_path):
+    vectors = random_vectors(n_rows=20)
+    table = NeighborTable.build([f"r{i}" for i in range(20)], vectors, k=3)
+    path = str(tmp_path / "neighbors.npz")
+    table.save(path)
+    loaded = NeighborTable.load(path)
+    assert loaded.similar_ids("r4") == table.similar_ids("r4")
+    assert len(loaded.lookup("r4", max_results=2)) == 2
+    with pytest.raises(KeyError):
+        loaded.lookup("missing")
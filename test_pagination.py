@@ -0,0 +1,44 @@
+import base64
+import mongomock
+import pytest
+from bson import ObjectId
+from backend.services.pagination import decode_cursor, encode_cursor, fetch_page
+
+def make_collection(ids):
+    collection = mongomock.MongoClient().ingreedy.recipes
+    collection.insert_many([{"_id": recipe_id, "title": f"Recipe {i}"} for i, recipe_id in enumerate(ids)])
+    return collection
+
+def walk(collection, limit):
+    """Every recipe id of a keyset walk, page by page"""
+    seen, cursor = [], None
+    while True:
+        recipes, cursor = fetch_page(collection, cursor=cursor, limit=limit)
+        seen.extend(recipe["id"] for recipe in recipes)
+        if cursor is None:
+            return seen
+
+@pytest.mark.parametrize("recipe_id", [ObjectId(), "recipe-42", "507f1f77bcf86cd799439011"])
+def test_cursor_round_trip(recipe_id):
+    decoded = decode_cursor(encode_cursor(recipe_id))
+    assert decoded == recipe_id and type(decoded) is type(recipe_id)
+
+def test_invalid_cursor():
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor!")
+    with pytest.raises(ValueError):
+        decode_cursor(base64.urlsafe_b64encode(b"o:nope").decode())
+    # Only prefixed cursors are accepted
+    with pytest.raises(ValueError):
+        decode_cursor(base64.urlsafe_b64encode(str(ObjectId()).encode()).decode())
+
+@pytest.mark.parametrize("ids", [
+    [ObjectId() for _ in range(23)],
+    [f"recipe-{i:03d}" for i in range(23)],
+    [ObjectId() for _ in range(11)] + [f"recipe-{i:03d}" for i in range(12)],
+])
+@pytest.mark.parametrize("limit", [1, 5, 23, 50])
+def test_keyset_walk_visits_every_id_once(ids, limit):
+    seen = walk(make_collection(ids), limit)
+    assert sorted(seen) == sorted(str(recipe_id) for recipe_id in ids)
+    assert len(seen) == len(set(seen))
@@ -0,0 +1,85 @@
+import os
+import pytest
+from benchmarks.corpus import generate_corpus
+from data.pipeline import CACHE_VERSION, ProcessingPipeline, StageCache, fingerprint, recipes_fingerprint
+
+def start(cache, recipes_df):
+    """Pipeline past its load stage, with the recipes loaded"""
+    pipeline = ProcessingPipeline(workers=1, cache=cache)
+    pipeline.processor.recipes_df = recipes_df.copy()
+    pipeline.keys['load'] = fingerprint(CACHE_VERSION, 'load', recipes_fingerprint(recipes_df))
+    return pipeline
+
+def test_fingerprints():
+    assert fingerprint(1, 'load', {'b': 2, 'a': 1}) == fingerprint(1, 'load', {'a': 1, 'b': 2})
+    assert fingerprint(1, 'load') != fingerprint(2, 'load')
+
+    recipes = generate_corpus(50, vocab_size=150)
+    assert recipes_fingerprint(recipes) == recipes_fingerprint(recipes.copy())
+    changed = recipes.copy()
+    changed.at[10, 'title'] = 'Something else'
+    assert recipes_fingerprint(changed) != recipes_fingerprint(recipes)
+    assert recipes_fingerprint(recipes.iloc[::-1]) != recipes_fingerprint(recipes)
+
+def test_stage_cache(tmp_path):
+    cache = StageCache(str(tmp_path))
+    assert not cache.has('vectorize', 'a')
+    with cache.write('vectorize', 'a') as path:
+        with open(os.path.join(path, 'out.txt'), 'w') as f:
+            f.write('a')
+    assert cache.has('vectorize', 'a')
+    assert sorted(os.listdir(cache.path('vectorize', 'a'))) == ['out.txt', 'stage.json']
+
+    # A failed stage leaves neither an entry nor its temporary directory
+    with pytest.raises(RuntimeError):
+        with cache.write('vectorize', 'b'):
+            raise RuntimeError('stage failed')
+    assert not cache.has('vectorize', 'b')
+    assert os.listdir(os.path.join(str(tmp_path), 'vectorize')) == ['a']
+
+    with cache.write('vectorize', 'c'):
+        pass
+    with cache.write('normalize', 'x'):
+        pass
+    cache.prune({'vectorize': 'c'})
+    assert not cache.has('vectorize', 'a') and cache.has('vectorize', 'c')
+    assert not cache.has('normalize', 'x')
+
+def test_pipeline_resumes_from_cache(tmp_path, monkeypatch):
+    cache = StageCache(str(tmp_path))
+    recipes = generate_corpus(200, vocab_size=150)
+
+    first = start(cache, recipes)
+    first.normalize()
+    first.vectorize()
+    def fail(*args, **kwargs):
+        raise RuntimeError('cluster failed')
+    monkeypatch.setattr(first.processor, 'apply_kmeans_clustering', fail)
+    with pytest.raises(RuntimeError):
+        first.cluster()
+    assert not cache.has('cluster', first.keys['cluster'])
+
+    # A rerun on the same recipes restores the completed stages and computes the failed one
+    second = start(cache, recipes)
+    second.normalize()
+    second.vectorize()
+    second.cluster()
+    assert set(second.timings) == {'normalize (cached)', 'vectorize (cached)', 'cluster'}
+    assert second.keys == first.keys
+    assert (second.processor.ingredients_vectors != first.processor.ingredients_vectors).nnz == 0
+    assert second.processor.recipes_df['id'].tolist() == first.processor.recipes_df['id'].tolist()
+
+    third = start(cache, recipes)
+    third.rerun = {'vectorize', 'cluster'}
+    third.normalize()
+    third.vectorize()
+    assert set(third.timings) == {'normalize (cached)', 'vectorize'}
+
+    # Changed recipes change every key, so nothing is reused
+    changed = recipes.copy()
+    changed.at[0, 'ingredients'] = ['1 cup rice']
+    fourth = start(cache, changed)
+    fourth.normalize()
+    fourth.vectorize()
+    assert set(fourth.timings) == {'normalize', 'vectorize'}
+    assert fourth.keys['vectorize'] != first.keys['vectorize']
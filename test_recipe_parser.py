@@ -0,0 +1,53 @@
+import os
+import pytest
+from data.recipe_parser import ALLRECIPES_LAYOUT, available_backends, format_duration, parse_recipe_page
+
+PAGE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "allrecipes_recipe.html")
+
+INGREDIENTS = ["6 cups thinly sliced apples", "3/4 cup white sugar", "1 teaspoon ground cinnamon", "2 pie crusts"]
+INSTRUCTIONS = ["Preheat the oven to 425 degrees F.", "Mix apples, sugar and cinnamon.", "Fill the crust and bake 45 minutes."]
+
+def read_page():
+    with open(PAGE_FILE, "rb") as f:
+        return f.read()
+
+def test_json_ld():
+    fields = parse_recipe_page(read_page(), ALLRECIPES_LAYOUT)
+    assert fields == {
+        "title": "Classic Apple Pie & Crust",
+        "ingredients": INGREDIENTS,
+        "instructions": INSTRUCTIONS,
+        "image_url": "https://images.example.com/apple-pie.jpg",
+        "prep_time": "30 mins",
+        "cook_time": "1 hr",
+        "servings": "8",
+        "tags": ["Recipes", "Desserts"],
+    }
+
+def strip_json_ld(page):
+    start = page.index('<script type="application/ld+json">')
+    end = page.index("</script>", start) + len("</script>")
+    return page[:start] + page[end:]
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_css_fallback(backend):
+    page = read_page().decode("utf-8")
+    # Pages without JSON-LD, and every page when structured data is turned off
+    for fields in (parse_recipe_page(strip_json_ld(page), ALLRECIPES_LAYOUT, backend=backend),
+                   parse_recipe_page(page, ALLRECIPES_LAYOUT, backend=backend, structured=False)):
+        assert fields == {
+            "title": "Classic Apple Pie",
+            "ingredients": INGREDIENTS,
+            "instructions": INSTRUCTIONS,
+            "image_url": "https://images.example.com/apple-pie.jpg",
+            "prep_time": "Prep Time: 30 mins",
+            "cook_time": "Cook Time: 1 hr",
+            "servings": "Servings: 8",
+            "tags": ["Recipes", "Desserts"],
+        }
+
+def test_format_duration():
+    assert format_duration("PT1H15M") == "1 hr 15 mins"
+    assert format_duration("P1DT2H") == "1 day 2 hrs"
+    assert format_duration("about 5 minutes") == "about 5 minutes"
+    assert format_duration(None) is None
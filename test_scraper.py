@@ -0,0 +1,13 @@
+import os
+import sys
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def test_scraper_imports():
+    # run_scraper.py imports the scraper as data.scraper from the repo root
+    result = subprocess.run(
+        [sys.executable, "-c", "import data.scraper; assert callable(data.scraper.main)"],
+        cwd=ROOT_DIR, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr